@@ -1,28 +1,49 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.colors import HexColor, white
-from reportlab.lib.utils import ImageReader
-import qrcode
 import os
 import threading
 import webbrowser
 import time
+import math
 import uuid
 from io import BytesIO
-import smtplib
+from datetime import datetime, timedelta
 from email.message import EmailMessage
 import traceback # Added for more detailed error logging
+import json
+from collections import namedtuple
+from sqlalchemy import insert, select, update, delete, literal, or_, and_, inspect, text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from seat_map import SeatMap, canonical_seats, seat_mask, show_availability, MAX_SEATS_PER_BOOKING
+from seat_allocator import SeatAllocator
+from occupancy_cache import OccupancyCache
+from ticket_cache import TicketPdfCache
+from qr_service import QrImageCache, normalize_amount
+from outbox import OutboxWorkerPool
+from smtp_pool import SmtpPool
+from user_cache import UserCache
+from booking_history import PageTokens, page_size, read_tiered_page
+from booking_archive import ARCHIVE_BATCH_SIZE, ArchiveScheduler, archive_cutoffs
+from ticket_render import PosterCache, POSTER_BOX, draw_qr
+from catalog import Catalog
+from search_index import SUGGESTION_KINDS, paginate
+from show_schedule import SCHEDULE_DAYS, format_show_date, legacy_show_id, shows_by_day
 
 app = Flask(__name__)
+app.add_template_filter(format_show_date, 'show_date')
 app.secret_key = 'your_secret_key_here_for_security' # IMPORTANT: Change this to a strong, unique key!
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'movie_magic.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
+# Per-show seat state shared by all worker processes (mmap'ed file under instance/)
+occupancy_cache = OccupancyCache(os.path.join(app.instance_path, 'occupancy.cache'))
 
 # --- Database Models ---
 class User(db.Model):
@@ -31,6 +52,9 @@ class User(db.Model):
     password = db.Column(db.String(200), nullable=False)
     name = db.Column(db.String(100), nullable=True)
 
+# Read-only copy of a User kept in user_cache; usable after the request's db session is gone
+CachedUser = namedtuple('CachedUser', ['id', 'email', 'name'])
+
 class Booking(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.String(50), unique=True, nullable=False)
@@ -40,176 +64,457 @@ class Booking(db.Model):
     time = db.Column(db.String(50), nullable=False)
     seats = db.Column(db.String(200), nullable=False) # Increased length to support more seats
     price = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.Float) # Unix timestamp; 0 for bookings made before it was recorded
+    show_id = db.Column(db.String(40)) # show_schedule.Show.show_id (legacy-... for bookings without a date)
+    starts_at = db.Column(db.DateTime) # Show start; None for bookings made before shows had dates
+
+    __table_args__ = (
+        db.Index('ix_booking_show_id', 'show_id'),
+        # Booking history, newest first; SQLite appends the rowid (id) to every index entry,
+        # so (created_at, id) keyset pages are read straight off this index
+        db.Index('ix_booking_user_created', 'user_email', 'created_at'),
+        db.Index('ix_booking_starts_at', 'starts_at'), # Finds ended shows to archive; undated (NULL) rows sort first
+    )
+
+class ArchivedBooking(db.Model):
+    # Bookings for shows that have ended, moved out of Booking by archive_past_bookings().
+    # Same columns; only read for booking history and old tickets.
+    __tablename__ = 'booking_archive'
+    id = db.Column(db.Integer, primary_key=True) # Own rowid: SQLite may reuse a deleted Booking.id
+    booking_id = db.Column(db.String(50), unique=True, nullable=False)
+    user_email = db.Column(db.String(120), nullable=False)
+    movie = db.Column(db.String(100), nullable=False)
+    theater = db.Column(db.String(100), nullable=False)
+    time = db.Column(db.String(50), nullable=False)
+    seats = db.Column(db.String(200), nullable=False)
+    price = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.Float)
+    show_id = db.Column(db.String(40))
+    starts_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.Float, nullable=False) # Unix timestamp
+
+    __table_args__ = (
+        db.Index('ix_booking_archive_user_created', 'user_email', 'created_at'),
+    )
+
+# Columns copied from Booking to ArchivedBooking
+ARCHIVED_COLUMNS = ('booking_id', 'user_email', 'movie', 'theater', 'time', 'seats', 'price',
+                    'created_at', 'show_id', 'starts_at')
+
+class BookingSeat(db.Model):
+    # One row per booked seat; the unique (show_key, seat) pair makes SQLite reject double-bookings
+    id = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(db.String(50), db.ForeignKey('booking.booking_id'), nullable=False)
+    show_key = db.Column(db.String(260), nullable=False) # The booking's show_id
+    seat = db.Column(db.String(4), nullable=False)
+    user_email = db.Column(db.String(120), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('show_key', 'seat', name='uq_booking_seat_show_seat'), # Also serves show lookups
+        db.Index('ix_booking_seat_user_show', 'user_email', 'show_key'),
+    )
+
+class UnseatedBooking(db.Model):
+    # Legacy bookings the BookingSeat backfill gave no seat rows (each seat was already taken, or
+    # none parsed); recorded so later startups don't try them again
+    booking_id = db.Column(db.String(50), primary_key=True)
+    seats = db.Column(db.String(200)) # As booked
+    recorded_at = db.Column(db.Float, nullable=False) # Unix timestamp
+
+class SeatHold(db.Model):
+    # Temporary claim on a seat between seat selection and payment; expires after HOLD_TTL_SECONDS
+    id = db.Column(db.Integer, primary_key=True)
+    hold_id = db.Column(db.String(50), nullable=False, index=True)
+    show_key = db.Column(db.String(260), nullable=False) # show_id
+    seat = db.Column(db.String(4), nullable=False)
+    user_email = db.Column(db.String(120), nullable=False)
+    expires_at = db.Column(db.Float, nullable=False) # Unix timestamp
+
+    __table_args__ = (
+        db.UniqueConstraint('show_key', 'seat', name='uq_seat_hold_show_seat'),
+        db.Index('ix_seat_hold_expires_at', 'expires_at'), # Expiry is a range delete on this index
+    )
+
+class ShowSales(db.Model):
+    # Seats sold per show, bumped in the booking's transaction; listing pages read it instead of BookingSeat
+    show_id = db.Column(db.String(40), primary_key=True)
+    sold = db.Column(db.Integer, nullable=False, default=0)
+
+class OutboxJob(db.Model):
+    # Pending delivery work (ticket emails), committed together with the booking it belongs to
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False) # JSON
+    status = db.Column(db.String(20), nullable=False, default='pending') # pending, claimed, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.Float, nullable=False) # Unix timestamps
+    next_attempt_at = db.Column(db.Float, nullable=False)
+    claimed_at = db.Column(db.Float)
+    last_error = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_outbox_job_status_due', 'status', 'next_attempt_at'),
+    )
 
 # --- Movie Data ---
-MOVIES = [
-    {
-        'title': 'DEVARA',
-        'poster_filename': 'devara.jpg',
-        'teaser_url': 'https://www.youtube.com/embed/rc61YHl1PFY',
-        'theaters': [
-            {
-                'name': 'M1 CINEMA, NELLORE',
-                'price': 250,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-            {
-                'name': 'SIRI COMPLEX, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM'],
-                    'TOMORROW': ['2:00 PM','6:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM']
-                }
-            },
-            {
-                'name': 'MANASA, KAVALI',
-                'price': 220,
-                'timings_by_day': {
-                    'TODAY': ['7:00 AM', '12:00 PM', '4:00 PM', '10:10 PM'],
-                    'TOMORROW': ['7:00 AM', '12:00 PM', '6:30 PM'],
-                    'DAY OF TOMORROW': ['11:00 AM', '6:50 PM']
-                }
-            },
-            {
-                'name': 'M GB, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-        ]
-    },
-    {
-        'title': 'RAJA SAAB',
-        'poster_filename': 'rajasaab.jpg',
-       'teaser_url': 'https://www.youtube.com/embed/NZbmcl0QUaU',
-        'theaters': [
-            {
-                'name': 'M1 CINEMA, NELLORE',
-                'price': 250,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-            {
-                'name': 'SIRI COMPLEX, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM'],
-                    'TOMORROW': ['2:00 PM','6:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM']
-                }
-            },
-             {
-                'name': 'M G B, NELLORE',
-                'price': 300,
-                'timings_by_day': {
-                    'TODAY': ['6:00 AM','8:00 AM', '12:00 PM', '6:00 PM'],
-                    'TOMORROW': ['7:00 AM','6:00 PM','10:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM','10:00 PM']
-                }
-            },
-            {
-                'name': 'P.V.R, Hyderabad',
-                'price': 220,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM'],
-                    'TOMORROW': ['2:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM']
-                }
-            }
-        ]
-    },
-    {
-        'title': 'HIT 3',
-        'poster_filename': 'hit3.jpg',
-        'teaser_url': 'https://www.youtube.com/embed/XhW3i2f54BQ',
-        'theaters': [
-            {
-                'name': 'M1 CINEMA, NELLORE',
-                'price': 250,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-            {
-                'name': 'SIRI COMPLEX, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM'],
-                    'TOMORROW': ['2:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM']
-                }
-            },
-            {
-                'name': 'MANASA, KAVALI',
-                'price': 220,
-                'timings_by_day': {
-                    'TODAY': ['7:00 AM', '12:00 PM', '4:00 PM', '10:10 PM'],
-                    'TOMORROW': ['7:00 AM', '12:00 PM', '6:30 PM'],
-                    'DAY OF TOMORROW': ['11:00 AM', '6:50 PM']
-                }
-            },
-            {
-                'name': 'M GB, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-            {
-                'name': 'P.V.R, Hyderabad',
-                'price': 220,
-                'timings_by_day': {
-                   'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            }
-        ]
-    }
-]
+# Titles, theaters, prices and showtimes live in movies.json; edits are picked up without a restart
+catalog = Catalog(os.path.join(basedir, 'movies.json'))
+HOME_PAGE_SIZE = 12 # Movie cards per home1 page
+SUGGEST_LIMIT = 8   # Autocomplete entries per /search/suggest response
 
 # IMPORTANT: Replace with your actual Gmail and App Password
 # For security, consider using environment variables for these
 EMAIL_ADDRESS = 'your_email@gmail.com' # Replace with your Gmail address
 EMAIL_PASSWORD = 'your_gmail_app_password' # Replace with your Gmail App Password
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 465 # Implicit TLS
+
+HOLD_TTL_SECONDS = 5 * 60 # How long selected seats stay reserved while the user pays
+# Free-seat runs of recently viewed shows, for the best-available picker on select_seats.html
+seat_allocator = SeatAllocator()
+
+# Bump whenever generate_ticket_pdf's layout changes so cached PDFs are re-rendered
+TICKET_TEMPLATE_VERSION = 5
+ticket_cache = TicketPdfCache(os.path.join(app.instance_path, 'ticket_cache'), TICKET_TEMPLATE_VERSION)
+
+# Rendered payment QR images, served with ETags
+qr_cache = QrImageCache()
+
+OUTBOX_WORKERS = 4        # Concurrent ticket deliveries per process
+OUTBOX_LEASE_SECONDS = 300 # A claimed job not finished by then is assumed lost and retried
+
+# Logged-in SMTP sessions reused across ticket emails; one per outbox worker
+smtp_pool = SmtpPool(SMTP_HOST, SMTP_PORT, EMAIL_ADDRESS, EMAIL_PASSWORD, size=OUTBOX_WORKERS)
+
+# Logged-in user records, memoized per request and cached for a minute per process
+user_cache = UserCache(ttl=60)
+
+# Posters decoded and downsampled once, reused by every ticket render
+poster_cache = PosterCache(os.path.join(basedir, 'static'))
+catalog.on_reload(poster_cache.refresh) # Re-scaled when the catalog changes
 
 # --- Helper Functions ---
+def load_cached_user(email):
+    user = User.query.filter_by(email=email).first()
+    return CachedUser(user.id, user.email, user.name) if user else None
+
 def get_current_user():
+    # Returns a read-only CachedUser; load the User row itself to change it
     if 'email' in session:
-        return User.query.filter_by(email=session['email']).first()
+        return user_cache.get(session['email'], load_cached_user)
     return None
 
-def get_user_bookings(email):
-    return Booking.query.filter_by(user_email=email).all()
+# Continuation tokens for booking history pages
+page_tokens = PageTokens(app.secret_key)
+
+def history_reader(model, email):
+    """read(after, n) over one booking table for read_tiered_page; keys are [created_at, id]."""
+    def read(after, n):
+        query = model.query.with_entities( # Only the columns the history lists
+            model.id, model.booking_id, model.movie, model.theater, model.time,
+            model.seats, model.price, model.created_at, model.show_id, model.starts_at
+        ).filter(model.user_email == email)
+        if after:
+            query = query.filter(tuple_(model.created_at, model.id) < tuple(after))
+        return query.order_by(model.created_at.desc(), model.id.desc()).limit(n).all()
+    return read
+
+def get_user_bookings(email, limit, token=None):
+    """One page of a user's bookings, newest first. Returns (bookings, next_token or None).
+
+    Bookings still in Booking come first; ArchivedBooking is only queried once they run out.
+    Raises ValueError for a token that wasn't issued to this user.
+    """
+    position = page_tokens.loads(email, token) if token else None
+    tiers = [('recent', history_reader(Booking, email)), ('archive', history_reader(ArchivedBooking, email))]
+    rows, next_position = read_tiered_page(tiers, position, limit, key=lambda row: [row.created_at, row.id])
+    return rows, page_tokens.dumps(email, next_position) if next_position else None
+
+def find_booking(booking_id, user_email=None):
+    """A Booking, or the ArchivedBooking once its show has been archived; None if neither exists."""
+    for model in (Booking, ArchivedBooking):
+        query = model.query.filter_by(booking_id=booking_id)
+        if user_email:
+            query = query.filter_by(user_email=user_email)
+        booking = query.first()
+        if booking:
+            return booking
+    return None
 
-def email_ticket_pdf(to_email, pdf_buffer, booking):
+def archive_past_bookings(now=None, batch_size=ARCHIVE_BATCH_SIZE):
+    """Moves bookings for shows that have ended into ArchivedBooking, with their seat rows dropped.
+
+    Each batch is copied and deleted in one transaction, so a booking is always in exactly
+    one of the two tables. Returns the number of bookings moved.
+    """
+    shows_before, booked_before = archive_cutoffs(now)
+    due = or_(
+        Booking.starts_at < shows_before,
+        and_(Booking.starts_at.is_(None), Booking.created_at < booked_before)
+    )
+    moved = 0
+    while True:
+        batch = Booking.query.with_entities(Booking.id, Booking.show_id).filter(due).limit(batch_size).all()
+        if not batch:
+            return moved
+        ids = [row.id for row in batch]
+        columns = [getattr(Booking, name) for name in ARCHIVED_COLUMNS]
+        db.session.execute(
+            insert(ArchivedBooking).from_select(
+                list(ARCHIVED_COLUMNS) + ['archived_at'],
+                select(*columns, literal(time.time())).where(Booking.id.in_(ids))
+            ).prefix_with('OR IGNORE') # Already archived by another process: its copy stands
+        )
+        db.session.execute(delete(BookingSeat).where(
+            BookingSeat.booking_id.in_(select(Booking.booking_id).where(Booking.id.in_(ids)))))
+        db.session.execute(delete(Booking).where(Booking.id.in_(ids)))
+        # Past shows are no longer listed, so their counters go too
+        db.session.execute(delete(ShowSales).where(ShowSales.show_id.in_(list({row.show_id for row in batch}))))
+        db.session.commit()
+        for show_id in {row.show_id for row in batch}:
+            occupancy_cache.invalidate(show_id)
+        moved += len(ids)
+
+def get_show_seat_map(show_id):
+    # Index-only read of this show's seat rows (uq_booking_seat_show_seat)
+    rows = BookingSeat.query.with_entities(BookingSeat.seat).filter_by(show_key=show_id).all()
+    return SeatMap.from_seat_strings(row.seat for row in rows)
+
+def get_show_availability(show_ids):
+    """{show_id: ShowAvailability} for every given show, from one IN query on the ShowSales counters."""
+    show_ids = list(set(show_ids))
+    sold = {}
+    if show_ids:
+        sold = dict(db.session.query(ShowSales.show_id, ShowSales.sold).filter(ShowSales.show_id.in_(show_ids)))
+    return {show_id: show_availability(sold.get(show_id, 0)) for show_id in show_ids}
+
+def get_held_seat_map(key, exclude_email=None):
+    # Seats under an unexpired hold, optionally ignoring the current user's own holds
+    query = SeatHold.query.with_entities(SeatHold.seat).filter(
+        SeatHold.show_key == key, SeatHold.expires_at > time.time()
+    )
+    if exclude_email:
+        query = query.filter(SeatHold.user_email != exclude_email)
+    return SeatMap.from_seat_strings(row.seat for row in query)
+
+def get_show_occupancy(show_id):
+    """Returns (booked, held) SeatMaps for a show, served from the shared occupancy cache when possible."""
+    cached = occupancy_cache.get(show_id)
+    if cached:
+        return cached[1], cached[2]
+
+    version = occupancy_cache.version
+    booked = get_show_seat_map(show_id)
+    holds = SeatHold.query.with_entities(SeatHold.seat, SeatHold.expires_at).filter(
+        SeatHold.show_key == show_id, SeatHold.expires_at > time.time()
+    ).all()
+    held = SeatMap.from_seat_strings(h.seat for h in holds)
+    # The entry must be reloaded once the earliest hold expires
+    occupancy_cache.put(show_id, booked, held, min((h.expires_at for h in holds), default=0.0), if_version=version)
+    return booked, held
+
+def get_unavailable_seats(show_id):
+    """SeatMap of the show's booked and held seats, except the seats the current user is holding."""
+    booked, held = get_show_occupancy(show_id)
+    own_hold = session.get('seat_hold') or {}
+    if own_hold.get('show_key') == show_id and own_hold['expires_at'] > time.time():
+        held = SeatMap(held.bits & ~seat_mask(own_hold['seats']))
+    return booked | held
+
+def best_available(show, n):
+    """The best block of n adjacent free seats for a show (see seat_allocator.py), or [] if there is none."""
+    return seat_allocator.best_available(show.show_id, get_unavailable_seats(show.show_id), n)
+
+def purge_expired_holds(now):
+    # Range delete on ix_seat_hold_expires_at; never scans live holds
+    SeatHold.query.filter(SeatHold.expires_at <= now).delete(synchronize_session=False)
+
+def place_seat_hold(key, seats, email):
+    """Holds seats of show `key` (its show_id) for HOLD_TTL_SECONDS.
+
+    Returns (hold_id, taken_seats); hold_id is None if any seat is taken.
+    """
+    now = time.time()
+    purge_expired_holds(now)
+    # A new selection replaces whatever this user was holding for the show
+    replaced = SeatHold.query.filter_by(show_key=key, user_email=email).delete(synchronize_session=False)
+
+    taken = get_show_seat_map(key).conflicts(seats)
+    if taken:
+        db.session.rollback()
+        occupancy_cache.invalidate(key) # The cached map showed these seats as free
+        return None, taken
+
+    hold_id = str(uuid.uuid4())
+    expires_at = now + HOLD_TTL_SECONDS
+    db.session.add_all([
+        SeatHold(hold_id=hold_id, show_key=key, seat=seat, user_email=email, expires_at=expires_at)
+        for seat in SeatMap(seat_mask(seats)).occupied_seats()
+    ])
     try:
-        msg = EmailMessage()
-        msg['Subject'] = '🎟️ Your Movie Magic Ticket!'
-        msg['From'] = EMAIL_ADDRESS
-        msg['To'] = to_email
-        msg.set_content(f"""
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        occupancy_cache.invalidate(key)
+        return None, get_held_seat_map(key, exclude_email=email).conflicts(seats) or list(seats)
+    if replaced:
+        occupancy_cache.invalidate(key) # Previously held seats were released
+    else:
+        occupancy_cache.add_held(key, seat_mask(seats), expires_at)
+    return hold_id, []
+
+def migrate_booking_created_at():
+    """Adds Booking.created_at to databases created before it existed."""
+    if 'created_at' not in {c['name'] for c in inspect(db.engine).get_columns('booking')}:
+        db.session.execute(text('ALTER TABLE booking ADD COLUMN created_at FLOAT'))
+    # Older bookings sort before every new one, in insertion (id) order among themselves
+    db.session.execute(text('UPDATE booking SET created_at = 0 WHERE created_at IS NULL'))
+    db.session.execute(text('DROP INDEX IF EXISTS ix_booking_user_email')) # Superseded by ix_booking_user_created
+    db.session.commit()
+
+def migrate_booking_show_ids():
+    """Moves bookings, seat rows and holds from movie#theater#time keys to show IDs.
+
+    This app never recorded which day a booking was for, so older bookings can't be placed
+    on a dated show; each old key becomes a legacy show ID of its own, keeping them
+    grouped exactly as before. Those shows are not in the catalog and can't be booked.
+    """
+    columns = {c['name'] for c in inspect(db.engine).get_columns('booking')}
+    if 'show_id' not in columns:
+        db.session.execute(text('ALTER TABLE booking ADD COLUMN show_id VARCHAR(40)'))
+    if 'starts_at' not in columns:
+        db.session.execute(text('ALTER TABLE booking ADD COLUMN starts_at DATETIME'))
+    legacy_shows = db.session.query(Booking.movie, Booking.theater, Booking.time).filter(
+        Booking.show_id.is_(None)).distinct().all()
+    for movie, theater, time_slot in legacy_shows:
+        Booking.query.filter_by(movie=movie, theater=theater, time=time_slot, show_id=None).update(
+            {'show_id': legacy_show_id(movie, theater, time_slot)}, synchronize_session=False)
+    # Seat rows follow their booking; show IDs never contain '#', the old keys always do
+    db.session.execute(text(
+        "UPDATE booking_seat SET show_key = (SELECT show_id FROM booking WHERE booking.booking_id = booking_seat.booking_id) "
+        "WHERE show_key LIKE '%#%'"))
+    SeatHold.query.filter(SeatHold.show_key.like('%#%')).delete(synchronize_session=False) # Short-lived anyway
+    db.session.execute(text('DROP INDEX IF EXISTS ix_booking_show')) # Superseded by ix_booking_show_id
+    db.session.commit()
+    print(f"Assigned legacy show IDs to {len(legacy_shows)} undated shows.")
+
+def migrate_database():
+    """Creates new tables, columns and indexes, then backfills seat rows for existing bookings."""
+    db.create_all()
+    migrate_booking_created_at()
+    migrate_booking_show_ids()
+    for index in Booking.__table__.indexes:
+        index.create(db.engine, checkfirst=True) # create_all() skips indexes on tables that already exist
+
+    migrated = db.session.query(BookingSeat.booking_id).distinct()
+    unseated = db.session.query(UnseatedBooking.booking_id)
+    pending_query = Booking.query.filter(Booking.booking_id.not_in(migrated), Booking.booking_id.not_in(unseated))
+    pending = pending_query.all()
+    rows = [
+        {'booking_id': b.booking_id, 'show_key': b.show_id,
+         'seat': seat, 'user_email': b.user_email}
+        for b in pending
+        for seat in SeatMap.from_seat_strings([b.seats]).occupied_seats()
+    ]
+    inserted = 0
+    if rows:
+        # Legacy data may already contain double-bookings; the first booking keeps the seat
+        inserted = db.session.execute(insert(BookingSeat.__table__).prefix_with('OR IGNORE'), rows).rowcount # Core insert: the ORM one has no rowcount
+    # Bookings still without seat rows lost every seat (or had none); record them once
+    now = time.time()
+    lost = [UnseatedBooking(booking_id=b.booking_id, seats=b.seats, recorded_at=now) for b in pending_query.all()]
+    db.session.add_all(lost)
+    # Recount the per-show counters from the seat rows, which also covers bookings made before ShowSales
+    db.session.execute(delete(ShowSales))
+    db.session.execute(insert(ShowSales).from_select(
+        ['show_id', 'sold'],
+        select(BookingSeat.show_key, db.func.count()).group_by(BookingSeat.show_key)
+    ))
+    db.session.commit()
+    occupancy_cache.clear() # Cached seat maps predate the migrated rows
+    print(f"Backfilled {inserted} BookingSeat rows for {len(pending)} bookings; "
+          f"{len(rows) - inserted} seats were already taken by earlier bookings.")
+    if lost:
+        print(f"WARNING: {len(lost)} bookings got no seats; recorded in unseated_booking: "
+              f"{', '.join(b.booking_id for b in lost[:20])}{' ...' if len(lost) > 20 else ''}")
+
+class SqlOutboxStore:
+    """OutboxJob rows as the store for OutboxWorkerPool; methods need an app context."""
+
+    def enqueue(self, kind, payload, commit=True):
+        # commit=False adds the job to the current transaction, so it is saved with the booking or not at all
+        now = time.time()
+        job = OutboxJob(kind=kind, payload=json.dumps(payload), created_at=now, next_attempt_at=now)
+        db.session.add(job)
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush() # Assigns the id
+        return job.id
+
+    def claim(self, now):
+        # Due pending jobs, plus claimed jobs whose worker died (lease expired)
+        candidates = OutboxJob.query.filter(or_(
+            and_(OutboxJob.status == 'pending', OutboxJob.next_attempt_at <= now),
+            and_(OutboxJob.status == 'claimed', OutboxJob.claimed_at < now - OUTBOX_LEASE_SECONDS)
+        )).order_by(OutboxJob.next_attempt_at).limit(OUTBOX_WORKERS).all()
+        for job in candidates:
+            # Compare-and-set so only one worker (in any process) wins the job
+            unchanged = OutboxJob.claimed_at.is_(None) if job.claimed_at is None else OutboxJob.claimed_at == job.claimed_at
+            result = db.session.execute(
+                update(OutboxJob)
+                .where(OutboxJob.id == job.id, OutboxJob.status == job.status, unchanged)
+                .values(status='claimed', claimed_at=now)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return {'id': job.id, 'kind': job.kind, 'payload': json.loads(job.payload),
+                        'attempts': job.attempts, 'created_at': job.created_at}
+        return None
+
+    def complete(self, job):
+        OutboxJob.query.filter_by(id=job['id']).delete(synchronize_session=False)
+        db.session.commit()
+
+    def retry(self, job, next_attempt_at, error):
+        OutboxJob.query.filter_by(id=job['id']).update({
+            'status': 'pending', 'attempts': job['attempts'], 'next_attempt_at': next_attempt_at,
+            'claimed_at': None, 'last_error': error
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def fail(self, job, error):
+        OutboxJob.query.filter_by(id=job['id']).update({
+            'status': 'failed', 'attempts': job['attempts'], 'last_error': error
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def depth(self):
+        return OutboxJob.query.filter(OutboxJob.status != 'failed').count()
+
+def deliver_ticket_email(payload):
+    booking = find_booking(payload['booking_id'])
+    if not booking:
+        print(f"Outbox: booking {payload['booking_id']} no longer exists, skipping ticket email")
+        return
+    # The ticket's QR code links back to the site, so render with the booking request's host
+    with app.test_request_context(base_url=payload['base_url']):
+        pdf_buffer = ticket_cache.get_or_render(booking.booking_id, lambda: generate_ticket_pdf(booking))
+    email_ticket_pdf(payload['to'], pdf_buffer, booking)
+
+def build_ticket_email(to_email, pdf_buffer, booking):
+    msg = EmailMessage()
+    msg['Subject'] = '🎟️ Your Movie Magic Ticket!'
+    msg['From'] = EMAIL_ADDRESS
+    msg['To'] = to_email
+    msg.set_content(f"""
 Hello there,
 
 Your movie ticket details:
 
 🎬 Movie: {booking.movie}
 🎭 Theater: {booking.theater}
+📅 Date: {format_show_date(booking.starts_at) or 'N/A'}
 🕒 Time: {booking.time}
 💺 Seats: {booking.seats}
 💸 Total Price: ₹{booking.price}
@@ -220,25 +525,23 @@ Please find your ticket attached. Enjoy the show!
 Best regards,
 Movie Magic Team
 """)
-        
-        pdf_buffer.seek(0)
-        msg.add_attachment(pdf_buffer.read(), maintype='application', subtype='pdf', filename=f'ticket_{booking.booking_id}.pdf')
-        
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            smtp.send_message(msg)
+
+    pdf_buffer.seek(0)
+    msg.add_attachment(pdf_buffer.read(), maintype='application', subtype='pdf', filename=f'ticket_{booking.booking_id}.pdf')
+    return msg
+
+def email_ticket_pdf(to_email, pdf_buffer, booking):
+    try:
+        smtp_pool.send(build_ticket_email(to_email, pdf_buffer, booking))
         print(f"Ticket email sent successfully to {to_email} for booking {booking.booking_id}")
     except Exception as e:
         print(f"Error sending email to {to_email}: {e}")
         traceback.print_exc() # Log full traceback for more detailed debugging
+        raise # The outbox retries the delivery later
 
 def generate_ticket_pdf(booking):
-    movie = next((m for m in MOVIES if m['title'] == booking.movie), None)
-    
-    # Ensure poster_path is correctly constructed and checked
-    poster_path = None
-    if movie and movie.get('poster_filename'):
-        poster_path = os.path.join(basedir, "static", movie['poster_filename']) # Use basedir for absolute path
+    movie = catalog.movie(booking.movie)
+    poster = poster_cache.get(movie.get('poster_filename')) if movie else None
 
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=A4)
@@ -256,16 +559,15 @@ def generate_ticket_pdf(booking):
     p.setFont("Helvetica-Bold", 22)
     p.drawCentredString(A4[0] / 2, 785, "🎟 Movie Magic - Your Ticket")
 
-    # Movie Poster
-    if poster_path and os.path.exists(poster_path):
+    # Movie Poster (pre-scaled to the draw box by poster_cache)
+    if poster:
         try:
-            p.drawImage(poster_path, 50, 570, width=120, height=170)
-            print(f"Successfully loaded and drew image: {poster_path}")
+            poster.draw(p, 50, 570, *POSTER_BOX)
         except Exception as e:
-            print(f"Error loading or drawing image {poster_path}: {e}")
+            print(f"Error drawing poster for {booking.movie}: {e}")
             traceback.print_exc() # Log traceback for image errors
     else:
-        print(f"Poster not found or path invalid for {booking.movie}: {poster_path}")
+        print(f"No poster available for {booking.movie}")
 
     # Booking Details
     p.setFont("Helvetica", 14)
@@ -276,6 +578,7 @@ def generate_ticket_pdf(booking):
         f"Booking ID: {booking.booking_id}",
         f"Movie: {booking.movie}",
         f"Theater: {booking.theater}",
+        f"Date: {format_show_date(booking.starts_at) or 'N/A'}",
         f"Time: {booking.time}",
         f"Seats: {booking.seats}",
         f"Price: ₹{booking.price}"
@@ -290,14 +593,9 @@ def generate_ticket_pdf(booking):
     p.setLineWidth(1)
     p.line(50, 550, A4[0]-50, 550)
 
-    # QR code for viewing ticket online
+    # QR code for viewing ticket online, drawn as vector modules
     qr_url = url_for('view_ticket', booking_id=booking.booking_id, _external=True)
-    qr_img = qrcode.make(qr_url)
-    qr_buffer = BytesIO()
-    qr_img.save(qr_buffer, format="PNG")
-    qr_buffer.seek(0)
-
-    p.drawImage(ImageReader(qr_buffer), 50, 370, width=150, height=150)
+    draw_qr(p, qr_url, 50, 370, 150)
 
     p.setFont("Helvetica-Oblique", 12)
     p.drawString(220, 470, "Scan this QR code to view your ticket online.")
@@ -312,6 +610,24 @@ def generate_ticket_pdf(booking):
     buffer.seek(0)
     return buffer
 
+# Ticket emails go through the outbox: a fixed pool of workers, retried with backoff
+outbox_store = SqlOutboxStore()
+outbox_pool = OutboxWorkerPool(
+    outbox_store, {'ticket_email': deliver_ticket_email},
+    workers=OUTBOX_WORKERS, context=app.app_context
+)
+
+# Moves bookings for ended shows to booking_archive in the background
+archiver = ArchiveScheduler(archive_past_bookings, context=app.app_context)
+
+
+@app.before_request
+def start_background_workers():
+    # Every server process runs its own workers (gunicorn workers included), so queued
+    # deliveries left by a restart don't wait for the next booking. No-op once running.
+    outbox_pool.start()
+    archiver.start()
+
 # --- Routes ---
 @app.route('/')
 def index():
@@ -354,6 +670,7 @@ def reset_password():
         if user:
             user.password = new_password
             db.session.commit()
+            user_cache.invalidate(email)
             flash("Password reset successful. Please login.")
             return redirect(url_for('login'))
         else:
@@ -370,6 +687,7 @@ def login():
 
         if user and check_password_hash(user.password, password):
             session['email'] = email
+            user_cache.put(email, CachedUser(user.id, user.email, user.name)) # The next page needs it
             flash(f"Welcome back, {user.name or user.email}!")
             return redirect(url_for('home1'))
         flash("Invalid email or password. Please try again.")
@@ -388,19 +706,44 @@ def home1():
         return redirect(url_for('login'))
 
     location_query = request.args.get('location', '').strip().lower()
-    filtered_movies = []
-
-    if location_query:
-        for movie in MOVIES:
-            if any(location_query in t['name'].lower() for t in movie['theaters']):
-                filtered_movies.append(movie)
-        if not filtered_movies:
-            flash(f"No movies found for '{location_query}'. Showing all movies instead.")
-            filtered_movies = MOVIES
-    else:
-        filtered_movies = MOVIES
-
-    return render_template('home1.html', movies=filtered_movies, location=location_query)
+    title_query = request.args.get('q', '').strip()
+
+    result = catalog.search(title=title_query, location=location_query)
+    filtered_movies = result.movies
+    if not filtered_movies:
+        flash(f"No movies found for '{location_query or title_query}'. Showing all movies instead.")
+        filtered_movies = catalog.movies()
+        result = result._replace(theaters=None)
+    page = paginate(filtered_movies, request.args.get('page'), HOME_PAGE_SIZE)
+    # Each card's next show (at the searched location, if any) with its seats left, read in one query
+    now = datetime.now()
+    next_shows = {movie['title']: catalog.next_show(movie['title'], result.theaters, after=now) for movie in page.items}
+    availability = get_show_availability(show.show_id for show in next_shows.values() if show)
+
+    return render_template('home1.html', movies=page.items, location=location_query, query=title_query,
+                           page=page.page, pages=page.pages, total=page.total,
+                           next_shows=next_shows, availability=availability)
+
+@app.route('/shows')
+def upcoming_shows():
+    # Shows starting within the next ?hours= (default 6, 0 to a week), optionally in one ?city=
+    try:
+        hours = float(request.args.get('hours', 6))
+    except ValueError:
+        hours = math.nan
+    if not math.isfinite(hours):
+        return jsonify({'error': 'hours must be a number'}), 400
+    hours = min(max(hours, 0), SCHEDULE_DAYS * 24) # No shows are listed further ahead
+    now = datetime.now()
+    shows = catalog.shows_between(now, now + timedelta(hours=hours), city=request.args.get('city') or None)
+    return jsonify({'shows': [show.to_dict() for show in shows]})
+
+@app.route('/search/suggest')
+def search_suggest():
+    # Autocomplete for home1's search boxes: ?q=<typed text>&kind=title|location
+    kinds = {'title': ('title',), 'location': ('city', 'theater')}.get(request.args.get('kind'), SUGGESTION_KINDS)
+    prefix = request.args.get('q', '').strip()
+    return jsonify({'query': prefix, 'suggestions': catalog.suggest(prefix, kinds, limit=SUGGEST_LIMIT) if prefix else []})
 
 @app.route('/booking_form')
 def booking_form():
@@ -411,7 +754,7 @@ def booking_form():
     title = request.args.get('title')
     location = request.args.get('location', '').strip().lower()
 
-    movie = next((m for m in MOVIES if m['title'] == title), None)
+    movie = catalog.movie(title)
     if not movie:
         flash("Movie not found.")
         return redirect(url_for('home1'))
@@ -420,84 +763,118 @@ def booking_form():
         t for t in movie['theaters']
         if location in t['name'].lower() or not location
     ]
+    # Shows that haven't started yet, grouped into one tab per date
+    now = datetime.now()
+    schedule = shows_by_day((t, catalog.shows_for(title, t['name'], after=now)) for t in filtered_theaters)
+    availability = get_show_availability(
+        show.show_id for _, theater_shows in schedule for _, shows in theater_shows for show in shows)
 
     return render_template(
         'booking_form.html',
         movie=movie,
-        theaters=filtered_theaters,
+        schedule=schedule,
+        availability=availability,
         selected_location=location)
 
+def find_bookable_show(show_id):
+    """The catalog Show for show_id if it can still be booked; otherwise flashes why and returns None."""
+    show = catalog.show(show_id)
+    if not show:
+        flash("Show not found.")
+    elif show.starts_at <= datetime.now():
+        flash("Sorry, this show has already started.")
+        show = None
+    return show
+
 @app.route('/select_seats')
 def select_seats():
     if 'email' not in session:
         flash("Please log in to select seats.")
         return redirect(url_for('login'))
 
-    title = request.args.get('title')
-    theater_name = request.args.get('theater')
-    time_slot = request.args.get('time')
-
-    movie = next((m for m in MOVIES if m['title'] == title), None)
-    if not movie:
-        flash("Movie not found.")
+    show = find_bookable_show(request.args.get('show'))
+    if not show:
         return redirect(url_for('home1'))
 
-    theater = next((t for t in movie['theaters'] if t['name'] == theater_name), None)
-    if not theater:
-        flash("Theater not found for this movie.")
-        return redirect(url_for('home1'))
-
-    # Retrieve all existing bookings for this movie, theater, and time
-    occupied_bookings = Booking.query.filter_by(
-        movie=title, theater=theater_name, time=time_slot
-    ).all()
-
-    occupied_seats = []
-    for b in occupied_bookings:
-        if b.seats:
-            occupied_seats.extend(b.seats.split(',')) # Split the comma-separated string
+    # Occupancy bitmap for this show, served from the shared cache
+    occupied_seats = get_unavailable_seats(show.show_id).occupied_seats()
 
     return render_template(
         'select_seats.html',
-        movie=movie,
-        selected_theater=theater_name,
-        selected_time=time_slot,
-        selected_price=theater['price'],
-        occupied_seats=occupied_seats # Pass the list of occupied seats to the template
+        movie=catalog.movie(show.movie),
+        show=show,
+        occupied_seats=occupied_seats, # Pass the list of occupied seats to the template
+        max_seats=MAX_SEATS_PER_BOOKING
     )
 
+@app.route('/best_available')
+def best_available_seats():
+    # The best ?seats= adjacent free seats of ?show=, which select_seats.html selects in one click
+    if 'email' not in session:
+        return jsonify({'error': 'Please log in to select seats.'}), 401
+    show = catalog.show(request.args.get('show'))
+    if not show or show.starts_at <= datetime.now():
+        return jsonify({'error': 'Show not found or already started.'}), 404
+    try:
+        n = int(request.args.get('seats', 2))
+    except ValueError:
+        return jsonify({'error': 'seats must be a number'}), 400
+    if not 1 <= n <= MAX_SEATS_PER_BOOKING:
+        return jsonify({'error': f'seats must be between 1 and {MAX_SEATS_PER_BOOKING}'}), 400
+    return jsonify({'show': show.show_id, 'seats': best_available(show, n)})
+
 @app.route('/confirm_ticket', methods=['POST'])
 def confirm_ticket():
     if 'email' not in session:
         flash("Please log in to confirm your ticket.")
         return redirect(url_for('login'))
 
-    movie_title = request.form['movie']
-    selected_time = request.form['time']
-    theater = request.form['theater']
-    seat_price = int(request.form['price'])
+    show = find_bookable_show(request.form.get('show'))
+    if not show:
+        return redirect(url_for('home1'))
+    seat_price = show.price # From the catalog, not the form
     
     # FIX: Changed 'seats_selected' to 'seats' to match the 'name' attribute in select_seats.html
     seats_str = request.form.get('seats', '') 
 
-    selected_seats = [seat.strip() for seat in seats_str.split(',') if seat.strip()]
-    
+    try:
+        selected_seats = canonical_seats(seats_str)
+    except ValueError as e:
+        flash(f"Invalid seat selection: {e}")
+        return redirect(url_for('select_seats', show=show.show_id))
+
     if not selected_seats:
         flash("No seats selected. Please select at least one seat.")
         # Redirect back to select_seats with relevant info to repopulate the form
-        return redirect(url_for('select_seats', title=movie_title, theater=theater, time=selected_time))
+        return redirect(url_for('select_seats', show=show.show_id))
+    if len(selected_seats) > MAX_SEATS_PER_BOOKING:
+        flash(f"You can book at most {MAX_SEATS_PER_BOOKING} seats at a time.")
+        return redirect(url_for('select_seats', show=show.show_id))
+
+    # Reserve the seats while the user pays so nobody else can pick them meanwhile
+    hold_id, taken = place_seat_hold(show.show_id, selected_seats, session['email'])
+    if taken:
+        flash(f"Sorry, seat {taken[0]} is no longer available. Please select different seats.")
+        return redirect(url_for('select_seats', show=show.show_id))
+    session['seat_hold'] = {
+        'hold_id': hold_id,
+        'show_key': show.show_id,
+        'seats': selected_seats,
+        'expires_at': time.time() + HOLD_TTL_SECONDS
+    }
 
     seat_count = len(selected_seats)
     total_price = seat_count * seat_price
 
-    movie_data = next((m for m in MOVIES if m['title'] == movie_title), None)
+    movie_data = catalog.movie(show.movie)
     poster = movie_data['poster_filename'] if movie_data else "default_poster.jpg"
 
     return render_template(
         'confirm_payment.html',
-        movie=movie_title,
-        theater=theater,
-        time=selected_time,
+        show=show,
+        movie=show.movie,
+        theater=show.theater,
+        time=show.time,
         seats=selected_seats, # Pass as list to the template for display
         seat_count=seat_count,
         total_price=total_price,
@@ -514,54 +891,88 @@ def finalize_booking():
         print("DEBUG: Redirecting to login (user not in session)") # Added print
         return redirect(url_for('login'))
 
-    movie_title = request.form['movie']
-    theater = request.form['theater']
-    time_slot = request.form['time']
-    seat_price = int(request.form['seat_price'])
-    seats_raw = request.form.get('seats', '')
-    selected_seats = [s.strip() for s in seats_raw.split(',') if s.strip()]
+    show = find_bookable_show(request.form.get('show'))
+    if not show:
+        print("DEBUG: Redirecting (show unknown or already started)") # Added print
+        return redirect(url_for('home1'))
+    seats_raw = ','.join(request.form.getlist('seats')) # confirm_payment.html posts one field per seat
+    try:
+        # Grid labels, each once: 'A3,a3' is one seat and is charged once
+        selected_seats = canonical_seats(seats_raw)
+    except ValueError as e:
+        flash(f"Invalid seat selection: {e}")
+        print(f"DEBUG: Redirecting (invalid seats '{seats_raw}')") # Added print
+        return redirect(url_for('select_seats', show=show.show_id))
     print(f"DEBUG: Received seats_raw: '{seats_raw}', processed selected_seats: {selected_seats}") # Added print
 
     if not selected_seats:
         flash("No seats selected. Please go back and select seats.")
         print("DEBUG: Redirecting (no seats selected)") # Added print
-        return redirect(url_for('select_seats', title=movie_title, theater=theater, time=time_slot))
-
-    # Re-check for occupied seats just before finalization to prevent double-booking
-    existing_bookings = Booking.query.filter_by(
-        movie=movie_title, theater=theater, time=time_slot
-    ).all()
-    
-    occupied_seats_at_finalization = []
-    for b in existing_bookings:
-        if b.seats:
-            occupied_seats_at_finalization.extend(b.seats.split(','))
-    print(f"DEBUG: Occupied seats from DB: {occupied_seats_at_finalization}") # Added print
-
-    for seat in selected_seats:
-        if seat in occupied_seats_at_finalization:
-            flash(f"Oops! Seat {seat} was just booked by someone else. Please select different seats.")
-            print(f"DEBUG: Redirecting (seat {seat} was just booked by someone else)") # Added print
-            return redirect(url_for('select_seats', title=movie_title, theater=theater, time=time_slot))
-
-    # If we reach here, seats are available, proceed with booking
+        return redirect(url_for('select_seats', show=show.show_id))
+    if len(selected_seats) > MAX_SEATS_PER_BOOKING: # confirm_ticket checks too, but this route can be posted to directly
+        flash(f"You can book at most {MAX_SEATS_PER_BOOKING} seats at a time.")
+        print("DEBUG: Redirecting (too many seats)") # Added print
+        return redirect(url_for('select_seats', show=show.show_id))
+
+    # Seats are claimed by inserting BookingSeat rows; the unique (show_key, seat)
+    # constraint rejects double-bookings at commit time, so no pre-read is needed.
     booking_id = str(uuid.uuid4())
-    total_price = str(len(selected_seats) * seat_price)
+    total_price = str(len(selected_seats) * show.price)
 
     new_booking = Booking(
         booking_id=booking_id,
         user_email=session['email'],
-        movie=movie_title,
-        theater=theater,
-        time=time_slot,
+        movie=show.movie,
+        theater=show.theater,
+        time=show.time,
         price=total_price,
-        seats=",".join(selected_seats) # Store as comma-separated string
+        seats=",".join(selected_seats), # Store as comma-separated string
+        created_at=time.time(),
+        show_id=show.show_id,
+        starts_at=show.starts_at
     )
+    key = show.show_id
+    selected_mask = seat_mask(selected_seats)
+    seat_rows = [
+        BookingSeat(booking_id=booking_id, show_key=key, seat=seat, user_email=session['email'])
+        for seat in SeatMap(selected_mask).occupied_seats()
+    ]
     print(f"DEBUG: New booking object created: {new_booking.booking_id}") # Added print
+
+    # Convert the seat hold into the booking. Only if the hold expired (or never existed)
+    # do we need to make sure nobody else is holding these seats right now.
+    hold_id = (session.pop('seat_hold', None) or {}).get('hold_id')
+    hold_query = SeatHold.query.filter_by(hold_id=hold_id, user_email=session['email'])
+    held = SeatMap.from_seat_strings(
+        row.seat for row in hold_query.with_entities(SeatHold.seat).filter(SeatHold.expires_at > time.time())
+    )
+    if held.bits & selected_mask != selected_mask:
+        held_by_others = get_held_seat_map(key, exclude_email=session['email']).conflicts(selected_seats)
+        if held_by_others:
+            flash(f"Your seat hold expired and seat {held_by_others[0]} is now reserved by someone else. Please select different seats.")
+            print(f"DEBUG: Redirecting (hold expired, seats {held_by_others} held by others)") # Added print
+            return redirect(url_for('select_seats', show=show.show_id))
     try:
+        hold_query.delete(synchronize_session=False)
         db.session.add(new_booking)
+        db.session.add_all(seat_rows)
+        db.session.execute(sqlite_insert(ShowSales).values(show_id=key, sold=len(seat_rows)).on_conflict_do_update(
+            index_elements=['show_id'], set_={'sold': ShowSales.sold + len(seat_rows)}))
+        outbox_store.enqueue('ticket_email', {
+            'booking_id': booking_id, 'to': session['email'], 'base_url': request.url_root
+        }, commit=False) # Saved atomically with the booking
         db.session.commit()
+        occupancy_cache.add_booked(key, selected_mask)
+        seat_allocator.book(key, selected_seats)
         print("DEBUG: Booking successfully added to database.") # Added print
+    except IntegrityError:
+        db.session.rollback()
+        occupancy_cache.invalidate(key)
+        taken = get_show_seat_map(key).conflicts(selected_seats)
+        seat = taken[0] if taken else ", ".join(selected_seats)
+        flash(f"Oops! Seat {seat} was just booked by someone else. Please select different seats.")
+        print(f"DEBUG: Redirecting (seats {taken} were just booked by someone else)") # Added print
+        return redirect(url_for('select_seats', show=show.show_id))
     except Exception as e:
         db.session.rollback() # Important: rollback on error
         print(f"ERROR: Database commit failed: {e}") # Added print
@@ -569,20 +980,10 @@ def finalize_booking():
         flash("An unexpected error occurred during booking. Please try again.")
         return redirect(url_for('home1'))
 
+    # The ticket PDF is rendered and emailed by the outbox workers
+    outbox_pool.notify()
 
-    # Generate and send PDF in a separate thread
-    print("DEBUG: Starting PDF generation and email thread...") # Added print
-    try:
-        pdf_buffer = generate_ticket_pdf(new_booking)
-        threading.Thread(target=email_ticket_pdf, args=(session['email'], pdf_buffer, new_booking)).start()
-        print("DEBUG: PDF generation and email thread started.") # Added print
-    except Exception as e:
-        print(f"ERROR: Problem with PDF generation or email thread start: {e}")
-        traceback.print_exc()
-        flash("Booking confirmed, but there was an issue generating/sending your ticket PDF. Please check your dashboard.")
-        # Do NOT return here, still want to show confirmation page if booking saved
-
-    flash("Your booking is confirmed! A ticket has been sent to your email.")
+    flash("Your booking is confirmed! Your ticket will arrive in your email shortly.")
     print("DEBUG: Attempting to render ticket_confirmation.html") # Added print
     return render_template(
         'ticket_confirmation.html',
@@ -594,7 +995,7 @@ def view_ticket(booking_id):
         flash("Please log in to view tickets.")
         return redirect(url_for('login'))
 
-    booking = Booking.query.filter_by(booking_id=booking_id, user_email=session['email']).first()
+    booking = find_booking(booking_id, session['email'])
     if not booking:
         flash("Ticket not found or you don't have permission to view it.")
         return redirect(url_for('dashboard'))
@@ -616,14 +1017,21 @@ def profile():
     if request.method == 'POST':
         new_name = request.form.get('name', '').strip()
         new_password = request.form.get('password', '').strip()
+        account = db.session.get(User, user.id)
+        if not account: # Deleted since it was cached
+            user_cache.invalidate(user.email)
+            flash("User not found. Please log in again.")
+            session.clear()
+            return redirect(url_for('login'))
 
         if new_name:
-            user.name = new_name
+            account.name = new_name
         if new_password:
-            user.password = generate_password_hash(new_password)
+            account.password = generate_password_hash(new_password)
             flash("Password updated successfully.")
         
         db.session.commit()
+        user_cache.invalidate(user.email)
         flash("Profile updated successfully.")
         return redirect(url_for('profile'))
 
@@ -641,8 +1049,36 @@ def dashboard():
         session.clear()
         return redirect(url_for('login'))
 
-    bookings = get_user_bookings(user.email)
-    return render_template('dashboard.html', user=user, tickets=bookings, total_tickets=len(bookings))
+    try:
+        bookings, next_token = get_user_bookings(user.email, page_size(request.args.get('limit')), request.args.get('page'))
+    except ValueError:
+        return redirect(url_for('dashboard')) # Stale or edited page link: start from the newest
+    is_first_page = 'page' not in request.args
+    # Counting every booking would read the whole history, archive included; it's only known when it fits on the first page
+    total = len(bookings) if is_first_page and not next_token else None
+    return render_template(
+        'dashboard.html', user=user, tickets=bookings, total_tickets=total,
+        next_page=next_token, is_first_page=is_first_page
+    )
+
+@app.route('/booking_history')
+def booking_history():
+    # JSON pages of the logged-in user's bookings, newest first; pass next_page back as ?page=
+    if 'email' not in session:
+        return jsonify({'error': 'login required'}), 401
+    try:
+        bookings, next_token = get_user_bookings(session['email'], page_size(request.args.get('limit')), request.args.get('page'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'bookings': [
+            {'booking_id': b.booking_id, 'movie': b.movie, 'theater': b.theater, 'time': b.time,
+             'seats': b.seats, 'price': b.price, 'created_at': b.created_at, 'show_id': b.show_id,
+             'starts_at': b.starts_at.isoformat(timespec='minutes') if b.starts_at else None}
+            for b in bookings
+        ],
+        'next_page': next_token
+    })
 
 @app.route('/download_ticket/<booking_id>')
 def download_ticket(booking_id):
@@ -650,12 +1086,12 @@ def download_ticket(booking_id):
         flash("Please log in to download tickets.")
         return redirect(url_for('login'))
 
-    booking = Booking.query.filter_by(booking_id=booking_id, user_email=session['email']).first()
+    booking = find_booking(booking_id, session['email'])
     if not booking:
         flash("Booking not found or you don't have permission to download it.")
         return redirect(url_for('dashboard'))
 
-    buffer = generate_ticket_pdf(booking)
+    buffer = ticket_cache.get_or_render(booking.booking_id, lambda: generate_ticket_pdf(booking))
 
     return send_file(
         buffer,
@@ -666,16 +1102,28 @@ def download_ticket(booking_id):
 
 @app.route('/payment_qr')
 def payment_qr():
-    amount = request.args.get("amount", "0")
+    amount = normalize_amount(request.args.get("amount", "0"))
+    if amount is None:
+        return "Invalid amount", 400
     # Basic UPI string - for a real app, integrate with a payment gateway
     upi_string = f"upi://pay?pa=merchant@upi&pn=MovieMagic&am={amount}&cu=INR" 
 
-    qr_img = qrcode.make(upi_string)
-    qr_buf = BytesIO()
-    qr_img.save(qr_buf, format="PNG")
-    qr_buf.seek(0)
-
-    return send_file(qr_buf, mimetype='image/png')
+    return qr_cache.response(upi_string)
+
+@app.route('/metrics')
+def metrics():
+    # Cache counters for sizing; values are per worker process
+    return jsonify({
+        'ticket_pdf_cache': ticket_cache.stats(),
+        'occupancy_cache': occupancy_cache.stats(),
+        'qr_cache': qr_cache.stats(),
+        'catalog': catalog.stats(),
+        'outbox': outbox_pool.stats(),
+        'smtp_pool': smtp_pool.stats(),
+        'user_cache': user_cache.stats(),
+        'archiver': archiver.stats(),
+        'seat_allocator': seat_allocator.stats()
+    })
 
 # --- App Initialization ---
 def open_browser():
@@ -684,7 +1132,9 @@ def open_browser():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        migrate_database() # Runs db.create_all(), adds new columns and backfills BookingSeat rows
+    outbox_pool.start() # Also picks up deliveries left over from a previous run
+    archiver.start() # First pass right away, then every ARCHIVE_INTERVAL_SECONDS
     
     # Ensure static folder exists for posters
     if not os.path.exists(os.path.join(basedir, 'static')):
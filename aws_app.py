@@ -1,20 +1,37 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
-import boto3
-from boto3.dynamodb.conditions import Key # Import Key for DynamoDB queries
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, jsonify
+from boto3.dynamodb.conditions import Key, Attr # Import Key/Attr for DynamoDB queries and filters
+from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError # Import ClientError for specific error handling
-import qrcode, os, threading, webbrowser
+import os, sys, threading, webbrowser
 from io import BytesIO
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.colors import HexColor, white
-from reportlab.lib.utils import ImageReader
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 import json # Import json for SNS message
 import time # Import time for adding timestamp to bookings
-from datetime import datetime, timedelta # Used for 'TODAY', 'TOMORROW' logic if you expand on it
+import math
+from datetime import datetime, timedelta
+from seat_map import SeatMap, canonical_seats, seat_mask, show_availability, MAX_SEATS_PER_BOOKING
+from seat_allocator import SeatAllocator
+from ticket_cache import TicketPdfCache
+from qr_service import QrImageCache, normalize_amount
+from outbox import FileOutboxStore, OutboxWorkerPool
+from ticket_blobs import S3BlobStore, LocalBlobStore, TicketAttachments
+from sns_batcher import SnsBatcher
+from aws_clients import AwsClients, CapacityMeter
+from user_cache import UserCache
+from booking_history import PageTokens, page_size, read_tiered_page
+from booking_archive import ArchiveScheduler, SHOW_ARCHIVE_AFTER, archive_cutoffs
+from shard_keys import FanOut, ShardedKey
+from ticket_render import PosterCache, POSTER_BOX, draw_qr
+from catalog import Catalog
+from search_index import SUGGESTION_KINDS, paginate
+from show_schedule import DEFAULT_AUDITORIUM, SCHEDULE_DAYS, format_show_date, legacy_show_id, legacy_show_start, make_show_id, shows_by_day
 
 app = Flask(__name__)
+app.add_template_filter(format_show_date, 'show_date')
 # !!! IMPORTANT: CHANGE THIS TO A STRONG, RANDOM KEY IN PRODUCTION !!!
 app.secret_key = 'your_secret_key_CHANGE_THIS_IN_PRODUCTION'
 
@@ -23,50 +40,572 @@ app.secret_key = 'your_secret_key_CHANGE_THIS_IN_PRODUCTION'
 # 1. IAM Role for EC2 (recommended for production)
 # 2. AWS CLI configured (~/.aws/credentials) for local development
 # 3. Environment variables (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_DEFAULT_REGION)
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-sns = boto3.client('sns', region_name='us-east-1')
+# Connection pool size, retries and timeouts are set through environment variables, see aws_clients.py
+aws = AwsClients()
+dynamodb = aws.resource('dynamodb')
+sns = aws.client('sns')
 
 USER_TABLE = 'MovieMagicUsers'
 BOOKING_TABLE = 'MovieMagicBookings'
+# GSI on MovieMagicBookings for booking history: partition key 'user_email', sort key
+# 'timestamp' (string). It replaces UserEmailIndex, which had no sort key.
+BOOKING_HISTORY_INDEX = 'UserEmailTimestampIndex'
+# Bookings for shows that have ended, moved out of MovieMagicBookings by archive_past_bookings().
+# Same key schema and the same BOOKING_HISTORY_INDEX GSI; read only for history and old tickets.
+BOOKING_ARCHIVE_TABLE = 'MovieMagicBookingsArchive'
+# Enable DynamoDB TTL on 'expires_at' of MovieMagicBookings and MovieMagicShowSeats. Bookings
+# are archived (and deleted) well before then; TTL only bounds the hot tables if the
+# archiver stops. Stream the bookings table (OLD_IMAGE) into archive_stream_records() so
+# bookings removed by TTL are still archived.
+HOT_TTL_GRACE = timedelta(days=7) # After a show is due for archiving
+# GSI on MovieMagicBookings: partition key 'show_shard', the booking's show_id plus a shard
+# suffix (see shard_keys.py), so a show's bookings are spread over SHOW_INDEX_SHARDS keys
+# and read back by querying them all at once. Only used to rebuild a show's seat-state item
+# from its bookings. It replaces ShowIdIndex (partition key show_id) and, before that,
+# MovieTheaterTimeIndex, whose partition key was the movie title.
+SHOW_BOOKINGS_INDEX = 'ShowShardIndex'
+SHOW_INDEX_SHARDS = int(os.environ.get('MOVIEMAGIC_SHOW_INDEX_SHARDS', 4)) # May be raised later, never lowered
+show_shards = ShardedKey(SHOW_INDEX_SHARDS)
+shard_fan_out = FanOut(max_workers=16) # Threads shared by all shard queries in this process
+# One item per show (partition key 'show_key', holding the show_id) with a string set of
+# booked seats and a 'sold' count of them. Seat claims are conditional updates on this item,
+# so they are atomic per show; listing pages batch-read just the counts. Every booking writes
+# it in a transaction (2 write units), so one show takes about 500 bookings a second whatever
+# SHOW_INDEX_SHARDS is; with 221 seats (seat_map.SEAT_COUNT) a show sells out long before that matters.
+SHOW_SEATS_TABLE = 'MovieMagicShowSeats'
+BATCH_GET_MAX_KEYS = 100 # BatchGetItem's limit per request
+# Temporary seat holds: partition key 'show_key' (show_id), sort key 'seat'. Enable DynamoDB TTL on the
+# 'expires_at' attribute so expired holds are deleted by the service instead of by us.
+SEAT_HOLDS_TABLE = 'MovieMagicSeatHolds'
+HOLD_TTL_SECONDS = 5 * 60 # How long selected seats stay reserved while the user pays
+# Free-seat runs of recently viewed shows, for the best-available picker on select_seats.html
+seat_allocator = SeatAllocator()
 # !!! IMPORTANT: Replace with YOUR ACTUAL SNS Topic ARN !!!
 SNS_TOPIC_ARN = 'arn:aws:sns:us-east-1:123456789012:YourMovieMagicSNSTopic' # <<< REPLACE THIS!
+# S3 bucket the SNS consumer reads ticket PDFs from (messages carry s3://bucket/key).
+# Leave as None in development to store them under instance/ticket_blobs instead.
+TICKET_BUCKET = None
+# Tickets whose zlib+base64 encoding fits in this many bytes are inlined in the message
+# instead of stored (0 = always store). Must stay well below SNS's 256 KB message limit.
+TICKET_INLINE_MAX_BYTES = 0
+SNS_BATCH_LINGER_SECONDS = 0.05 # How long a ticket notification waits for others to share its PublishBatch call
 
 table_users = dynamodb.Table(USER_TABLE)
 table_bookings = dynamodb.Table(BOOKING_TABLE)
+table_bookings_archive = dynamodb.Table(BOOKING_ARCHIVE_TABLE)
+table_show_seats = dynamodb.Table(SHOW_SEATS_TABLE)
+table_seat_holds = dynamodb.Table(SEAT_HOLDS_TABLE)
 
+# Bump whenever generate_ticket_pdf's layout changes so cached PDFs are re-rendered
+TICKET_TEMPLATE_VERSION = 5
+ticket_cache = TicketPdfCache(os.path.join(app.instance_path, 'ticket_cache'), TICKET_TEMPLATE_VERSION)
+
+# Ticket notifications are published in batches of up to 10 per SNS call
+sns_batcher = SnsBatcher(sns, SNS_TOPIC_ARN, linger=SNS_BATCH_LINGER_SECONDS)
+
+ticket_attachments = TicketAttachments(
+    S3BlobStore(aws.client('s3'), TICKET_BUCKET) if TICKET_BUCKET
+    else LocalBlobStore(os.path.join(app.instance_path, 'ticket_blobs')),
+    inline_max_bytes=TICKET_INLINE_MAX_BYTES
+)
+
+# Ticket deliveries are spooled under instance/outbox until SNS accepts them
+OUTBOX_DIR = os.path.join(app.instance_path, 'outbox')
+OUTBOX_WORKERS = 4 # Threads rendering tickets and queueing their notifications, per process
+OUTBOX_MAX_IN_FLIGHT = 50 # Notifications queued for SNS but not yet confirmed
+
+
+# Logged-in user items, memoized per request and cached for a minute per process
+user_cache = UserCache(ttl=60)
 
 # Helper funcs
+def load_user(email):
+    try:
+        return table_users.get_item(Key={'email': email}).get('Item')
+    except ClientError as e:
+        print(f"DynamoDB error getting user {email}: {e.response['Error']['Message']}")
+        return None
+
 def get_current_user():
-    """Retrieves current user details from DynamoDB based on session email."""
+    """Retrieves current user details (cached) based on session email."""
     if 'email' in session:
-        try:
-            resp = table_users.get_item(Key={'email': session['email']})
-            return resp.get('Item')
-        except ClientError as e:
-            print(f"DynamoDB error getting user {session['email']}: {e.response['Error']['Message']}")
-            return None
+        user = user_cache.get(session['email'], load_user)
+        return dict(user) if user else None # A copy: callers may modify it
     return None
 
-def get_user_bookings(email):
-    """Retrieves all bookings for a given user email using GSI."""
-    # This query assumes you have a GSI named 'UserEmailIndex' on table_bookings
-    # with 'user_email' as Partition Key.
+# Continuation tokens for booking history pages
+page_tokens = PageTokens(app.secret_key)
+
+def history_reader(table, email):
+    """read(after, n) over one bookings table's BOOKING_HISTORY_INDEX for read_tiered_page.
+
+    Keys are [booking_id, timestamp]: the table key plus the index key of the last item read.
+    """
+    def read(after, n):
+        query_kwargs = {
+            'IndexName': BOOKING_HISTORY_INDEX,
+            'KeyConditionExpression': Key('user_email').eq(email),
+            'ScanIndexForward': False, # Newest first
+            'Limit': n,
+            # Only what the history lists (time and timestamp are reserved words)
+            'ProjectionExpression': 'booking_id, movie, theater, #t, seats, price, selected_day, show_id, starts_at, #ts',
+            'ExpressionAttributeNames': {'#t': 'time', '#ts': 'timestamp'}
+        }
+        if after:
+            booking_id, timestamp = after
+            query_kwargs['ExclusiveStartKey'] = {'booking_id': booking_id, 'user_email': email, 'timestamp': timestamp}
+        return table.query(**query_kwargs).get('Items', [])
+    return read
+
+def get_user_bookings(email, limit, token=None):
+    """One page of a user's bookings, newest first (a Query on BOOKING_HISTORY_INDEX).
+
+    Bookings still in the bookings table come first; the archive table is only queried
+    once they run out. Returns (bookings, next_token or None). Raises ValueError for a
+    token that wasn't issued to this user.
+    """
+    position = page_tokens.loads(email, token) if token else None
+    tiers = [('recent', history_reader(table_bookings, email)), ('archive', history_reader(table_bookings_archive, email))]
     try:
-        response = table_bookings.query(
-            IndexName='UserEmailIndex',
-            KeyConditionExpression=Key('user_email').eq(email)
-            # You can add ScanIndexForward=False here if you want most recent bookings first
-        )
-        return response.get('Items', [])
+        items, next_position = read_tiered_page(tiers, position, limit, key=lambda item: [item['booking_id'], item['timestamp']])
     except ClientError as e:
         print(f"DynamoDB query error for user bookings ({email}): {e.response['Error']['Message']}")
+        return [], None
+    return items, page_tokens.dumps(email, next_position) if next_position else None
+
+def find_booking(booking_id):
+    """A booking item from the bookings table, or from the archive once its show has ended; None if neither has it."""
+    for table in (table_bookings, table_bookings_archive):
+        item = table.get_item(Key={'booking_id': booking_id}).get('Item')
+        if item:
+            return item
+    return None
+
+def hot_expires_at(starts_at):
+    """TTL (unix time) for hot items of a show starting at starts_at: archival time plus HOT_TTL_GRACE."""
+    return int((starts_at + SHOW_ARCHIVE_AFTER + HOT_TTL_GRACE).timestamp())
+
+# DynamoDB capacity used by availability reads, reported under /metrics
+availability_capacity = CapacityMeter()
+# Shows whose seat-state item is known to exist (so it already includes every older booking)
+_seeded_shows = set()
+
+def read_shard_seats(shard_key):
+    """The 'seats' of every booking under one shard key of SHOW_BOOKINGS_INDEX, following every page."""
+    query_kwargs = {
+        'TableName': BOOKING_TABLE,
+        'IndexName': SHOW_BOOKINGS_INDEX,
+        'KeyConditionExpression': Key('show_shard').eq(shard_key),
+        'ProjectionExpression': 'seats',
+        'ReturnConsumedCapacity': 'TOTAL'
+    }
+    seat_strings = []
+    while True:
+        # The resource's client: unlike resources, it is safe to share between threads
+        resp = dynamodb.meta.client.query(**query_kwargs)
+        availability_capacity.record('show_bookings_index_query', resp)
+        seat_strings.extend(item.get('seats', '') for item in resp.get('Items', []))
+        if 'LastEvaluatedKey' not in resp:
+            return seat_strings
+        query_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+def read_booked_seats_from_bookings(show_id):
+    """Rebuilds a show's occupancy from its booking items on SHOW_BOOKINGS_INDEX.
+
+    Queries all of the show's shard keys concurrently, reading only the 'seats' attribute
+    and following LastEvaluatedKey through every page, so a show with thousands of bookings
+    is never silently truncated at 1 MB.
+    """
+    shards = shard_fan_out.map(read_shard_seats, show_shards.all(show_id))
+    return SeatMap.from_seat_strings(seats for shard in shards for seats in shard)
+
+def seed_show_seats(show_id):
+    """Creates a missing seat-state item from the show's existing bookings; returns the show's SeatMap."""
+    booked = read_booked_seats_from_bookings(show_id)
+    item = {'show_key': show_id}
+    show = catalog.show(show_id)
+    if show:
+        item['expires_at'] = hot_expires_at(show.starts_at) # Only needed until the show is over
+    if booked.bits:
+        item['booked_seats'] = set(booked.occupied_seats()) # DynamoDB sets can't be empty
+    item['sold'] = booked.occupied_count()
+    try:
+        table_show_seats.put_item(Item=item, ConditionExpression='attribute_not_exists(show_key)')
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        return get_show_seat_map(show_id) # Someone else created it meanwhile
+    _seeded_shows.add(show_id)
+    return booked
+
+def get_show_seat_map(show_id):
+    """Reads the occupancy bitmap for one show: a single strongly consistent read of its seat-state item.
+
+    Every route that needs occupancy goes through here. A show booked before seat-state
+    items existed has none yet; it is built once from the show's bookings.
+    """
+    resp = table_show_seats.get_item(
+        Key={'show_key': show_id},
+        ProjectionExpression='booked_seats',
+        ConsistentRead=True,
+        ReturnConsumedCapacity='TOTAL'
+    )
+    availability_capacity.record('show_seats_get_item', resp)
+    if 'Item' not in resp:
+        return seed_show_seats(show_id)
+    _seeded_shows.add(show_id)
+    return SeatMap.from_seat_strings(resp['Item'].get('booked_seats', ()))
+
+def read_show_sales(keys):
+    """{show_id: sold} for up to BATCH_GET_MAX_KEYS shows in one BatchGetItem, retrying unprocessed keys."""
+    request_items = {SHOW_SEATS_TABLE: {
+        'Keys': [{'show_key': show_id} for show_id in keys],
+        'ProjectionExpression': 'show_key, sold' # Never the seat sets
+    }}
+    sold = {}
+    for attempt in range(5):
+        resp = dynamodb.meta.client.batch_get_item(RequestItems=request_items, ReturnConsumedCapacity='TOTAL')
+        availability_capacity.record('show_seats_batch_get', resp)
+        for item in resp.get('Responses', {}).get(SHOW_SEATS_TABLE, []):
+            sold[item['show_key']] = int(item.get('sold', 0))
+        request_items = resp.get('UnprocessedKeys')
+        if not request_items:
+            return sold
+        time.sleep(0.05 * 2 ** attempt) # Throttled: back off before asking for the rest
+    print(f"WARNING: {len(request_items[SHOW_SEATS_TABLE]['Keys'])} show counts unread after retries.")
+    return sold
+
+def get_show_availability(show_ids):
+    """{show_id: ShowAvailability} for every given show from the 'sold' counts on their seat-state items.
+
+    One BatchGetItem per 100 shows (a listing page needs one); shows without an item have
+    no bookings yet.
+    """
+    show_ids = list(set(show_ids))
+    chunks = [show_ids[n:n + BATCH_GET_MAX_KEYS] for n in range(0, len(show_ids), BATCH_GET_MAX_KEYS)]
+    sold = {}
+    for counts in shard_fan_out.map(read_show_sales, chunks) if chunks else ():
+        sold.update(counts)
+    return {show_id: show_availability(sold.get(show_id, 0)) for show_id in show_ids}
+
+def get_unavailable_seats(show_id, email):
+    """SeatMap of the show's booked seats plus seats held by users other than `email`."""
+    return get_show_seat_map(show_id) | get_held_seat_map(show_id, exclude_email=email)
+
+def best_available(show, n, email):
+    """The best block of n adjacent free seats for a show (see seat_allocator.py), or [] if there is none."""
+    return seat_allocator.best_available(show.show_id, get_unavailable_seats(show.show_id, email), n)
+
+def ensure_show_seats(show_id):
+    """Makes sure the show's seat-state item exists before seats are claimed against it."""
+    if show_id not in _seeded_shows:
+        get_show_seat_map(show_id)
+
+def _booked_seats_from_reason(reason):
+    """Extracts booked_seats from a cancelled transaction item returned with ALL_OLD."""
+    booked = reason.get('Item', {}).get('booked_seats', {})
+    if isinstance(booked, dict): # Low-level attribute value, e.g. {'SS': [...]}
+        booked = booked.get('SS', [])
+    return booked
+
+def _taken_seats_from_cancellation(e, seats, first_seat_item):
+    """Maps a TransactionCanceledException to the seats that caused it.
+
+    Item 0 is always the show seat-state item; items from index first_seat_item onwards
+    are one per requested seat, in order.
+    """
+    if e.response['Error']['Code'] != 'TransactionCanceledException':
+        raise e
+    reasons = e.response.get('CancellationReasons', [])
+    if not any(r.get('Code') == 'ConditionalCheckFailed' for r in reasons):
+        raise e
+    taken = []
+    if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+        taken = SeatMap.from_seat_strings(_booked_seats_from_reason(reasons[0])).conflicts(seats)
+    for seat, reason in zip(seats, reasons[first_seat_item:]):
+        if reason.get('Code') == 'ConditionalCheckFailed' and seat not in taken:
+            taken.append(seat)
+    return taken or list(seats)
+
+def _seats_free_condition(seats):
+    seat_values = {f":s{i}": seat for i, seat in enumerate(seats)}
+    return ' AND '.join(f"NOT contains(booked_seats, {name})" for name in seat_values), seat_values
+
+def get_held_seat_map(show_key, exclude_email=None):
+    """Seats under an unexpired hold for a show, optionally ignoring one user's own holds."""
+    response = table_seat_holds.query(
+        KeyConditionExpression=Key('show_key').eq(show_key),
+        FilterExpression=Attr('expires_at').gt(int(time.time())), # TTL deletion can lag behind expiry
+        ProjectionExpression='seat, user_email'
+    )
+    return SeatMap.from_seat_strings(
+        h['seat'] for h in response.get('Items', []) if h.get('user_email') != exclude_email
+    )
+
+def release_seat_hold(hold):
+    """Deletes the seats of a previous hold (as stored in the session) if we still own them."""
+    for seat in hold.get('seats', []):
+        try:
+            table_seat_holds.delete_item(
+                Key={'show_key': hold['show_key'], 'seat': seat},
+                ConditionExpression='hold_id = :hold_id',
+                ExpressionAttributeValues={':hold_id': hold['hold_id']}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+
+def place_seat_hold(show_key, seats, email):
+    """Holds seats for HOLD_TTL_SECONDS in one transaction. Returns (hold_id, taken_seats)."""
+    seats = canonical_seats(seats) # A hold on 'A1' must also block 'a1'
+    now = int(time.time())
+    hold_id = str(uuid.uuid4())
+    condition, seat_values = _seats_free_condition(seats)
+    transact_items = [{'ConditionCheck': {
+        'TableName': SHOW_SEATS_TABLE,
+        'Key': {'show_key': show_key},
+        'ConditionExpression': condition,
+        'ExpressionAttributeValues': seat_values,
+        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+    }}]
+    for seat in seats:
+        transact_items.append({'Put': {
+            'TableName': SEAT_HOLDS_TABLE,
+            'Item': {'show_key': show_key, 'seat': seat, 'hold_id': hold_id,
+                     'user_email': email, 'expires_at': now + HOLD_TTL_SECONDS},
+            # Free, expired (TTL not yet applied), or already held by this user
+            'ConditionExpression': 'attribute_not_exists(seat) OR expires_at < :now OR user_email = :email',
+            'ExpressionAttributeValues': {':now': now, ':email': email}
+        }})
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+        return hold_id, []
+    except ClientError as e:
+        return None, _taken_seats_from_cancellation(e, seats, 1)
+
+def reserve_seats_and_book(booking_item, seats, hold_id=None):
+    """Atomically claims seats on the show's seat-state item and writes the booking in one transaction.
+
+    Any seat hold with the given hold_id is consumed in the same transaction; seats held by
+    someone else make the transaction fail. Returns a list of seats that were not available
+    (empty list on success).
+    """
+    seats = canonical_seats(seats) # Set members and the sold count must not depend on spelling
+    show_key = booking_item['show_id']
+    ensure_show_seats(show_key)
+    condition, seat_values = _seats_free_condition(seats)
+    transact_items = [
+        {'Update': {
+            'TableName': SHOW_SEATS_TABLE,
+            'Key': {'show_key': show_key},
+            'UpdateExpression': 'ADD booked_seats :new_seats, sold :sold',
+            'ConditionExpression': condition,
+            'ExpressionAttributeValues': {':new_seats': set(seats), ':sold': len(seats), **seat_values},
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }},
+        {'Put': {
+            'TableName': BOOKING_TABLE,
+            'Item': booking_item,
+            'ConditionExpression': 'attribute_not_exists(booking_id)'
+        }}
+    ]
+    for seat in seats:
+        # Convert our hold into the booking; a live hold owned by someone else blocks it
+        transact_items.append({'Delete': {
+            'TableName': SEAT_HOLDS_TABLE,
+            'Key': {'show_key': show_key, 'seat': seat},
+            'ConditionExpression': 'attribute_not_exists(seat) OR hold_id = :hold_id OR expires_at < :now',
+            'ExpressionAttributeValues': {':hold_id': hold_id or '', ':now': int(time.time())}
+        }})
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+        seat_allocator.book(show_key, seats)
         return []
+    except ClientError as e:
+        # The failed condition returns the show item as it was, so no extra read is needed
+        return _taken_seats_from_cancellation(e, seats, 2)
+
+def backfill_show_seats():
+    """One-off migration: copies seats of existing bookings into the per-show seat-state items."""
+    scan_kwargs = {'ProjectionExpression': 'show_id, seats'}
+    migrated = 0
+    while True:
+        resp = table_bookings.scan(**scan_kwargs)
+        for b in resp.get('Items', []):
+            seats = [s for s in b.get('seats', '').split(',') if s]
+            if not seats or 'show_id' not in b:
+                continue
+            table_show_seats.update_item(
+                Key={'show_key': b['show_id']},
+                UpdateExpression='ADD booked_seats :seats',
+                ExpressionAttributeValues={':seats': set(seats)}
+            )
+            migrated += 1
+        if 'LastEvaluatedKey' not in resp:
+            break
+        scan_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    recount_show_sales()
+    return migrated
+
+def recount_show_sales():
+    """One-off migration: sets each seat-state item's 'sold' count from its booked seats.
+
+    Items created before the count existed would otherwise start counting from their next booking.
+    """
+    scan_kwargs = {'ProjectionExpression': 'show_key, booked_seats, sold'}
+    recounted = 0
+    while True:
+        resp = table_show_seats.scan(**scan_kwargs)
+        for item in resp.get('Items', []):
+            sold = len(item.get('booked_seats', ()))
+            if item.get('sold') == sold:
+                continue
+            table_show_seats.update_item(
+                Key={'show_key': item['show_key']},
+                UpdateExpression='SET sold = :sold',
+                ExpressionAttributeValues={':sold': sold}
+            )
+            recounted += 1
+        if 'LastEvaluatedKey' not in resp:
+            break
+        scan_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    print(f"Recounted sold seats on {recounted} seat-state items.")
+    return recounted
+
+def migrate_bookings_to_show_ids():
+    """One-off migration: gives every booking item a show_id, starts_at and show_shard for SHOW_BOOKINGS_INDEX.
+
+    The show's date is the booking's date plus its day label ('TODAY' = same day); the
+    auditorium comes from the current catalog. Bookings without a usable label get a
+    legacy show ID of their own. Seat-state items under the old movie#theater#time#day
+    keys are deleted; items for the new IDs are rebuilt from the bookings on first use.
+    """
+    scan_kwargs = {
+        'ProjectionExpression': 'booking_id, movie, theater, #t, selected_day, #ts, theater_time_composite',
+        'FilterExpression': Attr('show_id').not_exists(),
+        'ExpressionAttributeNames': {'#t': 'time', '#ts': 'timestamp'}
+    }
+    migrated = 0
+    old_keys = set()
+    while True:
+        resp = table_bookings.scan(**scan_kwargs)
+        for b in resp.get('Items', []):
+            starts_at = legacy_show_start(b.get('timestamp'), b.get('time', ''), b.get('selected_day'))
+            updates = {}
+            if starts_at:
+                theater = catalog.showing(b['movie'], b['theater']) or {}
+                auditorium = theater.get('auditorium', DEFAULT_AUDITORIUM)
+                updates[':show_id'] = make_show_id(b['movie'], b['theater'], auditorium, starts_at)
+                updates[':starts_at'] = starts_at.isoformat(timespec='minutes')
+            else:
+                updates[':show_id'] = legacy_show_id(b['movie'], b['theater'], b.get('time', ''), b.get('selected_day'))
+            updates[':show_shard'] = show_shards.for_item(updates[':show_id'], b['booking_id'])
+            table_bookings.update_item(
+                Key={'booking_id': b['booking_id']},
+                UpdateExpression='SET ' + ', '.join(f"{name[1:]} = {name}" for name in updates),
+                ExpressionAttributeValues=updates
+            )
+            if 'theater_time_composite' in b:
+                old_keys.add(f"{b['movie']}#{b['theater_time_composite']}")
+            migrated += 1
+        if 'LastEvaluatedKey' not in resp:
+            break
+        scan_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    for key in old_keys:
+        table_show_seats.delete_item(Key={'show_key': key})
+    print(f"Assigned show IDs to {migrated} bookings; removed {len(old_keys)} old seat-state items.")
+    return migrated
+
+def backfill_show_shards():
+    """One-off migration: gives bookings that have a show_id their show_shard for SHOW_BOOKINGS_INDEX."""
+    scan_kwargs = {
+        'ProjectionExpression': 'booking_id, show_id',
+        'FilterExpression': Attr('show_id').exists() & Attr('show_shard').not_exists()
+    }
+    migrated = 0
+    while True:
+        resp = table_bookings.scan(**scan_kwargs)
+        for b in resp.get('Items', []):
+            table_bookings.update_item(
+                Key={'booking_id': b['booking_id']},
+                UpdateExpression='SET show_shard = :show_shard',
+                ExpressionAttributeValues={':show_shard': show_shards.for_item(b['show_id'], b['booking_id'])}
+            )
+            migrated += 1
+        if 'LastEvaluatedKey' not in resp:
+            break
+        scan_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+    print(f"Assigned index shards to {migrated} bookings.")
+    return migrated
+
+def migrate_dynamodb():
+    """Brings items written by older versions up to date: python aws_app.py migrate.
+
+    Run it once after upgrading, before serving traffic; re-running it is harmless. The steps
+    depend on each other: shards and seat-state items are keyed by show_id, so show IDs come first.
+    """
+    migrate_bookings_to_show_ids() # Bookings from before show IDs (also gets their shards)
+    backfill_show_shards() # Bookings that had a show_id before ShowShardIndex
+    seeded = backfill_show_seats() # Seat-state items for every show, then their 'sold' counts
+    print(f"Copied seats of {seeded} bookings into seat-state items. Migration complete.")
+
+def archive_past_bookings(now=None):
+    """Moves bookings for shows that have ended from the bookings table to the archive table.
+
+    Scans the bookings table, which archiving keeps down to upcoming shows. Each booking is
+    written to the archive before it is deleted, so a crash leaves it in both tables (the
+    next pass finishes the move) and never in neither. Returns the number of bookings moved.
+    """
+    shows_before, booked_before = archive_cutoffs(now)
+    scan_kwargs = {
+        'FilterExpression': Attr('starts_at').lt(shows_before.isoformat(timespec='minutes')) |
+                            (Attr('starts_at').not_exists() & Attr('timestamp').lt(str(int(booked_before))))
+    }
+    moved = 0
+    while True:
+        resp = table_bookings.scan(**scan_kwargs)
+        items = resp.get('Items', [])
+        if items:
+            with table_bookings_archive.batch_writer() as archive:
+                for item in items:
+                    item.pop('expires_at', None) # Archived bookings are kept
+                    archive.put_item(Item=item)
+            with table_bookings.batch_writer() as hot:
+                for item in items:
+                    hot.delete_item(Key={'booking_id': item['booking_id']})
+            moved += len(items)
+        if 'LastEvaluatedKey' not in resp:
+            return moved
+        scan_kwargs['ExclusiveStartKey'] = resp['LastEvaluatedKey']
+
+def archive_stream_records(event, context=None):
+    """Lambda handler for the bookings table's stream: archives bookings that TTL deleted.
+
+    Only removals made by the DynamoDB service (TTL) are copied; the archiver's own deletes
+    are already in the archive.
+    """
+    deserializer = TypeDeserializer()
+    archived = 0
+    with table_bookings_archive.batch_writer() as archive:
+        for record in event.get('Records', []):
+            if record.get('eventName') != 'REMOVE' or \
+                    record.get('userIdentity', {}).get('principalId') != 'dynamodb.amazonaws.com':
+                continue
+            image = record['dynamodb'].get('OldImage')
+            if not image:
+                continue
+            item = {name: deserializer.deserialize(value) for name, value in image.items()}
+            item.pop('expires_at', None)
+            archive.put_item(Item=item)
+            archived += 1
+    return {'archived': archived}
 
 def email_ticket_via_sns(to_email, pdf_buffer, booking):
-    """Sends movie ticket PDF as an email via AWS SNS."""
-    pdf_buffer.seek(0)
+    """Queues the movie ticket email for AWS SNS; returns a Future that resolves once SNS accepted it."""
     # The payload is a dictionary which will be converted to a JSON string for SNS
-    # Your SNS consumer (e.g., Lambda) will parse this JSON.
+    # Your SNS consumer (e.g., Lambda) will parse this JSON. The PDF itself is referenced
+    # by 'pdf_ref' (s3:// or file://) or inlined as 'pdf_inline' (see 'pdf_encoding');
+    # verify it against 'pdf_sha256'.
     payload = {
         "to": to_email,
         "booking_id": booking['booking_id'],
@@ -74,163 +613,51 @@ def email_ticket_via_sns(to_email, pdf_buffer, booking):
         "theater": booking['theater'],
         "time": booking['time'],
         "seats": booking['seats'],
-        "selected_day": booking.get('selected_day', 'N/A'), # Include day in email payload
-        "pdf_hex": pdf_buffer.getvalue().hex() # PDF content as hex string
-    }
-    try:
-        sns.publish(
-            TopicArn=SNS_TOPIC_ARN,
-            Message=json.dumps(payload), # Message must be a string (JSON stringify)
-            Subject='🎟️ Your Movie Magic Ticket!'
-        )
-        print(f"SNS email triggered successfully for {to_email} and booking {booking['booking_id']}")
-    except Exception as e:
-        print(f"Error publishing SNS message for email to {to_email}: {e}")
-
-# ---------------------- Movie Data (Remains the same as provided) ----------------------
-
-MOVIES = [
-    {
-        'title': 'DEVARA',
-        'poster_filename': 'devara.jpg',
-        'teaser_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ', # Example YouTube URL
-        'theaters': [
-            {
-                'name': 'M1 CINEMA, NELLORE',
-                'price': 250,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-            {
-                'name': 'SIRI COMPLEX, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM'],
-                    'TOMORROW': ['2:00 PM','6:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM']
-                }
-            },
-            {
-                'name': 'MANASA, KAVALI',
-                'price': 220,
-                'timings_by_day': {
-                    'TODAY': ['7:00 AM', '12:00 PM', '4:00 PM', '10:10 PM'],
-                    'TOMORROW': ['7:00 AM', '12:00 PM', '6:30 PM'],
-                    'DAY OF TOMORROW': ['11:00 AM', '6:50 PM']
-                }
-            },
-            {
-                'name': 'M GB, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-
-        ]
-    },
-    {
-        'title': 'RAJA SAAB',
-        'poster_filename': 'rajasaab.jpg',
-        'teaser_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
-        'theaters': [
-            {
-                'name': 'M1 CINEMA, NELLORE',
-                'price': 250,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-            {
-                'name': 'SIRI COMPLEX, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM'],
-                    'TOMORROW': ['2:00 PM','6:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM']
-                }
-            },
-             {
-                'name': 'M G B, NELLORE',
-                'price': 300,
-                'timings_by_day': {
-                    'TODAY': ['6:00 AM','8:00 AM', '12:00 PM', '6:00 PM'],
-                    'TOMORROW': ['7:00 AM','6:00 PM','10:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM','10:00 PM']
-                }
-            },
-
-            {
-                'name': 'P.V.R, Hyderabad',
-                'price': 220,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM'],
-                    'TOMORROW': ['2:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM']
-                }
-            }
-        ]
-    },
-    {
-        'title': 'HIT 3',
-        'poster_filename': 'hit3.jpg',
-        'teaser_url': 'https://www.youtube.com/embed/dQw4w9WgXcQ',
-        'theaters': [
-            {
-                'name': 'M1 CINEMA, NELLORE',
-                'price': 250,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-            {
-                'name': 'SIRI COMPLEX, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM'],
-                    'TOMORROW': ['2:00 PM'],
-                    'DAY OF TOMORROW': ['1:00 PM', '6:00 PM']
-                }
-            },
-            {
-                'name': 'MANASA, KAVALI',
-                'price': 220,
-                'timings_by_day': {
-                    'TODAY': ['7:00 AM', '12:00 PM', '4:00 PM', '10:10 PM'],
-                    'TOMORROW': ['7:00 AM', '12:00 PM', '6:30 PM'],
-                    'DAY OF TOMORROW': ['11:00 AM', '6:50 PM']
-                }
-            },
-            {
-                'name': 'M GB, NELLORE',
-                'price': 200,
-                'timings_by_day': {
-                    'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            },
-            {
-                'name': 'P.V.R, Hyderabad',
-                'price': 220,
-                'timings_by_day': {
-                   'TODAY': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM'],
-                    'TOMORROW': ['2:00 PM', '3:00 PM', '6:10 PM'],
-                    'DAY OF TOMORROW': ['8:00 AM', '12:00 PM', '3:00 PM', '6:10 PM']
-                }
-            }
-        ]
+        "show_id": booking.get('show_id'),
+        "starts_at": booking.get('starts_at'), # ISO date and time of the show
+        "selected_day": format_show_date(booking.get('starts_at') or booking.get('selected_day')) or 'N/A',
+        **ticket_attachments.fields(booking['booking_id'], pdf_buffer.getvalue())
     }
-]
+    message = json.dumps(payload) # Message must be a string (JSON stringify)
+    started = time.perf_counter()
+
+    def published(future):
+        if future.exception():
+            # The outbox retries the delivery later
+            print(f"Error publishing SNS message for email to {to_email}: {future.exception()}")
+        else:
+            ticket_attachments.record_publish(message, started)
+            print(f"SNS email triggered successfully for {to_email} and booking {booking['booking_id']}")
+
+    future = sns_batcher.submit(message, subject='🎟️ Your Movie Magic Ticket!')
+    future.add_done_callback(published)
+    return future
+
+def deliver_ticket_email(payload):
+    """Outbox handler: renders (or reuses) the ticket PDF and publishes it to SNS."""
+    booking = payload['booking']
+    # The ticket's QR code links back to the site, so render with the booking request's host
+    with app.test_request_context(base_url=payload['base_url']):
+        pdf_buffer = ticket_cache.get_or_render(booking['booking_id'], lambda: generate_ticket_pdf(booking))
+    return email_ticket_via_sns(payload['to'], pdf_buffer, booking) # The job settles when the batch is sent
+
+def enqueue_ticket_email(user_email, booking_item):
+    """Records the ticket delivery durably and wakes a worker; the request doesn't wait for it."""
+    outbox_store.enqueue('ticket_email', {'to': user_email, 'booking': booking_item, 'base_url': request.url_root})
+    outbox_pool.notify()
+
+# ---------------------- Movie Data ----------------------
+# Titles, theaters, prices and showtimes live in movies.json; edits are picked up without a restart
+catalog = Catalog(os.path.join(app.root_path, 'movies.json'))
+HOME_PAGE_SIZE = 12 # Movie cards per home1 page
+SUGGEST_LIMIT = 8   # Autocomplete entries per /search/suggest response
+
+# Rendered QR images (payment and ticket links), served with ETags
+qr_cache = QrImageCache()
+
+# Posters decoded and downsampled once (resolved against the app's static folder, not the CWD)
+poster_cache = PosterCache(app.static_folder)
+catalog.on_reload(poster_cache.refresh) # Re-scaled when the catalog changes
 
 # ---------------------- Routes ----------------------
 @app.route('/')
@@ -293,6 +720,7 @@ def reset_password():
                     ExpressionAttributeNames={'#pw': 'password'},
                     ExpressionAttributeValues={':new_password': new_password}
                 )
+                user_cache.invalidate(email)
                 flash("Password reset successful. Please login.")
                 return redirect(url_for('login'))
             else:
@@ -317,6 +745,7 @@ def login():
 
             if user and check_password_hash(user['password'], password):
                 session['email'] = email
+                user_cache.put(email, user) # The next page needs it
                 flash(f"Welcome back, {user.get('name', user['email'])}!")
                 return redirect(url_for('home1'))
             flash("Invalid email or password.")
@@ -342,19 +771,43 @@ def home1():
         return redirect(url_for('login'))
 
     location = request.args.get('location', '').lower()
-    filtered_movies = []
-
-    if location:
-        for movie in MOVIES:
-            matched_theaters = [t for t in movie['theaters'] if location in t['name'].lower()]
-            if matched_theaters:
-                movie_copy = movie.copy()
-                movie_copy['theaters'] = matched_theaters
-                filtered_movies.append(movie_copy)
-    else:
-        filtered_movies = MOVIES
-
-    return render_template('home1.html', movies=filtered_movies, location=location)
+    title_query = request.args.get('q', '').strip()
+
+    result = catalog.search(title=title_query, location=location)
+    page = paginate(result.movies, request.args.get('page'), HOME_PAGE_SIZE)
+    movies = page.items
+    if result.theaters is not None:
+        # Cards on this page list only the theaters in the searched location
+        movies = [dict(m, theaters=[t for t in m['theaters'] if t['name'] in result.theaters]) for m in movies]
+    # Each card's next show with its seats left, read in one BatchGetItem
+    now = datetime.now()
+    next_shows = {m['title']: catalog.next_show(m['title'], result.theaters, after=now) for m in movies}
+    availability = get_show_availability(show.show_id for show in next_shows.values() if show)
+
+    return render_template('home1.html', movies=movies, location=location, query=title_query,
+                           page=page.page, pages=page.pages, total=page.total,
+                           next_shows=next_shows, availability=availability)
+
+@app.route('/search/suggest')
+def search_suggest():
+    # Autocomplete for home1's search boxes: ?q=<typed text>&kind=title|location
+    kinds = {'title': ('title',), 'location': ('city', 'theater')}.get(request.args.get('kind'), SUGGESTION_KINDS)
+    prefix = request.args.get('q', '').strip()
+    return jsonify({'query': prefix, 'suggestions': catalog.suggest(prefix, kinds, limit=SUGGEST_LIMIT) if prefix else []})
+
+@app.route('/shows')
+def upcoming_shows():
+    # Shows starting within the next ?hours= (default 6, 0 to a week), optionally in one ?city=
+    try:
+        hours = float(request.args.get('hours', 6))
+    except ValueError:
+        hours = math.nan
+    if not math.isfinite(hours):
+        return jsonify({'error': 'hours must be a number'}), 400
+    hours = min(max(hours, 0), SCHEDULE_DAYS * 24) # No shows are listed further ahead
+    now = datetime.now()
+    shows = catalog.shows_between(now, now + timedelta(hours=hours), city=request.args.get('city') or None)
+    return jsonify({'shows': [show.to_dict() for show in shows]})
 
 @app.route('/booking_form')
 def booking_form():
@@ -364,9 +817,8 @@ def booking_form():
 
     title = request.args.get('title')
     location = request.args.get('location', '').lower()
-    selected_day = request.args.get('day', 'TODAY') # Default to TODAY
 
-    movie = next((m for m in MOVIES if m['title'] == title), None)
+    movie = catalog.movie(title)
     if not movie:
         flash("Movie not found.")
         return redirect(url_for('home1'))
@@ -375,26 +827,27 @@ def booking_form():
         t for t in movie['theaters']
         if location in t['name'].lower()
     ] if location else movie['theaters']
-
-    available_days = []
-    if filtered_theaters:
-        # Get all unique days available across all filtered theaters for this movie
-        all_days = set()
-        for theater_item in filtered_theaters:
-            all_days.update(theater_item['timings_by_day'].keys())
-        available_days = sorted(list(all_days), key=lambda x: (x != 'TODAY', x != 'TOMORROW', x != 'DAY OF TOMORROW', x)) # Sort for consistency
-        
-        # Ensure selected_day is valid, default if not
-        if selected_day not in available_days:
-            selected_day = 'TODAY' if 'TODAY' in available_days else (available_days[0] if available_days else '')
-
+    # Shows that haven't started yet, grouped into one tab per date
+    now = datetime.now()
+    schedule = shows_by_day((t, catalog.shows_for(title, t['name'], after=now)) for t in filtered_theaters)
+    availability = get_show_availability(
+        show.show_id for _, theater_shows in schedule for _, shows in theater_shows for show in shows)
 
     return render_template('booking_form.html',
                            movie=movie,
-                           theaters=filtered_theaters,
-                           selected_location=location,
-                           available_days=available_days,
-                           selected_day=selected_day)
+                           schedule=schedule,
+                           availability=availability,
+                           selected_location=location)
+
+def find_bookable_show(show_id):
+    """The catalog Show for show_id if it can still be booked; otherwise flashes why and returns None."""
+    show = catalog.show(show_id)
+    if not show:
+        flash("Show not found.")
+    elif show.starts_at <= datetime.now():
+        flash("Sorry, this show has already started.")
+        show = None
+    return show
 
 @app.route('/select_seats')
 def select_seats():
@@ -402,86 +855,106 @@ def select_seats():
         flash("Please log in to select seats.")
         return redirect(url_for('login'))
 
-    title = request.args.get('title')
-    theater_name = request.args.get('theater')
-    time_slot = request.args.get('time')
-    day = request.args.get('day') # The selected day (e.g., 'TODAY', 'TOMORROW')
-
-    movie = next((m for m in MOVIES if m['title'] == title), None)
-    if not movie:
-        flash("Movie not found.")
-        return redirect(url_for('home1'))
-
-    theater = next((t for t in movie['theaters'] if t['name'] == theater_name), None)
-    if not theater:
-        flash("Theater not found.")
+    show = find_bookable_show(request.args.get('show'))
+    if not show:
         return redirect(url_for('home1'))
-    
-    # IMPORTANT: Construct the composite key exactly as it's defined as the Sort Key for your GSI
-    # This must be consistent with how you save it in process_payment/finalize_booking
-    composite_key_value = f"{theater_name}#{time_slot}#{day}"
 
-    occupied_seats = []
     try:
-        # Query DynamoDB using the GSI
-        # Partition Key: 'movie' -> movie title
-        # Sort Key: 'theater_time_composite' -> combination of theater name, time, and day
-        response = table_bookings.query(
-            IndexName='MovieTheaterTimeIndex', # Ensure this GSI exists in DynamoDB
-            KeyConditionExpression=Key('movie').eq(title) &
-                                   Key('theater_time_composite').eq(composite_key_value)
-        )
-        for b in response.get('Items', []):
-            occupied_seats.extend(b['seats'].split(','))
+        occupied_seats = get_unavailable_seats(show.show_id, session['email']).occupied_seats()
     except ClientError as e:
-        print(f"DynamoDB query error in select_seats for movie '{title}': {e.response['Error']['Message']}")
+        print(f"DynamoDB query error in select_seats for show '{show.show_id}': {e.response['Error']['Message']}")
         flash("Error fetching seat availability. Please try again.")
         # Redirect back to booking form in case of error
-        return redirect(url_for('booking_form', title=title, location=request.args.get('location')))
+        return redirect(url_for('booking_form', title=show.movie))
 
 
     return render_template(
         'select_seats.html',
-        movie=movie,
-        selected_theater=theater_name,
-        selected_time=time_slot,
-        selected_price=theater['price'],
+        movie=catalog.movie(show.movie),
+        show=show,
         occupied_seats=occupied_seats,
-        selected_day=day # Pass day to template for hidden fields etc.
+        max_seats=MAX_SEATS_PER_BOOKING
     )
 
+@app.route('/best_available')
+def best_available_seats():
+    # The best ?seats= adjacent free seats of ?show=, which select_seats.html selects in one click
+    if 'email' not in session:
+        return jsonify({'error': 'Please log in to select seats.'}), 401
+    show = catalog.show(request.args.get('show'))
+    if not show or show.starts_at <= datetime.now():
+        return jsonify({'error': 'Show not found or already started.'}), 404
+    try:
+        n = int(request.args.get('seats', 2))
+    except ValueError:
+        return jsonify({'error': 'seats must be a number'}), 400
+    if not 1 <= n <= MAX_SEATS_PER_BOOKING:
+        return jsonify({'error': f'seats must be between 1 and {MAX_SEATS_PER_BOOKING}'}), 400
+    try:
+        seats = best_available(show, n, session['email'])
+    except ClientError as e:
+        print(f"DynamoDB error in best_available for show '{show.show_id}': {e.response['Error']['Message']}")
+        return jsonify({'error': 'Seat availability is unavailable right now. Please try again.'}), 503
+    return jsonify({'show': show.show_id, 'seats': seats})
+
 @app.route('/confirm_ticket', methods=['POST'])
 def confirm_ticket():
     if 'email' not in session:
         flash("Please log in to confirm your ticket.")
         return redirect(url_for('login'))
 
-    movie_title = request.form['movie']
-    selected_time = request.form['time']
-    theater = request.form['theater']
-    seat_price = int(request.form['price'])
-    seats_str = request.form['seats']
-    selected_day = request.form['day'] # Get the day from the form
+    show = find_bookable_show(request.form.get('show'))
+    if not show:
+        return redirect(url_for('home1'))
+    seat_price = show.price # From the catalog, not the form
+    seats_str = request.form.get('seats', '')
+
+    back_to_seats = redirect(url_for('select_seats', show=show.show_id))
+    try:
+        selected_seats = canonical_seats(seats_str)
+    except ValueError as e:
+        flash(f"Invalid seat selection: {e}")
+        return back_to_seats
+    if not selected_seats:
+        flash("No seats selected. Please select at least one seat.")
+        return back_to_seats
+    if len(selected_seats) > MAX_SEATS_PER_BOOKING:
+        flash(f"You can book at most {MAX_SEATS_PER_BOOKING} seats at a time.")
+        return back_to_seats
+
+    # Reserve the seats while the user pays so nobody else can pick them meanwhile
+    try:
+        if session.get('seat_hold'):
+            release_seat_hold(session.pop('seat_hold'))
+        ensure_show_seats(show.show_id) # The hold checks seats against it
+        hold_id, taken = place_seat_hold(show.show_id, selected_seats, session['email'])
+    except ClientError as e:
+        print(f"DynamoDB error placing seat hold for {session['email']}: {e.response['Error']['Message']}")
+        flash("Error reserving your seats. Please try again.")
+        return back_to_seats
+    if taken:
+        flash(f"Sorry, seat {taken[0]} is no longer available. Please select different seats.")
+        return back_to_seats
+    session['seat_hold'] = {'hold_id': hold_id, 'show_key': show.show_id, 'seats': selected_seats}
 
-    selected_seats = seats_str.split(",") if seats_str else []
     seat_count = len(selected_seats)
     total_price = seat_count * seat_price
 
     # Find movie poster
-    movie = next((m for m in MOVIES if m['title'] == movie_title), None)
+    movie = catalog.movie(show.movie)
     poster = movie['poster_filename'] if movie else "default_poster.jpg"
 
     return render_template(
         'confirm_payment.html',
-        movie=movie_title,
-        theater=theater,
-        time=selected_time,
+        show=show,
+        movie=show.movie,
+        theater=show.theater,
+        time=show.time,
         seats=selected_seats,
         seat_count=seat_count,
         total_price=total_price,
         poster=poster,
-        seat_price=seat_price,
-        selected_day=selected_day # Pass day to payment confirmation
+        seat_price=seat_price
     )
 
 
@@ -489,8 +962,7 @@ def confirm_ticket():
 def view_ticket(booking_id):
     """Displays a single ticket's details."""
     try:
-        resp = table_bookings.get_item(Key={'booking_id': booking_id})
-        booking = resp.get('Item')
+        booking = find_booking(booking_id)
 
         if not booking:
             flash("Ticket not found.")
@@ -554,6 +1026,7 @@ def profile():
                     ExpressionAttributeNames=expression_attribute_names,
                     ExpressionAttributeValues=expression_attribute_values
                 )
+                user_cache.invalidate(user['email'])
                 flash("Profile updated successfully.")
             except ClientError as e:
                 print(f"DynamoDB error updating profile for {user['email']}: {e.response['Error']['Message']}")
@@ -565,6 +1038,24 @@ def profile():
 
     return render_template('profile.html', user=user)
 
+def new_booking_item(show, user_email, seats):
+    """The DynamoDB item for a booking of `seats` at `show`, priced from the catalog."""
+    booking_id = str(uuid.uuid4())
+    return {
+        'booking_id': booking_id,          # Primary Key (Partition Key of table)
+        'user_email': user_email,          # GSI Partition Key for BOOKING_HISTORY_INDEX
+        'show_id': show.show_id,
+        'show_shard': show_shards.for_item(show.show_id, booking_id), # GSI Partition Key for SHOW_BOOKINGS_INDEX
+        'starts_at': show.starts_at.isoformat(timespec='minutes'),
+        'movie': show.movie,
+        'theater': show.theater,
+        'time': show.time,
+        'price': str(len(seats) * show.price), # Stored as string to avoid float precision issues in DynamoDB
+        'seats': ",".join(seats),          # Stored as comma-separated string
+        'timestamp': str(int(time.time())), # GSI Sort Key for BOOKING_HISTORY_INDEX (newest first)
+        'expires_at': hot_expires_at(show.starts_at) # TTL backstop; archived long before
+    }
+
 @app.route('/process_payment', methods=['POST'])
 def process_payment():
     """Processes payment and creates a new booking in DynamoDB."""
@@ -572,68 +1063,38 @@ def process_payment():
         flash("Please log in to complete your booking.")
         return redirect(url_for('login'))
 
-    movie = request.form['movie']
-    theater = request.form['theater']
-    time_slot = request.form['time']
-    selected_day = request.form['selected_day'] # The day string from the form
-    total_price = request.form['total_price']
-    seats_str = request.form['seats'] # e.g., "A1,A2,B3"
-    seats = seats_str.split(',') if seats_str else []
-
+    show = find_bookable_show(request.form.get('show'))
+    if not show:
+        return redirect(url_for('home1'))
+    seats_str = request.form.get('seats', '') # e.g., "A1,A2,B3"
+    try:
+        seats = canonical_seats(seats_str) # 'a1' and ' A1' must claim the same string-set member
+    except ValueError as e:
+        flash(f"Invalid seat selection: {e}")
+        return redirect(url_for('select_seats', show=show.show_id))
     if not seats:
         flash("No seats selected. Please go back and select your seats.")
-        # Redirect back to seat selection with original parameters
-        return redirect(url_for('select_seats', title=movie, theater=theater, time=time_slot, day=selected_day))
+        # Redirect back to seat selection for the same show
+        return redirect(url_for('select_seats', show=show.show_id))
+    if len(seats) > MAX_SEATS_PER_BOOKING: # Also enforced here: this route can be posted to directly
+        flash(f"You can book at most {MAX_SEATS_PER_BOOKING} seats at a time.")
+        return redirect(url_for('select_seats', show=show.show_id))
 
     user_email = session['email']
-    booking_id = str(uuid.uuid4())
-    timestamp = str(int(time.time())) # Unix timestamp for creation time
-
-    # CRITICAL: Construct the composite key for the GSI query for checking occupied seats.
-    # This MUST exactly match how you've configured the Sort Key of your 'MovieTheaterTimeIndex' GSI.
-    # Assuming GSI Sort Key is 'theater_time_composite' which includes theater, time, and day.
-    composite_key_value = f"{theater}#{time_slot}#{selected_day}"
-
     try:
-        # Step 1: Check for concurrent bookings using the GSI
-        response = table_bookings.query(
-            IndexName='MovieTheaterTimeIndex', # Ensure this GSI is correctly configured in DynamoDB
-            KeyConditionExpression=Key('movie').eq(movie) &
-                                   Key('theater_time_composite').eq(composite_key_value)
-        )
-        occupied_seats_for_time_slot = []
-        for b in response.get('Items', []):
-            # Extend with seats from existing bookings for this movie, theater, time, day
-            occupied_seats_for_time_slot.extend(b['seats'].split(','))
-
-        # Check if any of the requested seats are now occupied
-        for seat in seats:
-            if seat in occupied_seats_for_time_slot:
-                flash(f"Seat {seat} has just been booked by someone else for this show. Please select different seats.")
-                # Redirect back to seat selection to allow re-selection
-                return redirect(url_for('select_seats', title=movie, theater=theater, time=time_slot, day=selected_day))
-
-        # Step 2: If all seats are available, proceed to save the booking
-        booking_item = {
-            'booking_id': booking_id,         # Primary Key (Partition Key of table)
-            'user_email': user_email,         # GSI Partition Key for UserEmailIndex
-            'movie': movie,                   # GSI Partition Key for MovieTheaterTimeIndex
-            'theater': theater,
-            'time': time_slot,
-            'price': total_price,             # Stored as string to avoid float precision issues in DynamoDB
-            'seats': ",".join(seats),         # Stored as comma-separated string
-            'timestamp': timestamp,           # Useful for sorting/ordering bookings
-            'selected_day': selected_day,     # Store the specific day (TODAY/TOMORROW etc.)
-            'theater_time_composite': composite_key_value # GSI Sort Key for MovieTheaterTimeIndex
-        }
-
-        table_bookings.put_item(Item=booking_item)
+        booking_item = new_booking_item(show, user_email, seats)
+
+        # Claim the seats (consuming our hold) and save the booking in a single conditional transaction
+        hold = session.pop('seat_hold', None) or {}
+        taken = reserve_seats_and_book(booking_item, seats, hold.get('hold_id'))
+        if taken:
+            flash(f"Seat {taken[0]} has just been booked by someone else for this show. Please select different seats.")
+            # Redirect back to seat selection to allow re-selection
+            return redirect(url_for('select_seats', show=show.show_id))
         flash("Payment processed and booking created successfully!")
 
-        # Step 3: Generate PDF and send email asynchronously via SNS
-        pdf_buffer = generate_ticket_pdf(booking_item)
-        # It's good practice to run email sending in a background thread to not block the user
-        threading.Thread(target=email_ticket_via_sns, args=(user_email, pdf_buffer, booking_item)).start()
+        # Step 3: The outbox workers render the PDF and send it via SNS
+        enqueue_ticket_email(user_email, booking_item)
 
         return render_template(
             'ticket_confirmation.html',
@@ -643,12 +1104,12 @@ def process_payment():
     except ClientError as e:
         print(f"DynamoDB error during process_payment for {user_email}: {e.response['Error']['Message']}")
         flash(f"An error occurred during booking. Error details: {e.response['Error']['Message']}")
-        # Redirect back to the confirmation page to allow retrying or re-selecting seats
-        return redirect(url_for('confirm_ticket', movie=movie, theater=theater, time=time_slot, seats=seats_str, price=request.form['seat_price'], day=selected_day))
+        # Redirect back to seat selection to allow retrying or re-selecting seats
+        return redirect(url_for('select_seats', show=show.show_id))
     except Exception as e:
         print(f"Unexpected error in process_payment: {e}")
         flash("An unexpected error occurred. Please try again.")
-        return redirect(url_for('confirm_ticket', movie=movie, theater=theater, time=time_slot, seats=seats_str, price=request.form['seat_price'], day=selected_day))
+        return redirect(url_for('select_seats', show=show.show_id))
 
 
 # The 'finalize_booking' route seems to duplicate logic with 'process_payment'.
@@ -661,63 +1122,35 @@ def finalize_booking():
         flash("Please log in to finalize your booking.")
         return redirect(url_for('login'))
 
-    movie_title = request.form['movie']
-    theater = request.form['theater']
-    time_slot = request.form['time']
-    seat_price = int(request.form['seat_price'])
-    seats_str = request.form['seats']
-    seats = seats_str.split(',') if seats_str else []
-    selected_day = request.form['selected_day'] # Get the day
-
+    show = find_bookable_show(request.form.get('show'))
+    if not show:
+        return redirect(url_for('home1'))
+    seats_str = ','.join(request.form.getlist('seats')) # confirm_payment.html posts one field per seat
+    try:
+        seats = canonical_seats(seats_str)
+    except ValueError as e:
+        flash(f"Invalid seat selection: {e}")
+        return redirect(url_for('select_seats', show=show.show_id))
     if not seats:
         flash("No seats selected.")
-        return redirect(url_for('select_seats', title=movie_title, theater=theater, time=time_slot, day=selected_day))
+        return redirect(url_for('select_seats', show=show.show_id))
+    if len(seats) > MAX_SEATS_PER_BOOKING:
+        flash(f"You can book at most {MAX_SEATS_PER_BOOKING} seats at a time.")
+        return redirect(url_for('select_seats', show=show.show_id))
 
     user_email = session['email']
-    booking_id = str(uuid.uuid4())
-    total_price = str(len(seats) * seat_price)
-    timestamp = str(int(time.time()))
-
-    # Composite key for GSI consistency
-    composite_key_value = f"{theater}#{time_slot}#{selected_day}"
-
     try:
-        # Check if any of the seats were already booked using GSI
-        response = table_bookings.query(
-            IndexName='MovieTheaterTimeIndex',
-            KeyConditionExpression=Key('movie').eq(movie_title) &
-                                   Key('theater_time_composite').eq(composite_key_value)
-        )
-        occupied_seats = []
-        for b in response.get('Items', []):
-            occupied_seats.extend(b['seats'].split(','))
-
-        for seat in seats:
-            if seat in occupied_seats:
-                flash(f"Seat {seat} has just been booked by someone else. Please select different seats.")
-                return redirect(url_for('select_seats', title=movie_title, theater=theater, time=time_slot, day=selected_day))
-
-        # All good: Save booking
-        booking_item = {
-            'booking_id': booking_id,
-            'user_email': user_email,
-            'movie': movie_title,
-            'theater': theater,
-            'time': time_slot,
-            'price': total_price,
-            'seats': ",".join(seats),
-            'timestamp': timestamp,
-            'selected_day': selected_day,
-            'theater_time_composite': composite_key_value
-        }
-        table_bookings.put_item(Item=booking_item)
+        booking_item = new_booking_item(show, user_email, seats)
+        # Claim the seats and save the booking atomically; fails fast if any seat is taken or held by someone else
+        hold = session.pop('seat_hold', None) or {}
+        taken = reserve_seats_and_book(booking_item, seats, hold.get('hold_id'))
+        if taken:
+            flash(f"Seat {taken[0]} has just been booked by someone else. Please select different seats.")
+            return redirect(url_for('select_seats', show=show.show_id))
         flash("Booking confirmed!")
 
-        # Generate PDF
-        buffer = generate_ticket_pdf(booking_item)
-
-        # Email PDF via SNS (asynchronous)
-        threading.Thread(target=email_ticket_via_sns, args=(user_email, buffer, booking_item)).start()
+        # Ticket PDF + SNS email are delivered by the outbox workers
+        enqueue_ticket_email(user_email, booking_item)
 
         # Show confirmation
         return render_template(
@@ -728,17 +1161,17 @@ def finalize_booking():
     except ClientError as e:
         print(f"DynamoDB error during finalize_booking: {e.response['Error']['Message']}")
         flash(f"An error occurred while finalizing your booking. Error details: {e.response['Error']['Message']}")
-        return redirect(url_for('select_seats', title=movie_title, theater=theater, time=time_slot, day=selected_day))
+        return redirect(url_for('select_seats', show=show.show_id))
     except Exception as e:
         print(f"Unexpected error in finalize_booking: {e}")
         flash("An unexpected error occurred. Please try again.")
-        return redirect(url_for('select_seats', title=movie_title, theater=theater, time=time_slot, day=selected_day))
+        return redirect(url_for('select_seats', show=show.show_id))
 
 
 def generate_ticket_pdf(booking):
     """Generates a PDF ticket using ReportLab from booking details."""
-    movie = next((m for m in MOVIES if m['title'] == booking['movie']), None)
-    poster_path = os.path.join("static", movie['poster_filename']) if movie and movie.get('poster_filename') else None
+    movie = catalog.movie(booking['movie'])
+    poster = poster_cache.get(movie.get('poster_filename')) if movie else None
 
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=A4)
@@ -753,12 +1186,12 @@ def generate_ticket_pdf(booking):
     p.setFont("Helvetica-Bold", 22)
     p.drawCentredString(A4[0]/2, 785, "🎟 Movie Magic - Your Ticket")
 
-    # Movie Poster
-    if poster_path and os.path.exists(poster_path):
+    # Movie Poster (pre-scaled to the draw box by poster_cache)
+    if poster:
         try:
-            p.drawImage(poster_path, 50, 570, width=120, height=170)
+            poster.draw(p, 50, 570, *POSTER_BOX)
         except Exception as e:
-            print(f"Warning: Could not draw poster image '{poster_path}' on PDF: {e}")
+            print(f"Warning: Could not draw poster image for '{booking['movie']}' on PDF: {e}")
 
     # Booking Details
     y = 700
@@ -768,7 +1201,7 @@ def generate_ticket_pdf(booking):
         f"Booking ID: {booking['booking_id']}",
         f"Movie: {booking['movie']}",
         f"Theater: {booking['theater']}",
-        f"Date: {booking.get('selected_day', 'N/A')}", # Display the day
+        f"Date: {format_show_date(booking.get('starts_at') or booking.get('selected_day')) or 'N/A'}",
         f"Time: {booking['time']}",
         f"Seats: {booking['seats']}",
         f"Total Price: ₹{booking['price']}"
@@ -785,11 +1218,7 @@ def generate_ticket_pdf(booking):
     # QR Code for online ticket view
     # _external=True ensures a full URL is generated, important for QR codes
     qr_url = url_for('view_ticket', booking_id=booking['booking_id'], _external=True)
-    qr_img = qrcode.make(qr_url)
-    qr_buf = BytesIO()
-    qr_img.save(qr_buf, format='PNG') # Specify format
-    qr_buf.seek(0)
-    p.drawImage(ImageReader(qr_buf), 50, 370, width=150, height=150)
+    draw_qr(p, qr_url, 50, 370, 150) # Vector modules, no PNG round trip
 
     p.setFont("Helvetica-Oblique", 12)
     p.setFillColor(HexColor("#bbbbbb")) # Lighter color for italic text
@@ -805,6 +1234,23 @@ def generate_ticket_pdf(booking):
     buffer.seek(0) # Rewind buffer to the beginning
     return buffer
 
+outbox_store = FileOutboxStore(OUTBOX_DIR)
+outbox_pool = OutboxWorkerPool(
+    outbox_store, {'ticket_email': deliver_ticket_email},
+    workers=OUTBOX_WORKERS, max_in_flight=OUTBOX_MAX_IN_FLIGHT
+)
+
+# Moves bookings for ended shows to BOOKING_ARCHIVE_TABLE in the background
+archiver = ArchiveScheduler(archive_past_bookings)
+
+
+@app.before_request
+def start_background_workers():
+    # Every server process runs its own workers (gunicorn workers included), so queued
+    # deliveries left by a restart don't wait for the next booking. No-op once running.
+    outbox_pool.start()
+    archiver.start()
+
 
 @app.route('/download_ticket/<booking_id>')
 def download_ticket(booking_id):
@@ -814,8 +1260,7 @@ def download_ticket(booking_id):
         return redirect(url_for('login'))
 
     try:
-        resp = table_bookings.get_item(Key={'booking_id': booking_id})
-        booking = resp.get('Item')
+        booking = find_booking(booking_id)
 
         if not booking:
             flash("Booking not found.")
@@ -826,8 +1271,8 @@ def download_ticket(booking_id):
             flash("You do not have permission to download this ticket.")
             return redirect(url_for('dashboard'))
 
-        # Generate the PDF again for download
-        buffer = generate_ticket_pdf(booking)
+        # Serve the PDF rendered at booking time (re-rendered only on a cache miss)
+        buffer = ticket_cache.get_or_render(booking_id, lambda: generate_ticket_pdf(booking))
 
         return send_file(
             buffer,
@@ -847,29 +1292,23 @@ def download_ticket(booking_id):
 
 @app.route('/ticket_qr/<booking_id>')
 def ticket_qr(booking_id):
-    """Generates and serves a QR code image for a given booking ID."""
+    """Generates and serves a QR code image for a given booking ID (?format=svg for vector output)."""
     # This route is primarily for rendering QR images directly.
     # The QR is already embedded in the PDF, so this might be redundant unless you have specific needs.
     booking_url = url_for('view_ticket', booking_id=booking_id, _external=True)
-    qr = qrcode.make(booking_url)
-    qr_buf = BytesIO()
-    qr.save(qr_buf, format="PNG") # Save to buffer as PNG
-    qr_buf.seek(0)
-    return send_file(qr_buf, mimetype='image/png')
+    fmt = 'svg' if request.args.get('format') == 'svg' else 'png'
+    return qr_cache.response(booking_url, fmt, public=False)
 
 @app.route('/payment_qr')
 def payment_qr():
     """Generates a UPI payment QR code."""
-    amount = request.args.get("amount", "0")
+    amount = normalize_amount(request.args.get("amount", "0"))
+    if amount is None:
+        return "Invalid amount", 400
     # This is a generic UPI deep link. For a real payment system, you'd integrate with a payment gateway.
     upi_string = f"upi://pay?pa=merchant@upi&pn=MovieMagic&am={amount}&cu=INR"
 
-    qr_img = qrcode.make(upi_string)
-    qr_buf = BytesIO()
-    qr_img.save(qr_buf, format="PNG")
-    qr_buf.seek(0)
-
-    return send_file(qr_buf, mimetype='image/png')
+    return qr_cache.response(upi_string)
 
 @app.route('/dashboard')
 def dashboard():
@@ -884,9 +1323,47 @@ def dashboard():
         session.clear() # Clear session if user not found
         return redirect(url_for('login'))
 
-    # Fetch user's bookings using the GSI on 'user_email'
-    bookings = get_user_bookings(user['email'])
-    return render_template('dashboard.html', user=user, tickets=bookings, total_tickets=len(bookings))
+    # One page of the user's bookings from the history GSI, newest first
+    try:
+        bookings, next_token = get_user_bookings(user['email'], page_size(request.args.get('limit')), request.args.get('page'))
+    except ValueError:
+        return redirect(url_for('dashboard')) # Stale or edited page link: start from the newest
+    is_first_page = 'page' not in request.args
+    # Counting every booking would read the whole history; it's only known when it fits on the first page
+    total = len(bookings) if is_first_page and not next_token else None
+    return render_template(
+        'dashboard.html', user=user, tickets=bookings, total_tickets=total,
+        next_page=next_token, is_first_page=is_first_page
+    )
+
+@app.route('/booking_history')
+def booking_history():
+    """JSON pages of the logged-in user's bookings, newest first; pass next_page back as ?page=."""
+    if 'email' not in session:
+        return jsonify({'error': 'login required'}), 401
+    try:
+        bookings, next_token = get_user_bookings(session['email'], page_size(request.args.get('limit')), request.args.get('page'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'bookings': bookings, 'next_page': next_token})
+
+@app.route('/metrics')
+def metrics():
+    """Cache counters for sizing; values are per worker process."""
+    return jsonify({
+        'ticket_pdf_cache': ticket_cache.stats(),
+        'qr_cache': qr_cache.stats(),
+        'catalog': catalog.stats(),
+        'outbox': outbox_pool.stats(),
+        'ticket_attachments': ticket_attachments.stats(),
+        'sns_batcher': sns_batcher.stats(),
+        'aws_clients': aws.stats(),
+        'user_cache': user_cache.stats(),
+        'availability_capacity': availability_capacity.stats(),
+        'archiver': archiver.stats(),
+        'shard_fan_out': shard_fan_out.stats(),
+        'seat_allocator': seat_allocator.stats()
+    })
 
 def open_browser_on_startup():
     """Opens a browser window to the app's URL when the Flask app starts."""
@@ -895,6 +1372,9 @@ def open_browser_on_startup():
         webbrowser.open_new("http://localhost:5000/")
 
 if __name__ == '__main__':
+    if sys.argv[1:] == ['migrate']:
+        migrate_dynamodb()
+        sys.exit()
     # It's crucial to have your AWS credentials and region configured in your environment
     # or via ~/.aws/credentials for boto3 to work.
     # For example, in your terminal before running:
@@ -904,4 +1384,6 @@ if __name__ == '__main__':
 
     # Start a timer to open the browser after the Flask server has a moment to start up
     threading.Timer(1.5, open_browser_on_startup).start()
+    outbox_pool.start() # Also picks up deliveries spooled before a restart
+    archiver.start() # First pass right away, then every ARCHIVE_INTERVAL_SECONDS
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,148 @@
+# Shared boto3 clients for aws_app.py, tuned for a multi-threaded worker.
+# botocore's defaults (10 pooled connections, legacy retries, 60 s timeouts) make
+# concurrent requests queue for a connection and hang on a stalled one. Every client
+# here comes from one session with a common Config, configurable through environment
+# variables, and reports how often calls were retried or throttled.
+#
+#   AWS_REGION                        region (default us-east-1)
+#   MOVIEMAGIC_AWS_MAX_POOL_CONNECTIONS  pooled HTTP connections per client (default 50)
+#   AWS_RETRY_MODE, AWS_MAX_ATTEMPTS  botocore's own settings (defaults: adaptive, 5 attempts in total)
+#   MOVIEMAGIC_AWS_CONNECT_TIMEOUT    seconds (default 2)
+#   MOVIEMAGIC_AWS_READ_TIMEOUT       seconds (default 5)
+#   MOVIEMAGIC_AWS_TCP_KEEPALIVE      1/0 (default 1)
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+THROTTLE_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException', 'RequestLimitExceeded',
+    'TransactionInProgressException', 'SlowDown'
+}
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def client_config():
+    return Config(
+        region_name=os.environ.get('AWS_REGION', 'us-east-1'),
+        max_pool_connections=_env_int('MOVIEMAGIC_AWS_MAX_POOL_CONNECTIONS', 50),
+        retries={
+            'mode': os.environ.get('AWS_RETRY_MODE', 'adaptive'), # Client-side rate limiting when throttled
+            'total_max_attempts': _env_int('AWS_MAX_ATTEMPTS', 5) # Including the first attempt, as botocore reads it
+        },
+        connect_timeout=_env_float('MOVIEMAGIC_AWS_CONNECT_TIMEOUT', 2),
+        read_timeout=_env_float('MOVIEMAGIC_AWS_READ_TIMEOUT', 5),
+        tcp_keepalive=os.environ.get('MOVIEMAGIC_AWS_TCP_KEEPALIVE', '1') == '1'
+    )
+
+
+class _CallStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttles = 0
+        self.errors = 0
+
+    def attempt_failed(self, response=None, caught_exception=None, **kwargs):
+        # 'needs-retry' fires after every attempt; only look at failed ones
+        if response is None:
+            return None
+        code = response[1].get('Error', {}).get('Code')
+        if code in THROTTLE_CODES:
+            with self._lock:
+                self.throttles += 1
+        return None # Leave the retry decision to botocore
+
+    def call_finished(self, http_response=None, parsed=None, **kwargs):
+        retries = (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            if http_response is not None and http_response.status_code >= 300:
+                self.errors += 1
+
+    def call_raised(self, **kwargs):
+        # Connection errors and timeouts that outlasted the retries
+        with self._lock:
+            self.calls += 1
+            self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'calls': self.calls, 'retries': self.retries, 'throttles': self.throttles, 'errors': self.errors}
+
+
+class AwsClients:
+    """Creates each client once and hands out the same (thread-safe) instance afterwards."""
+
+    def __init__(self, config=None):
+        self.config = config or client_config()
+        self.session = boto3.session.Session(region_name=self.config.region_name)
+        self.call_stats = _CallStats()
+        # Registered on the session before any client exists, so every client inherits them
+        self.session.events.register('needs-retry', self.call_stats.attempt_failed)
+        self.session.events.register('after-call', self.call_stats.call_finished)
+        self.session.events.register('after-call-error', self.call_stats.call_raised)
+        self._clients = {}
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    def client(self, service):
+        with self._lock:
+            if service not in self._clients:
+                if service in self._resources:
+                    self._clients[service] = self._resources[service].meta.client
+                else:
+                    self._clients[service] = self.session.client(service, config=self.config)
+            return self._clients[service]
+
+    def resource(self, service):
+        """A boto3 resource whose low-level client (and connection pool) is client(service)."""
+        with self._lock:
+            if service not in self._resources:
+                self._resources[service] = self.session.resource(service, config=self.config)
+                self._clients.setdefault(service, self._resources[service].meta.client)
+            return self._resources[service]
+
+    def stats(self):
+        return {
+            'max_pool_connections': self.config.max_pool_connections,
+            'retry_mode': self.config.retries.get('mode'),
+            'total_max_attempts': self.config.retries.get('total_max_attempts'),
+            **self.call_stats.snapshot()
+        }
+
+
+class CapacityMeter:
+    """Sums the DynamoDB capacity units reported by responses (ReturnConsumedCapacity), per label."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {} # label -> [requests, capacity units]
+
+    def record(self, label, response):
+        consumed = response.get('ConsumedCapacity') or []
+        if isinstance(consumed, dict):
+            consumed = [consumed]
+        units = sum(c.get('CapacityUnits', 0) for c in consumed)
+        with self._lock:
+            totals = self._totals.setdefault(label, [0, 0.0])
+            totals[0] += 1
+            totals[1] += units
+
+    def stats(self):
+        with self._lock:
+            return {
+                label: {'requests': requests, 'capacity_units': round(units, 1)}
+                for label, (requests, units) in self._totals.items()
+            }
@@ -0,0 +1,70 @@
+"""Movie/theater lookups: linear scans over a MOVIES list vs. the indexed catalog.
+
+Builds a synthetic catalog file with thousands of titles and times the lookups that
+booking_form/select_seats/confirm_ticket/generate_ticket_pdf perform on each request.
+
+Run from the repository root:
+    python -m benchmarks.catalog_lookup --titles 5000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from catalog import Catalog
+
+THEATERS = [f'THEATER {i}, CITY {i % 40}' for i in range(200)]
+
+
+def synthetic_movies(titles, theaters_per_movie):
+    schedule = {'daily': ['08:00', '12:00', '18:10'], 'sat': ['14:00', '18:10'], 'sun': ['14:00', '18:10']}
+    return [{
+        'title': f'MOVIE {i}',
+        'poster_filename': f'movie{i}.jpg',
+        'theaters': [{'name': name, 'price': 200, 'schedule': schedule}
+                     for name in random.sample(THEATERS, theaters_per_movie)]
+    } for i in range(titles)]
+
+
+def timed(fn, lookups):
+    start = time.perf_counter()
+    for title, theater_name in lookups:
+        fn(title, theater_name)
+    return 1e6 * (time.perf_counter() - start) / len(lookups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=5000)
+    parser.add_argument('--theaters-per-movie', type=int, default=8)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    movies = synthetic_movies(args.titles, args.theaters_per_movie)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'movies.json')
+        with open(path, 'w') as f:
+            json.dump({'movies': movies}, f)
+        start = time.perf_counter()
+        catalog = Catalog(path)
+        load_ms = 1000 * (time.perf_counter() - start)
+
+    picks = random.choices(movies, k=args.lookups)
+    lookups = [(m['title'], random.choice(m['theaters'])['name']) for m in picks]
+
+    def scan(title, theater_name):
+        movie = next((m for m in movies if m['title'] == title), None)
+        return next((t for t in movie['theaters'] if t['name'] == theater_name), None)
+
+    def indexed(title, theater_name):
+        return catalog.movie(title), catalog.showing(title, theater_name)
+
+    print(f"{args.titles} titles, {args.theaters_per_movie} theaters each; catalog load + index {load_ms:.0f} ms")
+    print(f"linear scan : {timed(scan, lookups):9.2f} us per movie+theater lookup")
+    print(f"indexed     : {timed(indexed, lookups):9.2f} us per movie+theater lookup")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""home1 location/title filtering: per-request substring scan vs. the catalog's search index.
+
+Run from the repository root:
+    python -m benchmarks.home_search --titles 500 --cities 100
+"""
+import argparse
+import random
+import time
+
+from catalog import CatalogSnapshot
+from search_index import paginate
+
+
+def synthetic_movies(titles, cities, theaters_per_movie):
+    theaters = [f'THEATER {i}, CITY{i % cities}' for i in range(cities * 5)]
+    schedule = {'daily': ['08:00', '18:10']}
+    return [{
+        'title': f'MOVIE {i}',
+        'theaters': [{'name': name, 'price': 200, 'schedule': schedule}
+                     for name in random.sample(theaters, theaters_per_movie)]
+    } for i in range(titles)]
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return 1e6 * (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=500)
+    parser.add_argument('--cities', type=int, default=100)
+    parser.add_argument('--theaters-per-movie', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    snapshot = CatalogSnapshot(synthetic_movies(args.titles, args.cities, args.theaters_per_movie))
+    movies = snapshot.movies
+    queries = [f'city{random.randrange(args.cities)}' for _ in range(args.queries)]
+
+    def scan(location):
+        # What home1 did before: test every theater of every movie, then render them all
+        return [m for m in movies if any(location in t['name'].lower() for t in m['theaters'])]
+
+    def indexed(location):
+        return paginate(snapshot.search_index.search(location=location).movies, 1, 12)
+
+    print(f"{args.titles} titles, {args.cities} cities, {args.theaters_per_movie} theaters per title")
+    print(f"substring scan : {timed(scan, queries):9.1f} us per location query")
+    print(f"search index   : {timed(indexed, queries):9.1f} us per location query (first page of 12)")
+    print(f"autocomplete   : {timed(lambda q: snapshot.search_index.suggest(q[:5]), queries):9.1f} us per prefix")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Best-available seats on fragmented shows: scanning every seat vs. per-row free-run lengths.
+
+Builds --shows random shows with --occupancy of their seats taken in scattered singles
+and pairs (the pattern hand-picked bookings leave behind) and times, per request for a
+block of n adjacent seats:
+
+  * a full scan: every start position of every row, checking n seats each,
+  * seat_allocator.FreeRuns.best_block on runs built once per show,
+  * keeping the runs current: FreeRuns.update after one booking vs. rebuilding them.
+
+Then sells out one show both ways (groups picking random adjacent seats vs. groups taking
+best_available) and counts the groups turned away for lack of adjacent seats and the single
+seats stranded.
+
+Run from the repository root:
+    python -m benchmarks.seat_allocator --shows 500 --occupancy 0.6
+"""
+import argparse
+import random
+import time
+
+from seat_allocator import BEST_ROW, ROW_WEIGHT, FreeRuns
+from seat_map import ROWS, COLS, SEAT_COUNT, SeatMap, seat_mask
+
+
+def fragmented(occupancy, rng):
+    """Occupancy bits with about `occupancy` of the seats taken in ones and twos."""
+    bits = 0
+    while bin(bits).count('1') < occupancy * SEAT_COUNT:
+        bit = rng.randrange(SEAT_COUNT)
+        width = 1 if bit % COLS == COLS - 1 else rng.choice((1, 2))
+        bits |= ((1 << width) - 1) << bit
+    return bits
+
+
+def full_scan(bits, n):
+    """The same choice as FreeRuns.best_block, by testing every position."""
+    best = None
+    block = (1 << n) - 1
+    best_row, centre = ROWS.index(BEST_ROW), (COLS - 1) / 2
+    for r in range(len(ROWS)):
+        for col in range(COLS - n + 1):
+            if bits >> (r * COLS + col) & block:
+                continue
+            cost = ROW_WEIGHT * abs(r - best_row) + abs(col + (n - 1) / 2 - centre)
+            if not best or cost < best[0]:
+                best = (cost, r, col)
+    return [f"{ROWS[best[1]]}{c + 1}" for c in range(best[2], best[2] + n)] if best else []
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    results = [fn(*item) for item in items]
+    return results, 1e6 * (time.perf_counter() - start) / len(items)
+
+
+def group_size(rng):
+    return rng.choice((1, 2, 2, 2, 3, 4, 4, 5, 6))
+
+
+def sell_out(pick, rng):
+    """Books groups with pick(seat_map, n) until the show is full or 30 groups in a row are turned away.
+
+    Counts the groups turned away although enough seats were free, just not together.
+    """
+    seat_map = SeatMap()
+    turned_away = misses = 0
+    while misses < 30 and seat_map.occupied_count() < SEAT_COUNT:
+        n = group_size(rng)
+        seats = pick(seat_map, n, rng)
+        if seats:
+            seat_map = seat_map | SeatMap(seat_mask(seats))
+            misses = 0
+        else:
+            turned_away += SEAT_COUNT - seat_map.occupied_count() >= n
+            misses += 1
+    runs = FreeRuns(seat_map)
+    stranded = sum(1 for row in runs.runs for _, length in row if length == 1)
+    return seat_map.occupied_count(), turned_away, stranded
+
+
+def random_pick(seat_map, n, rng):
+    # A group clicking a random free spot; retries a few times like a person would
+    for _ in range(5):
+        r, col = rng.randrange(len(ROWS)), rng.randrange(COLS - n + 1)
+        seats = [f"{ROWS[r]}{c + 1}" for c in range(col, col + n)]
+        if not seat_map.bits & seat_mask(seats):
+            return seats
+    return []
+
+
+def allocator_pick(seat_map, n, rng):
+    return FreeRuns(seat_map).best_block(n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shows', type=int, default=500)
+    parser.add_argument('--occupancy', type=float, default=0.6)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    shows = [fragmented(args.occupancy, rng) for _ in range(args.shows)]
+    runs = [FreeRuns(SeatMap(bits)) for bits in shows]
+    print(f"{args.shows} shows, {100 * args.occupancy:.0f}% taken in singles and pairs")
+    for n in (2, 4, 6):
+        scanned, scan_us = timed(full_scan, [(bits, n) for bits in shows])
+        indexed, index_us = timed(FreeRuns.best_block, [(r, n) for r in runs])
+        assert scanned == indexed
+        found = sum(1 for seats in indexed if seats)
+        print(f"n={n}: full scan {scan_us:7.1f} us   free runs {index_us:6.1f} us   block found in {found}/{args.shows} shows")
+
+    booked = [SeatMap(r.bits | seat_mask(r.best_block(2) or ['A1'])) for r in runs]
+    _, update_us = timed(lambda r, m: r.update(m), list(zip(runs, booked)))
+    _, rebuild_us = timed(FreeRuns, [(m,) for m in booked])
+    print(f"after a booking: update {update_us:.1f} us (changed rows only)   rebuild {rebuild_us:.1f} us")
+
+    for label, pick in (('random adjacent picks', random_pick), ('best available', allocator_pick)):
+        sold, turned_away, stranded = sell_out(pick, random.Random(args.seed))
+        print(f"sell-out with {label:21s}: {sold:3d}/{SEAT_COUNT} seats sold, "
+              f"{turned_away:3d} groups turned away with seats left, {stranded:2d} single seats stranded")
+
+
+if __name__ == '__main__':
+    main()
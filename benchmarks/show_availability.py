@@ -0,0 +1,119 @@
+"""Reading a busy show's occupancy: single-page full-item GSI query vs. the paginated projection reader.
+
+Loads thousands of bookings for one show into a local DynamoDB stand-in (moto, pip install
+moto) and compares:
+  * the original read: one query of an unsharded show index returning whole booking
+    items, without following LastEvaluatedKey (the 1 MB page limit truncates it),
+  * aws_app.read_booked_seats_from_bookings: 'seats' only, every page of every shard,
+  * aws_app.get_show_seat_map: one GetItem of the show's seat-state item.
+
+Run from the repository root:
+    python -m benchmarks.show_availability --bookings 200 --padding 6000
+
+--padding adds that many bytes of other attributes to each booking (payment/QR metadata
+and the like), so a show's bookings overflow one 1 MB query page sooner.
+"""
+import argparse
+import os
+import time
+import uuid
+
+
+def create_tables(client):
+    client.create_table(
+        TableName='MovieMagicBookings',
+        KeySchema=[{'AttributeName': 'booking_id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': a, 'AttributeType': 'S'}
+                              for a in ('booking_id', 'show_id', 'show_shard')],
+        GlobalSecondaryIndexes=[{
+            'IndexName': index,
+            'KeySchema': [{'AttributeName': key, 'KeyType': 'HASH'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        } for index, key in (('ShowIdIndex', 'show_id'), ('ShowShardIndex', 'show_shard'))],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    client.create_table(
+        TableName='MovieMagicShowSeats',
+        KeySchema=[{'AttributeName': 'show_key', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'show_key', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+
+def load_bookings(table, show, shards, seat_labels, padding):
+    # One booking per seat, each carrying `padding` bytes the availability check doesn't need
+    with table.batch_writer() as writer:
+        for i, seat in enumerate(seat_labels):
+            booking_id = str(uuid.uuid4())
+            writer.put_item(Item={
+                'booking_id': booking_id, 'user_email': f'user{i}@example.com', 'show_id': show.show_id,
+                'show_shard': shards.for_item(show.show_id, booking_id),
+                'starts_at': show.starts_at.isoformat(timespec='minutes'), 'movie': show.movie,
+                'theater': show.theater, 'time': show.time, 'price': str(show.price),
+                'seats': seat, 'timestamp': str(1700000000 + i), 'notes': 'x' * padding
+            })
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, 1000 * (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=200, help='at most 221 (one seat each)')
+    parser.add_argument('--padding', type=int, default=6000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from moto import mock_aws
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    mock = mock_aws()
+    mock.start()
+
+    import aws_app
+    from boto3.dynamodb.conditions import Key
+    from seat_map import SeatMap, ROWS, COLS
+    from show_schedule import Show
+    from datetime import datetime
+
+    create_tables(aws_app.dynamodb.meta.client)
+    show = Show.create('DEVARA', 'M1 CINEMA, NELLORE', '1', datetime(2026, 10, 18, 8, 0), 250)
+    seat_labels = [f"{row}{col}" for row in ROWS for col in range(1, COLS + 1)][:args.bookings]
+    load_bookings(aws_app.table_bookings, show, aws_app.show_shards, seat_labels, args.padding)
+
+    def original():
+        resp = aws_app.table_bookings.query(
+            IndexName='ShowIdIndex',
+            KeyConditionExpression=Key('show_id').eq(show.show_id),
+            ReturnConsumedCapacity='TOTAL'
+        )
+        return SeatMap.from_seat_strings(item['seats'] for item in resp['Items'])
+
+    def metered(label, fn):
+        before = aws_app.availability_capacity.stats().get(label, {'requests': 0, 'capacity_units': 0})
+        seat_map, ms = timed(fn, args.repeat)
+        after = aws_app.availability_capacity.stats()[label]
+        pages = (after['requests'] - before['requests']) / args.repeat
+        units = (after['capacity_units'] - before['capacity_units']) / args.repeat
+        return seat_map, ms, pages, units
+
+    truncated, original_ms = timed(original, args.repeat)
+    paginated, reader_ms, reader_pages, reader_units = metered(
+        'show_bookings_index_query', lambda: aws_app.read_booked_seats_from_bookings(show.show_id))
+    aws_app.seed_show_seats(show.show_id)
+    item_map, item_ms, item_reads, item_units = metered(
+        'show_seats_get_item', lambda: aws_app.get_show_seat_map(show.show_id))
+    mock.stop()
+
+    print(f"{args.bookings} bookings of ~{args.padding / 1000:.1f} KB for one show")
+    print(f"single-page full items : {original_ms:8.1f} ms  1 request                       sees {truncated.occupied_count():3d} booked seats")
+    print(f"paginated, seats only  : {reader_ms:8.1f} ms  {reader_pages:.0f} requests  {reader_units:6.1f} RCU reported  sees {paginated.occupied_count():3d} booked seats")
+    print(f"seat-state item        : {item_ms:8.1f} ms  {item_reads:.0f} request   {item_units:6.1f} RCU reported  sees {item_map.occupied_count():3d} booked seats")
+
+
+if __name__ == '__main__':
+    main()
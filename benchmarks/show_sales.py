@@ -0,0 +1,119 @@
+"""Seats left for every show on a listing page: one read per show vs. one batched read of the counters.
+
+A booking_form page lists every upcoming show of a movie at the selected theaters
+(dozens once a title runs for a week at several theaters). Compares, for --shows shows:
+
+  * SQLite (app.py): COUNT(*) of each show's BookingSeat rows, one query per show, vs.
+    one IN query on the ShowSales counters (app.get_show_availability).
+  * DynamoDB (aws_app.py, moto stand-in; pip install moto): one GetItem per show of its
+    seat-state item with the booked seat set, vs. BatchGetItem of just the 'sold' counts
+    (aws_app.get_show_availability). moto answers in-process, so the latency gap is much
+    smaller than over the network; the request count is what the page pays for.
+
+Run from the repository root:
+    python -m benchmarks.show_sales --shows 60 --sold 150
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from seat_map import ROWS, COLS, show_availability
+from show_schedule import Show
+
+
+def listing(shows):
+    start = datetime(2026, 10, 18, 8, 0)
+    return [Show.create('DEVARA', f'THEATER {n % 6}, NELLORE', '1', start + timedelta(hours=3 * n), 250)
+            for n in range(shows)]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, 1000 * (time.perf_counter() - start) / repeat
+
+
+def sqlite_side(shows, seats, repeat):
+    tmp = tempfile.mkdtemp()
+    import app
+    app.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+    with app.app.app_context():
+        app.db.engine.dispose()
+        app.db.create_all()
+        app.db.session.execute(app.insert(app.BookingSeat), [
+            {'booking_id': f'{show.show_id}-{seat}', 'show_key': show.show_id, 'seat': seat, 'user_email': 'u@example.com'}
+            for show in shows for seat in seats
+        ])
+        app.db.session.execute(app.insert(app.ShowSales), [{'show_id': show.show_id, 'sold': len(seats)} for show in shows])
+        app.db.session.commit()
+
+        def per_show():
+            return {show.show_id: show_availability(app.BookingSeat.query.filter_by(show_key=show.show_id).count())
+                    for show in shows}
+
+        counted, count_ms = timed(per_show, repeat)
+        batched, batch_ms = timed(lambda: app.get_show_availability(show.show_id for show in shows), repeat)
+    assert counted == batched
+    print(f"SQLite   COUNT per show : {count_ms:8.2f} ms  {len(shows)} queries")
+    print(f"SQLite   ShowSales IN   : {batch_ms:8.2f} ms  1 query")
+
+
+def dynamodb_side(shows, seats, repeat):
+    from moto import mock_aws
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    mock = mock_aws()
+    mock.start()
+    import aws_app
+
+    aws_app.dynamodb.meta.client.create_table(
+        TableName='MovieMagicShowSeats',
+        KeySchema=[{'AttributeName': 'show_key', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'show_key', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    with aws_app.table_show_seats.batch_writer() as writer:
+        for show in shows:
+            writer.put_item(Item={'show_key': show.show_id, 'booked_seats': set(seats), 'sold': len(seats)})
+
+    def per_show():
+        return {show.show_id: show_availability(aws_app.get_show_seat_map(show.show_id).occupied_count())
+                for show in shows}
+
+    def metered(label, fn):
+        before = aws_app.availability_capacity.stats().get(label, {'requests': 0, 'capacity_units': 0})
+        result, ms = timed(fn, repeat)
+        after = aws_app.availability_capacity.stats()[label]
+        return result, ms, (after['requests'] - before['requests']) / repeat, \
+            (after['capacity_units'] - before['capacity_units']) / repeat
+
+    fetched, get_ms, get_requests, get_units = metered('show_seats_get_item', per_show)
+    batched, batch_ms, batch_requests, batch_units = metered(
+        'show_seats_batch_get', lambda: aws_app.get_show_availability(show.show_id for show in shows))
+    mock.stop()
+    assert fetched == batched
+    print(f"DynamoDB GetItem per show: {get_ms:8.2f} ms  {get_requests:.0f} requests  {get_units:6.1f} RCU reported")
+    print(f"DynamoDB BatchGetItem    : {batch_ms:8.2f} ms  {batch_requests:.0f} requests  {batch_units:6.1f} RCU reported")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shows', type=int, default=60)
+    parser.add_argument('--sold', type=int, default=150, help='booked seats per show, at most 221')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-dynamodb', action='store_true')
+    args = parser.parse_args()
+
+    shows = listing(args.shows)
+    seats = [f"{row}{col}" for row in ROWS for col in range(1, COLS + 1)][:args.sold]
+    print(f"{args.shows} shows with {args.sold} seats sold each")
+    sqlite_side(shows, seats, args.repeat)
+    if not args.skip_dynamodb:
+        dynamodb_side(shows, seats, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
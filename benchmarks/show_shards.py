@@ -0,0 +1,166 @@
+"""Release-day load on the booking write path: partition keys by title, by show and by sharded show.
+
+Simulates the bookings for one title's release day: --shows screenings, with the premiere
+taking --hot-share of all bookings. Two parts:
+
+  * key distribution: how the bookings land on partition keys under the original
+    MovieTheaterTimeIndex (key = movie title), ShowIdIndex (key = show) and ShowShardIndex
+    (key = show + shard suffix) for several shard counts. A partition key takes at most
+    about 1000 write units a second, so the hottest key's share of the bookings bounds the
+    release-day booking rate. Every booking writes two hot keys: its entry on the index (one
+    write unit) and, in the same transaction, its show's seat-state item in
+    MovieMagicShowSeats (two write units: transactional writes cost double). The seat-state
+    item is one per show whatever the index's shard count, so it sets the ceiling once the
+    index is sharded: about 500 bookings a second per show, or 500 / hot-share for the day.
+    A show has only SEAT_COUNT seats, so that item sees at most SEAT_COUNT bookings in all;
+    a simulated premiere with more bookings than seats just shows the write pattern.
+  * load test: --writers threads write the bookings into a local DynamoDB stand-in (moto,
+    pip install moto) through aws_app's key scheme, then the premiere's shard keys are
+    counted on the index and its seats read back with the concurrent fan-out reader. moto
+    doesn't throttle, so this checks the distribution and the reader, not AWS's limits.
+
+Run from the repository root:
+    python -m benchmarks.show_shards --bookings 5000 --shards 8
+"""
+import argparse
+import os
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from seat_map import SEAT_COUNT
+from shard_keys import ShardedKey
+from show_schedule import Show
+
+PARTITION_WCU = 1000 # Write units a second one partition key can take
+INDEX_WCU = 1        # Per booking on the show-bookings index (item under 1 KB)
+SEAT_STATE_WCU = 2   # Per booking on its show's seat-state item: a transactional update under 1 KB
+
+
+def release_day(title, shows, bookings, hot_share):
+    """(booking_id, Show) pairs: the premiere gets hot_share of the bookings, the other shows the rest evenly."""
+    start = datetime(2026, 10, 18, 8, 0)
+    day = [Show.create(title, 'M1 CINEMA, NELLORE', str(1 + n % 4), start + timedelta(hours=3 * (n // 4)), 250)
+           for n in range(shows)]
+    hot = int(bookings * hot_share)
+    return [(str(uuid.uuid4()), day[0] if i < hot else day[1 + i % (shows - 1)]) for i in range(bookings)]
+
+
+def ceiling(counts, write_units):
+    """Bookings a second before the hottest key of `counts` runs out of write units."""
+    return PARTITION_WCU / write_units * sum(counts.values()) / max(counts.values())
+
+
+def describe(label, counts, premiere_keys, seat_state_counts):
+    total = sum(counts.values())
+    hottest = max(counts.values())
+    premiere = [counts[key] for key in premiere_keys]
+    index_ceiling = ceiling(counts, INDEX_WCU)
+    seat_state_ceiling = ceiling(seat_state_counts, SEAT_STATE_WCU)
+    limit = 'seat-state item' if seat_state_ceiling < index_ceiling else 'index key'
+    print(f"{label:26s} {len(counts):4d} keys  hottest {100 * hottest / total:5.1f}% of bookings  "
+          f"premiere over {len(premiere):2d} keys (max/mean {max(premiere) * len(premiere) / sum(premiere):4.2f})  "
+          f"index ~{index_ceiling:8,.0f}/s  "
+          f"booking ~{min(index_ceiling, seat_state_ceiling):6,.0f}/s before throttling ({limit})")
+
+
+def key_distribution(bookings, shard_counts):
+    premiere = bookings[0][1]
+    seat_states = Counter(show.show_id for _, show in bookings) # One seat-state item per show, never sharded
+    describe('movie title (original)', Counter(show.movie for _, show in bookings), [premiere.movie], seat_states)
+    describe('show_id', Counter(show.show_id for _, show in bookings), [premiere.show_id], seat_states)
+    for shards in shard_counts:
+        sharded = ShardedKey(shards)
+        counts = Counter(sharded.for_item(show.show_id, booking_id) for booking_id, show in bookings)
+        describe(f'show_id + {shards} shards', counts, sharded.all(premiere.show_id), seat_states)
+    premiere_bookings = seat_states[premiere.show_id]
+    print(f"premiere seat-state item: {premiere_bookings} of {sum(seat_states.values())} booking writes "
+          f"at {SEAT_STATE_WCU} write units each; the show has {SEAT_COUNT} seats, so at most {SEAT_COUNT} "
+          f"bookings ever write it")
+
+
+def create_tables(client):
+    client.create_table(
+        TableName='MovieMagicBookings',
+        KeySchema=[{'AttributeName': 'booking_id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': a, 'AttributeType': 'S'} for a in ('booking_id', 'show_shard')],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'ShowShardIndex',
+            'KeySchema': [{'AttributeName': 'show_shard', 'KeyType': 'HASH'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+
+def load_test(bookings, shards, writers):
+    from moto import mock_aws
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ['MOVIEMAGIC_SHOW_INDEX_SHARDS'] = str(shards)
+    mock = mock_aws()
+    mock.start()
+
+    import aws_app
+    from boto3.dynamodb.conditions import Key
+    from seat_map import ROWS, COLS
+
+    create_tables(aws_app.dynamodb.meta.client)
+    seats = [f"{row}{col}" for row in ROWS for col in range(1, COLS + 1)]
+
+    def write(chunk):
+        with aws_app.table_bookings.batch_writer() as writer:
+            for i, (booking_id, show) in chunk:
+                writer.put_item(Item={
+                    'booking_id': booking_id, 'user_email': f'user{i}@example.com', 'show_id': show.show_id,
+                    'show_shard': aws_app.show_shards.for_item(show.show_id, booking_id),
+                    'movie': show.movie, 'theater': show.theater, 'time': show.time,
+                    'seats': seats[i % len(seats)], 'price': '250', 'timestamp': str(1700000000 + i)
+                })
+
+    numbered = list(enumerate(bookings))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(writers) as pool:
+        list(pool.map(write, [numbered[n::writers] for n in range(writers)]))
+    write_s = time.perf_counter() - started
+
+    premiere = bookings[0][1]
+    per_shard = {
+        key: aws_app.dynamodb.meta.client.query(
+            TableName='MovieMagicBookings', IndexName='ShowShardIndex', Select='COUNT',
+            KeyConditionExpression=Key('show_shard').eq(key))['Count']
+        for key in aws_app.show_shards.all(premiere.show_id)
+    }
+    started = time.perf_counter()
+    seat_strings = [s for shard in aws_app.shard_fan_out.map(aws_app.read_shard_seats, per_shard) for s in shard]
+    read_ms = 1000 * (time.perf_counter() - started)
+    mock.stop()
+
+    expected = sum(1 for _, show in bookings if show is premiere)
+    print(f"\nload test: {len(bookings)} bookings written by {writers} threads in {write_s:.1f} s "
+          f"({len(bookings) / write_s:,.0f}/s against moto)")
+    print(f"premiere bookings per shard key: {sorted(per_shard.values())} (expected total {expected})")
+    print(f"fan-out read of the premiere: {len(seat_strings)} bookings from {shards} shards in {read_ms:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=20)
+    parser.add_argument('--hot-share', type=float, default=0.4, help="the premiere's share of the bookings")
+    parser.add_argument('--shards', type=int, default=8, help='shard count for the load test')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--skip-load-test', action='store_true')
+    args = parser.parse_args()
+
+    bookings = release_day('DEVARA', args.shows, args.bookings, args.hot_share)
+    print(f"{args.bookings} release-day bookings over {args.shows} shows, {100 * args.hot_share:.0f}% for the premiere")
+    key_distribution(bookings, sorted({4, 8, 16, args.shards}))
+    if not args.skip_load_test:
+        load_test(bookings, args.shards, args.writers)
+
+
+if __name__ == '__main__':
+    main()
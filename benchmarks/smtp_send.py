@@ -0,0 +1,125 @@
+"""Emails/second for ticket emails: a new SMTP connection per message vs. SmtpPool.
+
+Runs against a local stand-in SMTP server (no mail leaves the machine). The stand-in can
+delay its greeting and AUTH reply to model the TLS handshake and login round trips of a
+real provider, which is the cost the pool avoids.
+
+Run from the repository root:
+    python -m benchmarks.smtp_send --emails 200 --threads 4 --handshake-ms 60
+"""
+import argparse
+import smtplib
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+
+from smtp_pool import SmtpPool
+
+
+class StandInSmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP for smtplib: EHLO, AUTH PLAIN, MAIL/RCPT/DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        delay = self.server.handshake_delay
+        time.sleep(delay)
+        self.reply('220 stand-in ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250-stand-in')
+                self.reply('250-AUTH PLAIN')
+                self.reply('250 SIZE 10485760')
+            elif command.startswith('AUTH'):
+                time.sleep(delay)
+                self.reply('235 2.7.0 Accepted')
+            elif command.startswith(('MAIL', 'RCPT', 'RSET', 'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply('250 OK queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class StandInSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake_delay=0.0):
+        super().__init__(('127.0.0.1', 0), StandInSmtpHandler)
+        self.handshake_delay = handshake_delay
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+def make_message(i, attachment):
+    msg = EmailMessage()
+    msg['Subject'] = 'Your Movie Magic Ticket!'
+    msg['From'] = 'tickets@example.com'
+    msg['To'] = f'user{i}@example.com'
+    msg.set_content('Please find your ticket attached.')
+    msg.add_attachment(attachment, maintype='application', subtype='pdf', filename=f'ticket_{i}.pdf')
+    return msg
+
+
+def send_unpooled(port, msg):
+    # What email_ticket_pdf did before SmtpPool: connect and log in for every message
+    with smtplib.SMTP('127.0.0.1', port, timeout=30) as smtp:
+        smtp.login('tickets@example.com', 'secret')
+        smtp.send_message(msg)
+
+
+def emails_per_second(send, messages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(send, messages))
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=4, help='concurrent senders (outbox workers)')
+    parser.add_argument('--handshake-ms', type=float, default=60.0,
+                        help='delay before the greeting and the AUTH reply, modelling TLS + login latency')
+    parser.add_argument('--attachment-kb', type=int, default=20, help='size of the fake ticket PDF')
+    args = parser.parse_args()
+
+    server = StandInSmtpServer(args.handshake_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    attachment = bytes(args.attachment_kb * 1024)
+    messages = [make_message(i, attachment) for i in range(args.emails)]
+
+    try:
+        before = emails_per_second(lambda msg: send_unpooled(port, msg), messages, args.threads)
+        pool = SmtpPool('127.0.0.1', port, 'tickets@example.com', 'secret', use_ssl=False, size=args.threads)
+        after = emails_per_second(pool.send, messages, args.threads)
+        pool.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"{args.emails} emails, {args.threads} threads, {args.handshake_ms:g} ms handshake")
+    print(f"new connection per email: {before:8.1f} emails/s")
+    print(f"SmtpPool:                 {after:8.1f} emails/s   ({after / before:.1f}x)")
+    print(f"pool stats: {pool.stats()}   server received: {server.received}")
+
+
+if __name__ == '__main__':
+    main()
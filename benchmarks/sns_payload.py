@@ -0,0 +1,83 @@
+"""SNS ticket message size and publish latency: hex-encoded PDF vs. blob reference.
+
+Publishes real ticket PDFs (rendered by aws_app.generate_ticket_pdf) both ways. By default
+SNS is mocked locally with moto (pip install moto), which still measures request building,
+signing and transfer of the payload; pass --topic-arn to publish to a real topic instead.
+
+Run from the repository root:
+    python -m benchmarks.sns_payload --messages 100
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def booking(i):
+    return {
+        'booking_id': f'bench-{i:05d}', 'user_email': 'user@example.com', 'movie': 'DEVARA',
+        'theater': 'M1 CINEMA, NELLORE', 'time': '8:00 AM', 'price': '500', 'seats': 'A1,A2',
+        'selected_day': 'TODAY', 'timestamp': str(int(time.time()))
+    }
+
+
+def hex_payload(b, pdf):
+    # The message email_ticket_via_sns sent before ticket_blobs
+    return {"to": b['user_email'], "booking_id": b['booking_id'], "movie": b['movie'], "theater": b['theater'],
+            "time": b['time'], "seats": b['seats'], "selected_day": b['selected_day'], "pdf_hex": pdf.hex()}
+
+
+def ref_payload(attachments, b, pdf):
+    return {"to": b['user_email'], "booking_id": b['booking_id'], "movie": b['movie'], "theater": b['theater'],
+            "time": b['time'], "seats": b['seats'], "selected_day": b['selected_day'],
+            **attachments.fields(b['booking_id'], pdf)}
+
+
+def measure(name, sns, topic_arn, build, tickets):
+    sizes, seconds = [], 0.0
+    for b, pdf in tickets:
+        start = time.perf_counter()
+        message = json.dumps(build(b, pdf))
+        sns.publish(TopicArn=topic_arn, Message=message, Subject='Your Movie Magic Ticket!')
+        seconds += time.perf_counter() - start
+        sizes.append(len(message.encode('utf-8')))
+    print(f"{name:<24} avg {sum(sizes) / len(sizes) / 1024:8.1f} KB   max {max(sizes) / 1024:8.1f} KB   "
+          f"encode+publish {1000 * seconds / len(tickets):7.2f} ms/message")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--topic-arn', help='publish to this real SNS topic instead of a moto mock')
+    args = parser.parse_args()
+
+    mock = None
+    if not args.topic_arn:
+        from moto import mock_aws
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+        mock = mock_aws()
+        mock.start()
+
+    import aws_app
+    from ticket_blobs import LocalBlobStore, TicketAttachments
+
+    sns = aws_app.sns
+    topic_arn = args.topic_arn or sns.create_topic(Name='MovieMagicBenchmark')['TopicArn']
+    with aws_app.app.test_request_context('/'):
+        tickets = [(b, aws_app.generate_ticket_pdf(b).getvalue()) for b in map(booking, range(args.messages))]
+
+    with tempfile.TemporaryDirectory() as blob_dir:
+        stored = TicketAttachments(LocalBlobStore(blob_dir))
+        inlined = TicketAttachments(LocalBlobStore(blob_dir), inline_max_bytes=200 * 1024)
+        print(f"{args.messages} tickets, PDF size {len(tickets[0][1]) / 1024:.1f} KB")
+        measure('pdf_hex (before)', sns, topic_arn, hex_payload, tickets)
+        measure('pdf_ref (after)', sns, topic_arn, lambda b, pdf: ref_payload(stored, b, pdf), tickets)
+        measure('pdf_inline zlib+base64', sns, topic_arn, lambda b, pdf: ref_payload(inlined, b, pdf), tickets)
+    if mock:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Hot/cold split of bookings. Once a show has ended its bookings are only ever read as
+# history, so an archival pass moves them out of the booking table (and drops their seat
+# claims), keeping the table and the indexes that seat selection and the first history
+# pages use proportional to upcoming shows instead of all time. History pages fall
+# through to the archive once a user's recent bookings run out (booking_history.py).
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+SHOW_ARCHIVE_AFTER = timedelta(hours=6)  # After a show starts; longer than any film plus a margin
+LEGACY_ARCHIVE_AFTER = timedelta(days=3) # After booking, for bookings without a show date (labels went 2 days ahead)
+ARCHIVE_INTERVAL_SECONDS = 15 * 60
+ARCHIVE_BATCH_SIZE = 500 # Bookings moved per transaction
+
+
+def archive_cutoffs(now=None):
+    """(shows starting before this datetime have ended, undated bookings made before this unix time are past)."""
+    now = now or datetime.now()
+    return now - SHOW_ARCHIVE_AFTER, (now - LEGACY_ARCHIVE_AFTER).timestamp()
+
+
+class ArchiveScheduler:
+    """Runs an archival pass every `interval` seconds on a daemon thread.
+
+    job() moves whatever is due and returns how many bookings it moved. Several
+    processes may run one each; a pass only moves bookings that are still in the hot table.
+    """
+
+    def __init__(self, job, interval=ARCHIVE_INTERVAL_SECONDS, context=None):
+        self.job = job
+        self.interval = interval
+        self.context = context # Optional factory for a context manager around each pass (e.g. app.app_context)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.runs = 0
+        self.archived = 0
+        self.errors = 0
+        self.last_run_at = None
+        self.last_run_seconds = None
+
+    def start(self):
+        """Starts the background thread; safe to call repeatedly."""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive(): # A thread from before a fork isn't
+                return
+            self._wakeup.clear()
+            self._thread = threading.Thread(target=self._run, name='booking-archiver', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        with self._start_lock:
+            if self._thread:
+                self._wakeup.set()
+                self._thread.join(timeout)
+                self._thread = None
+
+    def run_once(self):
+        started = time.monotonic()
+        try:
+            if self.context:
+                with self.context():
+                    moved = self.job()
+            else:
+                moved = self.job()
+        except Exception as e:
+            self.errors += 1
+            print(f"Booking archival failed: {e}")
+            traceback.print_exc()
+            return 0
+        finally:
+            self.runs += 1
+            self.last_run_at = time.time()
+            self.last_run_seconds = round(time.monotonic() - started, 3)
+        self.archived += moved
+        if moved:
+            print(f"Archived {moved} bookings for past shows.")
+        return moved
+
+    def _run(self):
+        while not self._wakeup.is_set():
+            self.run_once()
+            self._wakeup.wait(self.interval)
+
+    def stats(self):
+        return {
+            'interval_seconds': self.interval,
+            'runs': self.runs,
+            'archived': self.archived,
+            'errors': self.errors,
+            'last_run_at': self.last_run_at,
+            'last_run_seconds': self.last_run_seconds
+        }
@@ -0,0 +1,66 @@
+# Paging helpers for a user's booking history (dashboard and /booking_history).
+# Pages are read newest first by keyset: the continuation token carries the sort key of
+# the last booking shown, so each page is one bounded index read however deep it is.
+# Tokens are signed with the app's secret key and bound to the user, so they are opaque
+# to clients and can't be edited to read from someone else's history.
+# History spans two tiers, recent bookings and then the archive of past shows
+# (booking_archive.py); the archive is only read once a page runs past the recent ones.
+from itsdangerous import BadSignature, URLSafeSerializer
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+def page_size(raw, default=DEFAULT_PAGE_SIZE):
+    """Parses a requested page size, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class PageTokens:
+    def __init__(self, secret_key):
+        self._serializer = URLSafeSerializer(secret_key, salt='booking-history')
+
+    def dumps(self, email, position):
+        """Encodes the position after the last booking of a page (JSON-serializable)."""
+        return self._serializer.dumps({'u': email, 'p': position})
+
+    def loads(self, email, token):
+        """Returns the position encoded in a token; raises ValueError if it is invalid or not this user's."""
+        try:
+            data = self._serializer.loads(token)
+        except BadSignature:
+            raise ValueError("Invalid page token")
+        if not isinstance(data, dict) or data.get('u') != email:
+            raise ValueError("Invalid page token")
+        return data.get('p')
+
+
+def read_tiered_page(tiers, position, limit, key):
+    """One page of history read across tiers in order, e.g. [('recent', read), ('archive', read)].
+
+    read(after, n) returns up to n rows newest first, starting after the row whose key is
+    `after` (None: from the newest). position is [tier name, key or None] from the previous
+    page, or None for the first one. Returns (rows, next position or None); raises
+    ValueError for a position that names no tier.
+    """
+    names = [name for name, _ in tiers]
+    if position is None:
+        position = [names[0], None]
+    if not isinstance(position, list) or len(position) != 2 or position[0] not in names:
+        raise ValueError("Invalid page token")
+    tier, after = position
+    rows = [] # (tier name, row)
+    for name, read in tiers[names.index(tier):]:
+        rows += [(name, row) for row in read(after, limit + 1 - len(rows))]
+        after = None # Later tiers start from their newest row
+        if len(rows) > limit: # One extra row tells us whether another page exists
+            break
+    page = [row for _, row in rows[:limit]]
+    if len(rows) <= limit:
+        return page, None
+    (last_tier, last), (next_tier, _) = rows[limit - 1], rows[limit]
+    return page, [next_tier, key(last) if next_tier == last_tier else None]
@@ -0,0 +1,207 @@
+# Movie catalog: titles, the theaters showing them, prices and showtimes.
+# Loaded from a JSON data file (movies.json) into read-only records with dict indexes,
+# so finding a movie, a theater, or a movie at a theater is one lookup however many
+# titles there are. The file is re-checked every few seconds; an edited catalog is
+# parsed and indexed off to the side and swapped in as a whole, so a request sees either
+# the old catalog or the new one. A file that fails to load leaves the current one in place.
+#
+# Each theater entry has a weekly 'schedule' of start times (and optionally one-off ISO start
+# datetimes under 'shows'). A snapshot expands them over the SCHEDULE_DAYS days from today into
+# show_schedule.Show records, indexed by show_id and by start time (overall and per city) so
+# "shows in Nellore in the next 6 hours" is a binary search, not a scan. When the date changes
+# the snapshot is rebuilt from the same movies, so the window rolls on without editing the file.
+import bisect
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from types import MappingProxyType
+
+from search_index import SUGGESTION_KINDS, SearchIndex, city_of
+from show_schedule import DEFAULT_AUDITORIUM, SCHEDULE_DAYS, Show, scheduled_starts
+
+
+def _frozen(value):
+    """Read-only copy of parsed JSON: dicts become mappings, lists become tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _frozen(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+
+class CatalogSnapshot:
+    """One immutable version of the catalog and its indexes, with shows for `days` days from first_day (today)."""
+
+    def __init__(self, movies, signature=None, first_day=None, days=SCHEDULE_DAYS):
+        self.signature = signature
+        self.first_day = first_day or date.today()
+        self.days = days
+        self.movies = tuple(_frozen(m) for m in movies)
+        self.by_title = {}           # title -> movie
+        self.showings = {}           # (title, theater name) -> theater entry (price, auditorium, shows)
+        self.shows = {}              # show_id -> Show
+        self.showing_shows = {}      # (title, theater name) -> its Shows, by start time
+        for movie in self.movies:
+            if movie['title'] in self.by_title:
+                raise ValueError(f"Duplicate movie title: {movie['title']}")
+            self.by_title[movie['title']] = movie
+            for theater in movie.get('theaters', ()):
+                self.showings[(movie['title'], theater['name'])] = theater
+                starts = [datetime.fromisoformat(starts_at) for starts_at in theater.get('shows', ())]
+                starts += scheduled_starts(theater.get('schedule', {}), self.first_day, days)
+                shows = sorted({
+                    Show.create(movie['title'], theater['name'], theater.get('auditorium', DEFAULT_AUDITORIUM),
+                                starts_at, theater['price'])
+                    for starts_at in starts
+                }, key=lambda show: show.starts_at)
+                self.showing_shows[(movie['title'], theater['name'])] = tuple(shows)
+                self.shows.update((show.show_id, show) for show in shows)
+        self.theater_names = tuple(dict.fromkeys(name for _, name in self.showings)) # In catalog order
+        # (starts_at, show_id) lists, sorted for range queries; None is the key for all cities
+        self.show_times = {None: []}
+        for show in self.shows.values():
+            self.show_times[None].append((show.starts_at, show.show_id))
+            city = city_of(show.theater)
+            if city:
+                self.show_times.setdefault(city.lower(), []).append((show.starts_at, show.show_id))
+        for times in self.show_times.values():
+            times.sort()
+        self.search_index = SearchIndex(self.movies)
+
+
+class Catalog:
+    """The current catalog, reloaded from `path` when the file changes.
+
+    on_reload callbacks get the new tuple of movies after each successful (re)load,
+    e.g. to refresh caches derived from the catalog. They are not called when only the
+    schedule window moves on to a new day.
+    """
+
+    def __init__(self, path, check_interval=5.0, on_reload=(), schedule_days=SCHEDULE_DAYS):
+        self.path = path
+        self.check_interval = check_interval
+        self.schedule_days = schedule_days
+        self._on_reload = list(on_reload)
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._failed_signature = None # A broken file is reported once, not on every check
+        self.reloads = 0
+        self.reload_errors = 0
+        self._snapshot = CatalogSnapshot((), days=schedule_days)
+        self.reload()
+
+    def on_reload(self, callback):
+        """Registers a callback and runs it once for the catalog already loaded."""
+        self._on_reload.append(callback)
+        callback(self._snapshot.movies)
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def reload(self, force=True):
+        """Loads the file if it changed since the last load (always, if force). Returns True if swapped.
+
+        An unchanged file is re-expanded from the current movies once the date changes.
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            signature = self._signature()
+            today = date.today()
+            if not force and signature in (self._snapshot.signature, self._failed_signature):
+                if self._snapshot.first_day == today:
+                    return False
+                self._snapshot = CatalogSnapshot(self._snapshot.movies, self._snapshot.signature, today, self.schedule_days)
+                return True
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                snapshot = CatalogSnapshot(data['movies'] if isinstance(data, dict) else data, signature,
+                                           today, self.schedule_days)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.reload_errors += 1
+                self._failed_signature = signature
+                print(f"Error loading movie catalog {self.path}: {e}")
+                return False
+            self._snapshot = snapshot # Swap in one step
+            self.reloads += 1
+            callbacks = list(self._on_reload)
+        for callback in callbacks:
+            try:
+                callback(snapshot.movies)
+            except Exception as e:
+                print(f"Error in catalog reload hook {callback}: {e}")
+        return True
+
+    @property
+    def snapshot(self):
+        if time.monotonic() >= self._next_check:
+            self.reload(force=False)
+        return self._snapshot
+
+    def movies(self):
+        return self.snapshot.movies
+
+    def movie(self, title):
+        """The movie with this exact title, or None."""
+        return self.snapshot.by_title.get(title)
+
+    def showing(self, title, theater_name):
+        """A theater's entry (name, price, auditorium, shows) for a movie it shows, or None."""
+        return self.snapshot.showings.get((title, theater_name))
+
+    def show(self, show_id):
+        """The Show with this ID, or None (unknown, or removed from the catalog)."""
+        return self.snapshot.shows.get(show_id)
+
+    def shows_for(self, title, theater_name, after=None):
+        """A movie's shows at a theater by start time, only those starting after `after` if given."""
+        shows = self.snapshot.showing_shows.get((title, theater_name), ())
+        if after is not None:
+            shows = shows[bisect.bisect_right([show.starts_at for show in shows], after):]
+        return shows
+
+    def next_show(self, title, theater_names=None, after=None):
+        """A movie's earliest show (after `after`, if given), only at theater_names if given; None if there is none."""
+        movie = self.movie(title)
+        if not movie:
+            return None
+        upcoming = [shows[0] for shows in (
+            self.shows_for(title, theater['name'], after) for theater in movie['theaters']
+            if theater_names is None or theater['name'] in theater_names
+        ) if shows]
+        return min(upcoming, key=lambda show: show.starts_at, default=None)
+
+    def shows_between(self, start, end, city=None):
+        """Shows starting in [start, end), in start order, optionally only in one city (case-insensitive)."""
+        snapshot = self.snapshot
+        times = snapshot.show_times.get(city.lower() if city else None, [])
+        lo = bisect.bisect_left(times, (start,))
+        hi = bisect.bisect_left(times, (end,), lo)
+        return [snapshot.shows[show_id] for _, show_id in times[lo:hi]]
+
+    def search(self, title='', location=''):
+        """SearchResult of the movies matching a title and/or location query (see search_index)."""
+        return self.snapshot.search_index.search(title, location)
+
+    def suggest(self, prefix, kinds=SUGGESTION_KINDS, limit=8):
+        """Autocomplete entries ({'type', 'value'}) for a partly typed title or location."""
+        return self.snapshot.search_index.suggest(prefix, kinds, limit)
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'movies': len(snapshot.movies),
+            'theaters': len(snapshot.theater_names),
+            'showings': len(snapshot.showings),
+            'shows': len(snapshot.shows),
+            'schedule_from': snapshot.first_day.isoformat(),
+            'schedule_days': snapshot.days,
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors
+        }
@@ -0,0 +1,192 @@
+# Cross-process seat occupancy cache backed by an mmap'ed file.
+# Every gunicorn worker maps the same file, so a seat map loaded or updated by one
+# worker is visible to all others. Each slot is protected by a seqlock: readers never
+# block, they just retry if a writer was mid-update, and writers serialize on flock().
+import hashlib
+import contextlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from seat_map import SeatMap, BITMAP_BYTES
+
+try:
+    import fcntl
+except ImportError: # Windows: no cross-process lock, fall back to a per-process one
+    fcntl = None
+
+_MAGIC = b'MMOCC001'
+_HEADER = struct.Struct('<8sQQ')                          # magic, slot count, global version
+_SLOT = struct.Struct(f'<Q16s{BITMAP_BYTES}s{BITMAP_BYTES}sd')  # seq, key hash, booked, held, held_until
+_EMPTY_HASH = bytes(16)
+PROBE_LIMIT = 8      # Slots checked per key before evicting
+READ_RETRIES = 1000  # A writer that died mid-update leaves its slot unreadable; treat it as a miss
+
+
+class OccupancyCache:
+    """Fixed-size hash table of per-show seat bitmaps shared between processes.
+
+    A cached entry stays valid until held_until (the earliest expiry of the holds it
+    includes); after that the caller reloads it from the database.
+    """
+
+    def __init__(self, path, slots=4096):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = _HEADER.size + slots * _SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._local_lock = threading.Lock()
+        with self._write_lock():
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._mm = mmap.mmap(self._fd, 0)
+            magic, count, _ = _HEADER.unpack_from(self._mm, 0)
+            if magic != _MAGIC or count != slots:
+                self._mm[:] = bytes(len(self._mm)) # Fresh or incompatible file: start empty
+                _HEADER.pack_into(self._mm, 0, _MAGIC, slots, 0)
+        self.slots = slots
+        self.hits = 0
+        self.misses = 0
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        with self._local_lock:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # --- slot helpers ------------------------------------------------------
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        return digest if digest != _EMPTY_HASH else b'\x01' + digest[1:]
+
+    def _offset(self, index):
+        return _HEADER.size + index * _SLOT.size
+
+    def _read_slot(self, index):
+        """Seqlock read: retries while a writer holds the slot (odd or changed sequence)."""
+        offset = self._offset(index)
+        for _ in range(READ_RETRIES):
+            seq = struct.unpack_from('<Q', self._mm, offset)[0]
+            if seq & 1:
+                continue
+            slot = _SLOT.unpack_from(self._mm, offset)
+            if slot[0] == seq and struct.unpack_from('<Q', self._mm, offset)[0] == seq:
+                return slot
+        return None
+
+    def _find(self, key_hash, for_write=False):
+        home = int.from_bytes(key_hash[:8], 'little') % self.slots
+        empty = None
+        for probe in range(PROBE_LIMIT):
+            index = (home + probe) % self.slots
+            slot = self._read_slot(index)
+            if slot is None:
+                if for_write:
+                    return index # Torn slot left by a crashed writer: safe to overwrite under the lock
+                continue
+            slot_hash = slot[1]
+            if slot_hash == key_hash:
+                return index
+            if slot_hash == _EMPTY_HASH and empty is None:
+                empty = index
+        if for_write:
+            return empty if empty is not None else home # Probe window full: evict the home slot
+        return None
+
+    def _write_slot(self, index, key_hash, booked, held, held_until):
+        """Must be called with the write lock held."""
+        offset = self._offset(index)
+        seq = struct.unpack_from('<Q', self._mm, offset)[0]
+        seq |= 1 # Odd: readers back off (already odd if a previous writer crashed mid-update)
+        struct.pack_into('<Q', self._mm, offset, seq)
+        _SLOT.pack_into(self._mm, offset, seq, key_hash, booked.to_bytes(), held.to_bytes(), held_until)
+        struct.pack_into('<Q', self._mm, offset, seq + 1)
+        self._bump_version()
+
+    def _bump_version(self):
+        """Must be called with the write lock held."""
+        magic, count, version = _HEADER.unpack_from(self._mm, 0)
+        _HEADER.pack_into(self._mm, 0, magic, count, version + 1)
+
+    # --- public API --------------------------------------------------------
+    @property
+    def version(self):
+        """Global write counter; changes on every write or change notice, cached show or not."""
+        return _HEADER.unpack_from(self._mm, 0)[2]
+
+    def get(self, key, now=None):
+        """Returns (version, booked SeatMap, held SeatMap) or None if missing or its holds expired."""
+        key_hash = self._hash(key)
+        index = self._find(key_hash)
+        slot = self._read_slot(index) if index is not None else None
+        if slot is not None:
+            seq, slot_hash, booked, held, held_until = slot
+            if slot_hash == key_hash and (not held_until or held_until > (now or time.time())):
+                self.hits += 1
+                return seq, SeatMap.from_bytes(booked), SeatMap.from_bytes(held)
+        self.misses += 1
+        return None
+
+    def put(self, key, booked, held=None, held_until=0.0, if_version=None):
+        """Stores a freshly loaded show. held_until is the earliest expiry among the held seats.
+
+        Pass the version read before loading from the database as if_version: if any
+        write happened meanwhile the loaded data may be stale and is not stored.
+        """
+        key_hash = self._hash(key)
+        with self._write_lock():
+            if if_version is not None and self.version != if_version:
+                return False
+            index = self._find(key_hash, for_write=True)
+            self._write_slot(index, key_hash, booked, held or SeatMap(), held_until)
+            return True
+
+    def _update(self, key, change):
+        key_hash = self._hash(key)
+        with self._write_lock():
+            index = self._find(key_hash)
+            slot = self._read_slot(index) if index is not None else None
+            if slot is None:
+                # Not cached: the next reader loads it from the database, but a load already in
+                # flight may predate this change, so its put(if_version=...) must be refused
+                self._bump_version()
+                return
+            _, _, booked, held, held_until = slot
+            booked, held, held_until = change(SeatMap.from_bytes(booked), SeatMap.from_bytes(held), held_until)
+            self._write_slot(index, key_hash, booked, held, held_until)
+
+    def add_booked(self, key, mask):
+        """Marks seats as booked after a commit; any hold on them has been converted."""
+        self._update(key, lambda booked, held, until: (SeatMap(booked.bits | mask), SeatMap(held.bits & ~mask), until))
+
+    def add_held(self, key, mask, expires_at):
+        self._update(key, lambda booked, held, until: (
+            booked, SeatMap(held.bits | mask), min(until, expires_at) if until else expires_at))
+
+    def invalidate(self, key):
+        key_hash = self._hash(key)
+        with self._write_lock():
+            index = self._find(key_hash)
+            if index is not None:
+                self._write_slot(index, _EMPTY_HASH, SeatMap(), SeatMap(), 0.0)
+            else:
+                self._bump_version() # Refuses loads that started before the change, as in _update
+
+    def clear(self):
+        with self._write_lock():
+            for index in range(self.slots):
+                slot = self._read_slot(index)
+                if slot is None or slot[1] != _EMPTY_HASH:
+                    self._write_slot(index, _EMPTY_HASH, SeatMap(), SeatMap(), 0.0)
+            self._bump_version()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'version': self.version}
@@ -0,0 +1,269 @@
+# Durable outbox for ticket delivery (PDF + email/SNS).
+# A booking request only records a job in a persistent store and returns; a fixed-size
+# pool of worker threads drains the store, retrying failures with exponential backoff.
+# Jobs survive worker restarts because they are only removed once delivered.
+#
+# A store implements:
+#   enqueue(kind, payload) -> job id
+#   claim(now) -> job dict {'id', 'kind', 'payload', 'attempts', 'created_at', ...} or None
+#   complete(job), retry(job, next_attempt_at, error), fail(job, error)
+#   depth() -> number of jobs not yet delivered or dead
+import json
+import os
+import random
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import Future
+
+
+class FileOutboxStore:
+    """Outbox spooled as one JSON file per job, for deployments without a SQL database.
+
+    pending/ holds jobs waiting to run, named by due time so a sorted listing is the
+    run order; a worker claims a job by renaming it into claimed/, which is atomic,
+    so several processes can share one spool directory.
+    """
+
+    def __init__(self, directory, lease_seconds=300):
+        self.directory = directory
+        self.lease_seconds = lease_seconds
+        for sub in ('pending', 'claimed', 'failed'):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+
+    def _path(self, sub, name):
+        return os.path.join(self.directory, sub, name)
+
+    def _write(self, sub, job):
+        name = f"{job['next_attempt_at']:017.6f}-{job['id']}.json"
+        tmp = self._path(sub, f".{name}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp, self._path(sub, name))
+
+    def enqueue(self, kind, payload):
+        now = time.time()
+        job = {'id': str(uuid.uuid4()), 'kind': kind, 'payload': payload, 'attempts': 0,
+               'created_at': now, 'next_attempt_at': now, 'last_error': None}
+        self._write('pending', job)
+        return job['id']
+
+    def _recover_expired_claims(self, now):
+        """Puts back jobs whose worker died mid-delivery (claim older than the lease)."""
+        for name in os.listdir(os.path.join(self.directory, 'claimed')):
+            path = self._path('claimed', name)
+            try:
+                if os.path.getmtime(path) < now - self.lease_seconds:
+                    os.rename(path, self._path('pending', name))
+            except OSError:
+                pass # Completed or recovered by someone else meanwhile
+
+    def claim(self, now):
+        self._recover_expired_claims(now)
+        for name in sorted(n for n in os.listdir(os.path.join(self.directory, 'pending')) if n.endswith('.json')):
+            if float(name.split('-', 1)[0]) > now:
+                return None # Sorted by due time: nothing else is due yet
+            claimed = self._path('claimed', name)
+            try:
+                os.rename(self._path('pending', name), claimed)
+            except OSError:
+                continue # Another worker claimed it first
+            os.utime(claimed) # Start of the lease
+            with open(claimed) as f:
+                job = json.load(f)
+            job['_file'] = name
+            return job
+        return None
+
+    def complete(self, job):
+        try:
+            os.remove(self._path('claimed', job['_file']))
+        except OSError:
+            pass
+
+    def retry(self, job, next_attempt_at, error):
+        name = job.pop('_file')
+        job.update(next_attempt_at=next_attempt_at, last_error=error)
+        self._write('pending', job)
+        os.remove(self._path('claimed', name))
+
+    def fail(self, job, error):
+        name = job.pop('_file')
+        job['last_error'] = error
+        self._write('failed', job)
+        os.remove(self._path('claimed', name))
+
+    def depth(self):
+        return sum(
+            1 for sub in ('pending', 'claimed')
+            for n in os.listdir(os.path.join(self.directory, sub)) if n.endswith('.json')
+        )
+
+
+class OutboxWorkerPool:
+    """Fixed number of worker threads delivering outbox jobs.
+
+    Each worker claims one job at a time. A handler may also return a Future (e.g. a
+    message queued for a batched send): the job is settled when the Future resolves and
+    the worker moves on meanwhile. Either way at most `max_in_flight` deliveries are
+    outstanding no matter how fast bookings arrive; the rest wait in the durable store.
+    """
+
+    def __init__(self, store, handlers, workers=4, max_attempts=6, backoff_base=5.0,
+                 backoff_max=600.0, poll_interval=2.0, context=None, max_in_flight=None):
+        self.store = store
+        self.handlers = handlers          # kind -> callable(payload); raising means "retry later"
+        self.workers = workers
+        self.max_in_flight = max_in_flight or workers
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.context = context            # Optional factory for a context manager around each job (e.g. app.app_context)
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.in_flight = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        """Starts the workers; safe to call repeatedly."""
+        with self._start_lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self._threads = [] # Left over from before a fork (e.g. gunicorn --preload): threads don't survive it
+            self._stopping = False
+            for i in range(self.workers):
+                t = threading.Thread(target=self._run, name=f"outbox-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def stop(self, timeout=10):
+        with self._start_lock:
+            self._stopping = True
+            self.notify(all_workers=True)
+            for t in self._threads:
+                t.join(timeout)
+            self._threads = []
+
+    def notify(self, all_workers=False):
+        """Wakes a sleeping worker right away instead of at its next poll (call after enqueueing)."""
+        with self._wakeup:
+            if all_workers:
+                self._wakeup.notify_all()
+            else:
+                self._wakeup.notify()
+
+    def backoff(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.75, 1.0) # Jitter so retries of a burst don't line up
+
+    def _run(self):
+        while not self._stopping:
+            if not self._slots.acquire(timeout=self.poll_interval):
+                continue # max_in_flight deliveries outstanding: don't claim more yet
+            try:
+                worked = self._run_once() # Releases the slot once the job settles (or if none was claimed)
+            except Exception as e:
+                print(f"Outbox worker error: {e}")
+                traceback.print_exc()
+                worked = False
+            if not worked:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+
+    def _run_once(self):
+        if self.context:
+            with self.context():
+                return self._process_next()
+        return self._process_next()
+
+    def _process_next(self):
+        """Claims and starts one job; returns False if none was due. The job's slot is released when it settles."""
+        try:
+            job = self.store.claim(time.time())
+        except Exception:
+            self._slots.release()
+            raise
+        if job is None:
+            self._slots.release()
+            return False
+        with self._lock:
+            self.in_flight += 1
+        try:
+            result = self.handlers[job['kind']](job['payload'])
+        except Exception as e:
+            self._settle(job, e)
+        else:
+            if isinstance(result, Future):
+                result.add_done_callback(lambda future: self._settle_later(job, future))
+            else:
+                self._settle(job, None)
+        return True
+
+    def _settle_later(self, job, future):
+        # Runs on whichever thread resolved the Future
+        try:
+            if self.context:
+                with self.context():
+                    self._settle(job, future.exception())
+            else:
+                self._settle(job, future.exception())
+        except Exception as e:
+            print(f"Outbox error settling job {job['id']}: {e}")
+            traceback.print_exc()
+
+    def _settle(self, job, error):
+        """Records the outcome of a delivery: done, retry later, or give up."""
+        try:
+            if error is None:
+                self.store.complete(job)
+                with self._lock:
+                    self.delivered += 1
+                    self._latencies.append(time.time() - job['created_at'])
+                return
+            attempts = job['attempts'] + 1
+            job['attempts'] = attempts
+            error = f"{type(error).__name__}: {error}"
+            if attempts >= self.max_attempts:
+                print(f"Outbox job {job['id']} ({job['kind']}) failed permanently: {error}")
+                self.store.fail(job, error)
+                with self._lock:
+                    self.failed += 1
+            else:
+                print(f"Outbox job {job['id']} ({job['kind']}) failed, attempt {attempts}: {error}")
+                self.store.retry(job, time.time() + self.backoff(attempts), error)
+                with self._lock:
+                    self.retried += 1
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        if self.context:
+            with self.context():
+                depth = self.store.depth()
+        else:
+            depth = self.store.depth()
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                'workers': self.workers,
+                'max_in_flight': self.max_in_flight,
+                'queue_depth': depth,
+                'in_flight': self.in_flight,
+                'delivered': self.delivered,
+                'retried': self.retried,
+                'failed': self.failed,
+                'latency_p50_seconds': round(latencies[len(latencies) // 2], 3) if latencies else None,
+                'latency_p95_seconds': round(latencies[int(len(latencies) * 0.95)], 3) if latencies else None
+            }
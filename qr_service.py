@@ -0,0 +1,103 @@
+# Cached QR code images for the /payment_qr and /ticket_qr routes.
+# A QR image is a pure function of its payload, so each one is rendered once, kept in
+# a byte-bounded LRU, and served with a strong ETag derived from the payload itself:
+# a browser that already has the image gets a 304 without anything being rendered.
+import hashlib
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from io import BytesIO
+
+import qrcode
+from flask import Response, request
+
+from ticket_render import qr_svg
+
+QR_RENDER_VERSION = 1         # Bump if the rendered images change, to invalidate client caches
+MAX_PAYMENT_AMOUNT = Decimal('100000')
+
+_MIMETYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def normalize_amount(raw):
+    """Parses a rupee amount into its canonical 2-decimal string, or None if it isn't a sane amount.
+
+    Keeps the cache key space bounded: '500', '500.0' and ' 500.00' all map to '500.00'.
+    """
+    try:
+        amount = Decimal((raw or '0').strip())
+    except InvalidOperation:
+        return None
+    if not amount.is_finite() or amount < 0 or amount > MAX_PAYMENT_AMOUNT:
+        return None
+    return str(amount.quantize(Decimal('0.01')))
+
+
+def _render_png(data):
+    buf = BytesIO()
+    qrcode.make(data).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+class QrImageCache:
+    """LRU of rendered QR images, bounded by total bytes."""
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # (fmt, data) -> bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def etag(data, fmt):
+        return hashlib.sha256(f"{QR_RENDER_VERSION}:{fmt}:{data}".encode('utf-8')).hexdigest()[:32]
+
+    def get(self, data, fmt='png'):
+        key = (fmt, data)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+        body = qr_svg(data) if fmt == 'svg' else _render_png(data)
+        with self._lock:
+            if key not in self._entries and len(body) <= self.max_bytes:
+                self._entries[key] = body
+                self._bytes += len(body)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return body
+
+    def response(self, data, fmt='png', max_age=86400, public=True):
+        """Builds the image response for the current request, answering 304 when the client's copy is current."""
+        etag = self.etag(data, fmt)
+        if etag in request.if_none_match:
+            with self._lock:
+                self.not_modified += 1
+            resp = Response(status=304)
+        else:
+            resp = Response(self.get(data, fmt), mimetype=_MIMETYPES[fmt])
+        resp.set_etag(etag)
+        resp.cache_control.max_age = max_age
+        if public:
+            resp.cache_control.public = True
+        else:
+            resp.cache_control.private = True
+        return resp
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
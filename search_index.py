@@ -0,0 +1,118 @@
+# Search over the movie catalog for home1: location and title queries, prefix autocomplete.
+# Built once per catalog version from titles, theater names and cities (the part of a
+# theater name after its last comma). Each word maps to the set of things containing it,
+# and a sorted word list finds every word starting with a query word by binary search,
+# so a query touches only the matching postings instead of every theater of every movie.
+# A query matches when each of its words is the start of some word in the field, e.g.
+# "nell" finds "M1 CINEMA, NELLORE" and "raja" finds "RAJA SAAB".
+import bisect
+import heapq
+import re
+from collections import namedtuple
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+SUGGESTION_KINDS = ('title', 'city', 'theater') # Also the order suggestions are listed in
+
+SearchResult = namedtuple('SearchResult', ['movies', 'theaters']) # theaters: matched names, or None if no location
+Page = namedtuple('Page', ['items', 'page', 'pages', 'total'])
+
+
+def words(text):
+    return _WORD.findall(text.lower())
+
+
+def city_of(theater_name):
+    """'M1 CINEMA, NELLORE' -> 'NELLORE' (None if the name has no city part)."""
+    _, sep, city = theater_name.rpartition(',')
+    return (city.strip() or None) if sep else None
+
+
+def paginate(items, page, per_page):
+    """Slices a result list into 1-based pages; an out-of-range or malformed page is clamped."""
+    try:
+        page = int(page)
+    except (TypeError, ValueError):
+        page = 1
+    pages = max(1, -(-len(items) // per_page))
+    page = max(1, min(page, pages))
+    start = (page - 1) * per_page
+    return Page(list(items[start:start + per_page]), page, pages, len(items))
+
+
+class _PrefixIndex:
+    """word -> ids of the entries containing it, looked up by word prefix."""
+
+    def __init__(self):
+        self._postings = {}
+        self._vocabulary = []
+
+    def add(self, key, text):
+        for word in words(text):
+            self._postings.setdefault(word, set()).add(key)
+
+    def freeze(self):
+        self._postings = {word: frozenset(ids) for word, ids in self._postings.items()}
+        self._vocabulary = sorted(self._postings)
+        return self
+
+    def _prefixed(self, prefix):
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff', start)
+        return set().union(*(self._postings[word] for word in self._vocabulary[start:end]))
+
+    def match(self, query):
+        """Ids whose text has a word starting with each word of the query; None for an empty query."""
+        result = None
+        for prefix in words(query):
+            ids = self._prefixed(prefix)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result
+
+
+class SearchIndex:
+    def __init__(self, movies):
+        self._movies = movies
+        self._titles = _PrefixIndex()
+        self._locations = _PrefixIndex() # Theater name -> its words (the city's included)
+        self._movies_at = {}             # Theater name -> positions of the movies showing there
+        for position, movie in enumerate(movies):
+            self._titles.add(position, movie['title'])
+            for theater in movie.get('theaters', ()):
+                self._locations.add(theater['name'], theater['name'])
+                self._movies_at.setdefault(theater['name'], set()).add(position)
+        self._titles.freeze()
+        self._locations.freeze()
+
+        suggestions = {('title', movie['title']) for movie in movies}
+        for name in self._movies_at:
+            suggestions.add(('theater', name))
+            if city_of(name):
+                suggestions.add(('city', city_of(name)))
+        self._suggestions = sorted(suggestions, key=lambda s: (SUGGESTION_KINDS.index(s[0]), s[1]))
+        self._suggest = _PrefixIndex()
+        for i, (_, value) in enumerate(self._suggestions):
+            self._suggest.add(i, value)
+        self._suggest.freeze()
+
+    def search(self, title='', location=''):
+        """Movies matching both queries (an empty query matches everything), in catalog order."""
+        positions = self._titles.match(title)
+        theaters = self._locations.match(location)
+        if theaters is not None:
+            showing = set().union(*(self._movies_at[name] for name in theaters))
+            positions = showing if positions is None else positions & showing
+        if positions is None:
+            return SearchResult(self._movies, None)
+        return SearchResult([self._movies[p] for p in sorted(positions)], theaters)
+
+    def suggest(self, prefix, kinds=SUGGESTION_KINDS, limit=8):
+        """Up to `limit` completions for a partly typed query: titles first, then cities, then theaters."""
+        ids = self._suggest.match(prefix)
+        if not ids:
+            return []
+        ids = (i for i in ids if self._suggestions[i][0] in kinds)
+        return [{'type': kind, 'value': value}
+                for kind, value in (self._suggestions[i] for i in heapq.nsmallest(limit, ids))]
@@ -0,0 +1,129 @@
+# Best-available seat allocation.
+# For every row of a show we keep the runs of consecutive free seats (start, length)
+# and the row's longest run. Finding the best block of n seats then only looks at rows
+# whose longest run fits n, and within a row at its few runs: O(rows), not O(seats).
+# When the occupancy changes, only the rows whose bits changed are rescanned.
+#
+# "Best" is the block whose centre is closest to the ideal seat: the middle of BEST_ROW.
+# select_seats.html draws the screen below row M, and the usual sweet spot is about two
+# thirds of the way back from the screen, so that's row E. A row away costs ROW_WEIGHT
+# seats of sideways distance.
+import threading
+from collections import OrderedDict
+
+from seat_map import ROWS, COLS, SeatMap, seat_mask
+
+BEST_ROW = 'E'
+ROW_WEIGHT = 2
+_BEST_ROW_INDEX = ROWS.index(BEST_ROW)
+_CENTRE = (COLS - 1) / 2 # Column index (0-based) of the middle seat
+_ROW_MASK = (1 << COLS) - 1
+
+
+def row_runs(row_bits):
+    """(start, length) of each run of free seats in one row's occupancy bits, left to right."""
+    runs = []
+    free = ~row_bits & _ROW_MASK
+    while free:
+        start = (free & -free).bit_length() - 1
+        rest = free >> start
+        length = (rest ^ (rest + 1)).bit_length() - 1 # Trailing ones of rest
+        runs.append((start, length))
+        free &= ~(((1 << length) - 1) << start)
+    return runs
+
+
+def _best_in_run(start, length, n):
+    """Column of the n-seat block inside a run whose centre is closest to the middle seat."""
+    ideal = int(_CENTRE - (n - 1) / 2) # An even block can't be centred exactly; lean left
+    return min(max(ideal, start), start + length - n)
+
+
+class FreeRuns:
+    """Per-row free-seat runs of one show."""
+    __slots__ = ('bits', 'runs', 'longest')
+
+    def __init__(self, seat_map=None):
+        self.bits = seat_map.bits if seat_map else 0
+        self.runs = [row_runs(self._row_bits(r)) for r in range(len(ROWS))]
+        self.longest = [max((length for _, length in runs), default=0) for runs in self.runs]
+
+    def _row_bits(self, r):
+        return (self.bits >> (r * COLS)) & _ROW_MASK
+
+    def update(self, seat_map):
+        """Brings the runs up to date with `seat_map`, rescanning only rows that changed; returns how many did."""
+        changed = self.bits ^ seat_map.bits
+        self.bits = seat_map.bits
+        rescanned = 0
+        for r in range(len(ROWS)):
+            if (changed >> (r * COLS)) & _ROW_MASK:
+                self.runs[r] = row_runs(self._row_bits(r))
+                self.longest[r] = max((length for _, length in self.runs[r]), default=0)
+                rescanned += 1
+        return rescanned
+
+    def best_block(self, n):
+        """Seat labels of the best block of n adjacent free seats in one row, or [] if no row has one."""
+        best = None
+        for r in range(len(ROWS)):
+            if self.longest[r] < n:
+                continue
+            row_cost = ROW_WEIGHT * abs(r - _BEST_ROW_INDEX)
+            if best and row_cost >= best[0]:
+                continue # Even a perfectly centred block here can't win
+            for start, length in self.runs[r]:
+                if length < n:
+                    continue
+                col = _best_in_run(start, length, n)
+                cost = row_cost + abs(col + (n - 1) / 2 - _CENTRE)
+                if not best or cost < best[0]:
+                    best = (cost, r, col)
+        if not best:
+            return []
+        _, r, col = best
+        return [f"{ROWS[r]}{c + 1}" for c in range(col, col + n)]
+
+
+class SeatAllocator:
+    """best_available() for any show, keeping the FreeRuns of up to max_shows recently used shows in memory."""
+
+    def __init__(self, max_shows=1024):
+        self.max_shows = max_shows
+        self._shows = OrderedDict() # show_id -> FreeRuns, least recently used first
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.builds = 0
+        self.rows_rescanned = 0
+
+    def best_available(self, show_id, occupied, n):
+        """The best block of n free seats given the show's occupied SeatMap (booked and held), or []."""
+        with self._lock:
+            runs = self._shows.get(show_id)
+            if runs is None:
+                runs = self._shows[show_id] = FreeRuns(occupied)
+                self.builds += 1
+                if len(self._shows) > self.max_shows:
+                    self._shows.popitem(last=False)
+            else:
+                self._shows.move_to_end(show_id)
+                self.rows_rescanned += runs.update(occupied)
+            self.allocations += 1
+            return runs.best_block(n)
+
+    def book(self, show_id, seats):
+        """Marks seats as taken in the show's runs, if it has any in memory."""
+        with self._lock:
+            runs = self._shows.get(show_id)
+            if runs:
+                self.rows_rescanned += runs.update(SeatMap(runs.bits | seat_mask(seats)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'shows': len(self._shows),
+                'max_shows': self.max_shows,
+                'allocations': self.allocations,
+                'builds': self.builds,
+                'rows_rescanned': self.rows_rescanned
+            }
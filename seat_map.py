@@ -0,0 +1,114 @@
+# Seat-state engine shared by app.py and aws_app.py.
+# The auditorium grid drawn by templates/select_seats.html (rows A-M, seats 1-17)
+# is mapped onto bit positions so a whole show fits in one small integer bitmap:
+# occupancy lookups, double-booking checks and "seats left" counts are bitwise ops
+# instead of splitting and scanning every booking's seat string.
+from collections import namedtuple
+
+ROWS = 'ABCDEFGHIJKLM'
+COLS = 17
+SEAT_COUNT = len(ROWS) * COLS           # 221 seats
+BITMAP_BYTES = (SEAT_COUNT + 7) // 8    # Fixed serialized size of one show's bitmap
+FULL_MASK = (1 << SEAT_COUNT) - 1
+MAX_SEATS_PER_BOOKING = 6               # Same cap select_seats.html enforces client-side
+ALMOST_FULL_SEATS_LEFT = 20             # Listing pages badge a show "almost full" from here down
+
+_ROW_INDEX = {r: i for i, r in enumerate(ROWS)}
+# Seat label -> bit position, built once so parsing a seat is a single dict lookup
+_SEAT_BITS = {f"{r}{c}": ri * COLS + (c - 1) for r, ri in _ROW_INDEX.items() for c in range(1, COLS + 1)}
+_BIT_SEATS = {bit: label for label, bit in _SEAT_BITS.items()}
+
+
+def seat_bit(seat):
+    """Returns the bit position for a seat label like 'C7'. Raises ValueError if unknown."""
+    try:
+        return _SEAT_BITS[seat.strip().upper()]
+    except (KeyError, AttributeError):
+        raise ValueError(f"Unknown seat: {seat!r}")
+
+
+def seat_mask(seats):
+    """Converts an iterable of seat labels (or a comma-separated string) into a bitmask."""
+    if isinstance(seats, str):
+        seats = [s for s in seats.split(',') if s.strip()]
+    mask = 0
+    for seat in seats:
+        mask |= 1 << seat_bit(seat)
+    return mask
+
+
+def seats_from_mask(mask):
+    """Expands a bitmask back into seat labels, in grid order (A1, A2, ... M17)."""
+    seats = []
+    while mask:
+        low = mask & -mask
+        seats.append(_BIT_SEATS[low.bit_length() - 1])
+        mask ^= low
+    return seats
+
+
+def canonical_seats(seats):
+    """Seat labels (an iterable or comma-separated string) as grid labels, each once, in grid order.
+
+    ' a1' and 'A1' are the same seat; anything stored or compared as a string must go
+    through here first. Raises ValueError for a seat outside the grid.
+    """
+    return seats_from_mask(seat_mask(seats))
+
+
+# What listing pages show for a show; status is 'available', 'almost_full' or 'sold_out'
+ShowAvailability = namedtuple('ShowAvailability', ['sold', 'seats_left', 'status'])
+
+
+def show_availability(sold):
+    """Availability badge data for a show with `sold` seats booked."""
+    left = max(0, SEAT_COUNT - sold)
+    status = 'sold_out' if not left else 'almost_full' if left <= ALMOST_FULL_SEATS_LEFT else 'available'
+    return ShowAvailability(sold, left, status)
+
+
+class SeatMap:
+    """Fixed-size occupancy bitmap for a single show."""
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        self.bits = bits & FULL_MASK
+
+    @classmethod
+    def from_seat_strings(cls, seat_strings):
+        """Builds a map from stored comma-separated seat strings, skipping labels outside the grid."""
+        bits = 0
+        for seats in seat_strings:
+            if not seats:
+                continue
+            for seat in seats.split(','):
+                bit = _SEAT_BITS.get(seat.strip().upper())
+                if bit is not None:
+                    bits |= 1 << bit
+        return cls(bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(int.from_bytes(data, 'little'))
+
+    def to_bytes(self):
+        return self.bits.to_bytes(BITMAP_BYTES, 'little')
+
+    def conflicts(self, seats):
+        """Returns the requested seats that are already taken (empty list if all are free)."""
+        return seats_from_mask(self.bits & seat_mask(seats))
+
+    def occupied_seats(self):
+        return seats_from_mask(self.bits)
+
+    def occupied_count(self):
+        return bin(self.bits).count('1')
+
+    def __or__(self, other):
+        return SeatMap(self.bits | other.bits)
+
+    def __eq__(self, other):
+        return isinstance(other, SeatMap) and self.bits == other.bits
+
+    def __repr__(self):
+        return f"SeatMap({self.occupied_count()}/{SEAT_COUNT} occupied)"
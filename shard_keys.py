@@ -0,0 +1,60 @@
+# Write sharding for DynamoDB partition keys.
+# Every item written under a busy key goes to one partition, which caps that key at about
+# 1000 write units (and 3000 read units) a second. Appending a suffix derived from the
+# item's own ID ('<key>#0' .. '<key>#<shards-1>') spreads the items evenly over `shards`
+# partition keys, and reading the whole key means querying every suffix. The queries run
+# concurrently, so a full read takes about as long as the largest shard.
+#
+# The shard count may be raised later (older items stay under the lower suffixes, which are
+# still read), but never lowered: items under the dropped suffixes would no longer be read.
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ShardedKey:
+    def __init__(self, shards):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.shards = shards
+
+    def shard_of(self, item_id):
+        # crc32, not hash(): the suffix must be the same in every process
+        return zlib.crc32(item_id.encode('utf-8')) % self.shards
+
+    def for_item(self, key, item_id):
+        """The sharded partition key an item with this ID is written under."""
+        return f"{key}#{self.shard_of(item_id)}"
+
+    def all(self, key):
+        """Every sharded partition key of `key`, i.e. what a reader must query."""
+        return [f"{key}#{n}" for n in range(self.shards)]
+
+
+class FanOut:
+    """Runs one call per shard concurrently on a shared thread pool and returns the results in shard order."""
+
+    def __init__(self, max_workers=16):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.fan_outs = 0
+        self.calls = 0
+
+    def map(self, fn, keys):
+        keys = list(keys)
+        if len(keys) == 1:
+            results = [fn(keys[0])] # Nothing to overlap
+        else:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='shard-fan-out')
+            results = list(self._executor.map(fn, keys)) # Re-raises the first failure
+        with self._lock:
+            self.fan_outs += 1
+            self.calls += len(keys)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {'max_workers': self.max_workers, 'fan_outs': self.fan_outs, 'calls': self.calls}
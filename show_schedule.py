@@ -0,0 +1,173 @@
+# Show schedule: every screening of a movie is a Show with a real start datetime.
+# The catalog gives each theater entry a weekly 'schedule' of start times, expanded into
+# dated Shows for a rolling window of SCHEDULE_DAYS days from today.
+# A show_id is derived from (movie, theater, auditorium, start), so it is stable across
+# catalog reloads and processes and is the key bookings, seat state and holds are stored
+# under in both backends. It starts with the start time, so IDs sort chronologically.
+#
+# Older data identified a show by its movie, theater and time string, plus (aws_app.py
+# only) a rolling 'TODAY'/'TOMORROW'/'DAY OF TOMORROW' label, so bookings for different
+# dates shared one key. The helpers at the bottom map that data onto show IDs.
+import hashlib
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+# Day labels used by the old catalog and booking items, as days after the booking date
+LEGACY_DAY_OFFSETS = {'TODAY': 0, 'TOMORROW': 1, 'DAY OF TOMORROW': 2}
+DEFAULT_AUDITORIUM = '1'
+SCHEDULE_DAYS = 7 # Days of shows listed and bookable, today included
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def make_show_id(movie, theater, auditorium, starts_at):
+    digest = hashlib.sha1(f"{movie}|{theater}|{auditorium}|{starts_at.isoformat()}".encode('utf-8')).hexdigest()
+    return f"{starts_at:%Y%m%dT%H%M}-{digest[:10]}"
+
+
+def format_show_time(starts_at):
+    """datetime -> '8:00 AM', the time format the catalog and tickets have always used."""
+    hour = starts_at.hour % 12 or 12
+    return f"{hour}:{starts_at.minute:02d} {'AM' if starts_at.hour < 12 else 'PM'}"
+
+
+def parse_show_time(time_slot):
+    """'8:00 AM' -> (8, 0). Raises ValueError for anything else."""
+    parsed = datetime.strptime(time_slot.strip(), '%I:%M %p')
+    return parsed.hour, parsed.minute
+
+
+def format_show_date(value):
+    """Template filter: a show's date ('Sun 18 Oct 2026') from a datetime or an ISO string; '' if unknown."""
+    if not value:
+        return ''
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value # A legacy day label such as 'TODAY'
+    return value.strftime('%a %d %b %Y')
+
+
+def scheduled_starts(schedule, first_day, days=SCHEDULE_DAYS):
+    """Start datetimes of a weekly schedule on the `days` days from first_day, in order.
+
+    schedule maps 'daily' and/or weekday names ('mon'..'sun') to 'HH:MM' start times; a
+    weekday's own list replaces the daily one on that day. Raises ValueError for bad entries.
+    """
+    unknown = set(schedule) - set(WEEKDAYS) - {'daily'}
+    if unknown:
+        raise ValueError(f"Unknown schedule keys: {', '.join(sorted(unknown))}")
+    times = {key: sorted({time.fromisoformat(slot) for slot in slots}) for key, slots in schedule.items()}
+    starts = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        starts.extend(datetime.combine(day, t) for t in times.get(WEEKDAYS[day.weekday()], times.get('daily', ())))
+    return starts
+
+
+def weekly_schedule(days):
+    """{date: [time]} -> schedule: the first day's times daily, plus each later day's for its weekday if different."""
+    first, *rest = sorted(days)
+    daily = sorted(set(days[first]))
+    schedule = {'daily': [f"{t:%H:%M}" for t in daily]}
+    for day in rest:
+        if sorted(set(days[day])) != daily:
+            schedule[WEEKDAYS[day.weekday()]] = [f"{t:%H:%M}" for t in sorted(set(days[day]))]
+    return schedule
+
+
+class Show(namedtuple('Show', ['show_id', 'movie', 'theater', 'auditorium', 'starts_at', 'price'])):
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, movie, theater, auditorium, starts_at, price):
+        return cls(make_show_id(movie, theater, auditorium, starts_at), movie, theater, auditorium, starts_at, price)
+
+    @property
+    def time(self):
+        return format_show_time(self.starts_at)
+
+    @property
+    def date(self):
+        return self.starts_at.date()
+
+    def to_dict(self):
+        return {'show_id': self.show_id, 'movie': self.movie, 'theater': self.theater, 'auditorium': self.auditorium,
+                'starts_at': self.starts_at.isoformat(timespec='minutes'), 'price': self.price}
+
+
+def shows_by_day(theater_shows):
+    """[(theater, shows)] -> [(date, [(theater, that day's shows)])], days in order, for booking_form.html."""
+    days = {}
+    for theater, shows in theater_shows:
+        for show in shows:
+            per_theater = days.setdefault(show.date, {})
+            per_theater.setdefault(theater['name'], (theater, []))[1].append(show)
+    return [(day, list(days[day].values())) for day in sorted(days)]
+
+
+# --- Pre-schedule data ---
+
+def legacy_show_id(movie, theater, time_slot, day=None):
+    """Key for bookings that can't be placed on a date (app.py never recorded one)."""
+    key = '#'.join([movie, theater, time_slot] + ([day] if day else []))
+    return 'legacy-' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def legacy_show_start(booked_at, time_slot, day):
+    """Start of a show booked at unix time booked_at for a day label and time, or None if unknown."""
+    if day not in LEGACY_DAY_OFFSETS or not booked_at:
+        return None
+    try:
+        hour, minute = parse_show_time(time_slot)
+    except ValueError:
+        return None
+    show_date = datetime.fromtimestamp(float(booked_at)).date() + timedelta(days=LEGACY_DAY_OFFSETS[day])
+    return datetime(show_date.year, show_date.month, show_date.day, hour, minute)
+
+
+def scheduled_catalog(movies, base_date):
+    """Converts catalog entries with 'timings_by_day' labels or dated 'shows' lists into weekly schedules.
+
+    The labels are resolved against base_date (the day the catalog was written for).
+    Each movie at a theater gets its own auditorium, numbered in catalog order.
+    """
+    auditoriums = {}
+    converted = []
+    for movie in movies:
+        theaters = []
+        for theater in movie.get('theaters', []):
+            theater = dict(theater)
+            timings = theater.pop('timings_by_day', {})
+            if 'auditorium' not in theater:
+                auditoriums[theater['name']] = auditoriums.get(theater['name'], 0) + 1
+                theater['auditorium'] = str(auditoriums[theater['name']])
+            days = {}
+            for day, slots in timings.items():
+                show_date = base_date + timedelta(days=LEGACY_DAY_OFFSETS[day])
+                for slot in slots:
+                    days.setdefault(show_date, []).append(time(*parse_show_time(slot)))
+            for starts_at in map(datetime.fromisoformat, theater.pop('shows', [])):
+                days.setdefault(starts_at.date(), []).append(starts_at.time())
+            if days:
+                theater['schedule'] = dict(theater.get('schedule', {}), **weekly_schedule(days))
+            theaters.append(theater)
+        converted.append(dict(movie, theaters=theaters))
+    return converted
+
+
+if __name__ == '__main__':
+    # python show_schedule.py movies.json [YYYY-MM-DD]: rewrites a catalog that still uses day labels or dated shows
+    import json
+    import sys
+    from datetime import date
+
+    path = sys.argv[1]
+    base = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else date.today()
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    data['movies'] = scheduled_catalog(data['movies'], base)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    print(f"Converted {len(data['movies'])} movies in {path} to weekly schedules")
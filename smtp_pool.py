@@ -0,0 +1,176 @@
+# Pool of authenticated SMTP sessions for ticket emails.
+# Connecting to smtp.gmail.com costs a TCP + TLS handshake and an AUTH round trip; doing
+# that per ticket dominated the time to send one. Sessions are kept open and reused,
+# checked with NOOP after they have been idle, and replaced when the server drops them.
+import smtplib
+import ssl
+import threading
+import time
+from queue import LifoQueue, Empty
+
+# Errors that mean the session is unusable (as opposed to the message being rejected).
+# Not OSError: SMTPException subclasses it, so refused recipients would look like a dropped session.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+class _Session:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SmtpPool:
+    """At most `size` open SMTP sessions, shared by the threads sending email.
+
+    Idle sessions are kept last-in-first-out so the most recently used (least likely
+    to have been dropped by the server) is reused first; sessions idle for longer than
+    max_idle are closed instead of reused, and sessions idle for more than
+    check_after seconds are probed with NOOP before a message is sent on them.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=True, starttls=False,
+                 size=4, timeout=30, max_idle=120, check_after=5, max_messages_per_session=100):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.max_messages_per_session = max_messages_per_session # Providers cap messages per connection
+        self._idle = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reuses = 0
+        self.reconnects = 0
+        self.sent = 0
+
+    # --- sessions ----------------------------------------------------------
+    def _connect(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=ssl.create_default_context())
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls(context=ssl.create_default_context())
+        try:
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        with self._lock:
+            self.connects += 1
+        return _Session(smtp)
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, session):
+        try:
+            return session.smtp.noop()[0] == 250
+        except CONNECTION_ERRORS:
+            return False
+
+    def _checkout(self):
+        """Returns a usable session from the idle stack, or a new one. Caller holds a slot."""
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except Empty:
+                return self._connect()
+            idle_for = time.monotonic() - session.last_used
+            if idle_for > self.max_idle or (idle_for > self.check_after and not self._is_alive(session)):
+                self._close(session.smtp)
+                continue
+            with self._lock:
+                self.reuses += 1
+            return session
+
+    def _checkin(self, session):
+        session.last_used = time.monotonic()
+        if session.sent >= self.max_messages_per_session:
+            self._close(session.smtp)
+        else:
+            self._idle.put(session)
+
+    # --- sending -----------------------------------------------------------
+    def _send_on(self, session, msg):
+        session.smtp.send_message(msg)
+        session.sent += 1
+        with self._lock:
+            self.sent += 1
+
+    def send_many(self, messages):
+        """Sends EmailMessages over a single session, reconnecting once per message if it drops.
+
+        Returns a list of (message, exception) for messages the server refused; raises if
+        the server can't be reached at all.
+        """
+        failures = []
+        with self._slots:
+            session = self._checkout()
+            try:
+                for msg in messages:
+                    if session.sent >= self.max_messages_per_session:
+                        self._close(session.smtp)
+                        session = self._connect()
+                    try:
+                        try:
+                            self._send_on(session, msg)
+                        except CONNECTION_ERRORS:
+                            # The server dropped the session (idle timeout, restart): one fresh attempt
+                            self._close(session.smtp)
+                            with self._lock:
+                                self.reconnects += 1
+                            session = self._connect()
+                            self._send_on(session, msg)
+                    except CONNECTION_ERRORS:
+                        raise # Dropped again straight after reconnecting: the server can't be reached
+                    except smtplib.SMTPException as e:
+                        # Refused, possibly by the retry: the session is fine, so carry on with the batch
+                        failures.append((msg, e))
+                        session.smtp.rset() # Clear the failed transaction before the next message
+            except Exception:
+                self._close(session.smtp)
+                raise
+            self._checkin(session)
+        return failures
+
+    def send(self, msg):
+        """Sends one EmailMessage on a pooled session; raises if it was not accepted."""
+        failures = self.send_many([msg])
+        if failures:
+            raise failures[0][1]
+
+    def close(self):
+        """Closes every idle session (sessions in use are closed when returned)."""
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except Empty:
+                return
+            self._close(session.smtp)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle_sessions': self._idle.qsize(),
+                'connects': self.connects,
+                'reuses': self.reuses,
+                'reconnects': self.reconnects,
+                'sent': self.sent
+            }
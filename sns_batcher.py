@@ -0,0 +1,111 @@
+# Batched SNS publishing.
+# Messages submitted within a short window are sent together with PublishBatch (up to
+# 10 per call) instead of one Publish call each. Every message gets a Future that
+# resolves with its MessageId, or fails with the error SNS reported for that entry,
+# so one rejected entry doesn't fail the rest of its batch.
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+MAX_BATCH = 10 # PublishBatch limit (entries per call)
+
+
+class SnsPublishError(Exception):
+    """SNS rejected one entry of a PublishBatch call."""
+
+    def __init__(self, code, message, sender_fault):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.sender_fault = sender_fault # True: the message itself is bad, retrying won't help
+
+
+class SnsBatcher:
+    """Background thread publishing queued messages to one topic in batches.
+
+    A batch is sent as soon as it holds MAX_BATCH messages, or `linger` seconds after its
+    first message arrived. submit() blocks when max_pending messages are already
+    waiting, so a slow SNS pushes back on the callers instead of growing memory.
+    """
+
+    def __init__(self, client, topic_arn, linger=0.05, max_batch=MAX_BATCH, max_pending=1000):
+        self.client = client
+        self.topic_arn = topic_arn
+        self.linger = linger
+        self.max_batch = min(max_batch, MAX_BATCH)
+        self._pending = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.messages = 0
+        self.api_calls = 0
+        self.failed_entries = 0
+
+    def submit(self, message, subject=None):
+        """Queues a message; returns a Future resolving to its SNS MessageId."""
+        self._ensure_started()
+        future = Future()
+        entry = {'Message': message}
+        if subject:
+            entry['Subject'] = subject
+        self._pending.put((entry, future))
+        return future
+
+    def publish(self, message, subject=None, timeout=30):
+        """Queues a message and waits for it to be published; raises if it wasn't."""
+        return self.submit(message, subject).result(timeout)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='sns-batcher', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _send(self, batch):
+        entries = [dict(entry, Id=str(i)) for i, (entry, _) in enumerate(batch)]
+        futures = {str(i): future for i, (_, future) in enumerate(batch)}
+        with self._lock:
+            self.api_calls += 1
+            self.messages += len(batch)
+        try:
+            resp = self.client.publish_batch(TopicArn=self.topic_arn, PublishBatchRequestEntries=entries)
+        except Exception as e:
+            # The whole call failed (network, throttling, permissions): every entry failed
+            with self._lock:
+                self.failed_entries += len(batch)
+            for future in futures.values():
+                future.set_exception(e)
+            return
+        for ok in resp.get('Successful', []):
+            futures.pop(ok['Id']).set_result(ok.get('MessageId'))
+        for failed in resp.get('Failed', []):
+            with self._lock:
+                self.failed_entries += 1
+            futures.pop(failed['Id']).set_exception(
+                SnsPublishError(failed.get('Code'), failed.get('Message'), failed.get('SenderFault')))
+        for future in futures.values(): # Not reported either way; treat as failed so it is retried
+            future.set_exception(SnsPublishError('Unknown', 'entry missing from PublishBatch response', False))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'messages': self.messages,
+                'api_calls': self.api_calls,
+                'messages_per_call': round(self.messages / self.api_calls, 2) if self.api_calls else 0.0,
+                'failed_entries': self.failed_entries,
+                'pending': self._pending.qsize()
+            }
@@ -0,0 +1,98 @@
+import unittest
+
+from booking_history import PageTokens, read_tiered_page
+
+RECENT = [f"r{i}" for i in range(5, 0, -1)] # Newest first
+ARCHIVE = [f"a{i}" for i in range(4, 0, -1)]
+
+
+def reader(rows, reads=None):
+    def read(after, n):
+        if reads is not None:
+            reads.append((after, n))
+        start = rows.index(after) + 1 if after is not None else 0
+        return rows[start:start + n]
+    return read
+
+
+def tiers(reads=None):
+    return [('recent', reader(RECENT, reads)), ('archive', reader(ARCHIVE, reads))]
+
+
+def key(row):
+    return row
+
+
+class ReadTieredPageTest(unittest.TestCase):
+    def setUp(self):
+        self.tokens = PageTokens('secret')
+
+    def read_all(self, limit):
+        """Pages through the whole history the way the routes do, round-tripping each position as a token."""
+        pages, token = [], None
+        while True:
+            position = self.tokens.loads('a@x', token) if token else None
+            page, position = read_tiered_page(tiers(), position, limit, key)
+            pages.append(page)
+            if position is None:
+                return pages
+            token = self.tokens.dumps('a@x', position)
+
+    def test_pages_cover_both_tiers_once_in_order(self):
+        for limit in range(1, 11):
+            pages = self.read_all(limit)
+            self.assertEqual([row for page in pages for row in page], RECENT + ARCHIVE, limit)
+            self.assertTrue(all(0 < len(page) <= limit for page in pages), limit)
+
+    def test_page_crossing_into_the_archive_continues_inside_it(self):
+        page, position = read_tiered_page(tiers(), ['recent', 'r3'], 4, key)
+
+        self.assertEqual(page, ['r2', 'r1', 'a4', 'a3'])
+        self.assertEqual(position, ['archive', 'a3'])
+
+    def test_page_ending_with_the_recent_tier_starts_the_archive_from_its_newest(self):
+        page, position = read_tiered_page(tiers(), None, 5, key)
+
+        self.assertEqual(page, RECENT)
+        self.assertEqual(position, ['archive', None])
+
+    def test_archive_is_not_read_while_recent_bookings_fill_the_page(self):
+        reads = []
+
+        page, position = read_tiered_page(tiers(reads), None, 3, key)
+
+        self.assertEqual(page, ['r5', 'r4', 'r3'])
+        self.assertEqual(position, ['recent', 'r3'])
+        self.assertEqual(reads, [(None, 4)]) # One recent read, including the look-ahead row
+
+    def test_last_page_has_no_next_position(self):
+        page, position = read_tiered_page(tiers(), ['archive', 'a2'], 10, key)
+
+        self.assertEqual(page, ['a1'])
+        self.assertIsNone(position)
+
+    def test_position_naming_no_tier_is_rejected(self):
+        for position in (['nowhere', None], 'recent', ['recent'], {'recent': None}):
+            with self.assertRaises(ValueError):
+                read_tiered_page(tiers(), position, 3, key)
+
+
+class PageTokensTest(unittest.TestCase):
+    def test_token_is_bound_to_its_user(self):
+        tokens = PageTokens('secret')
+        token = tokens.dumps('a@x', ['recent', 'r3'])
+
+        self.assertEqual(tokens.loads('a@x', token), ['recent', 'r3'])
+        with self.assertRaises(ValueError):
+            tokens.loads('b@x', token)
+
+    def test_tampered_or_foreign_token_is_rejected(self):
+        token = PageTokens('secret').dumps('a@x', ['recent', 'r3'])
+
+        for bad in (token[:-2] + 'xx', PageTokens('other secret').dumps('a@x', ['recent', 'r3'])):
+            with self.assertRaises(ValueError):
+                PageTokens('secret').loads('a@x', bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
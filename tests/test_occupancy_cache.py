@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+import unittest
+
+from occupancy_cache import OccupancyCache
+from seat_map import SeatMap, seat_mask
+
+SHOW = '20261018T1810-abc'
+
+
+class OccupancyCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'occupancy.cache')
+        self.cache = OccupancyCache(self.path, slots=64)
+
+    def assert_stale_load_refused(self, change):
+        """A loader reads the version, the change commits, then the loader stores what it read."""
+        version = self.cache.version
+        change()
+        self.assertFalse(self.cache.put(SHOW, SeatMap(), if_version=version))
+        self.assertIsNone(self.cache.get(SHOW))
+
+    def test_booking_on_uncached_show_refuses_an_older_load(self):
+        self.assert_stale_load_refused(lambda: self.cache.add_booked(SHOW, seat_mask(['A1'])))
+
+    def test_hold_on_uncached_show_refuses_an_older_load(self):
+        self.assert_stale_load_refused(lambda: self.cache.add_held(SHOW, seat_mask(['A1']), time.time() + 300))
+
+    def test_invalidating_an_uncached_show_refuses_an_older_load(self):
+        self.assert_stale_load_refused(lambda: self.cache.invalidate(SHOW))
+
+    def test_load_without_concurrent_changes_is_stored(self):
+        version = self.cache.version
+        self.assertTrue(self.cache.put(SHOW, SeatMap(seat_mask(['B2'])), if_version=version))
+
+        _, booked, held = self.cache.get(SHOW)
+        self.assertEqual(booked.occupied_seats(), ['B2'])
+        self.assertEqual(held.bits, 0)
+
+    def test_booking_on_cached_show_is_seen_by_another_process(self):
+        self.cache.put(SHOW, SeatMap(), held=SeatMap(seat_mask(['A1'])), held_until=time.time() + 300)
+        other = OccupancyCache(self.path, slots=64) # Another worker mapping the same file
+
+        other.add_booked(SHOW, seat_mask(['A1', 'A2']))
+
+        _, booked, held = self.cache.get(SHOW)
+        self.assertEqual(booked.occupied_seats(), ['A1', 'A2'])
+        self.assertEqual(held.bits, 0) # The hold was converted into the booking
+
+    def test_expired_holds_make_the_entry_a_miss(self):
+        self.cache.put(SHOW, SeatMap(), held=SeatMap(seat_mask(['A1'])), held_until=time.time() - 1)
+
+        self.assertIsNone(self.cache.get(SHOW))
+
+
+if __name__ == '__main__':
+    unittest.main()
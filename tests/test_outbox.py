@@ -0,0 +1,133 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import Future
+
+from outbox import FileOutboxStore, OutboxWorkerPool
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.005)
+
+
+class FileOutboxStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = FileOutboxStore(self.tmp.name, lease_seconds=60)
+
+    def test_claims_due_jobs_oldest_first_and_each_only_once(self):
+        first = self.store.enqueue('ticket_email', {'n': 1})
+        second = self.store.enqueue('ticket_email', {'n': 2})
+        now = time.time()
+
+        claimed = [self.store.claim(now), self.store.claim(now), self.store.claim(now)]
+
+        self.assertEqual([job['id'] for job in claimed[:2]], [first, second])
+        self.assertEqual(claimed[0]['payload'], {'n': 1})
+        self.assertIsNone(claimed[2])
+        self.assertEqual(self.store.depth(), 2) # Claimed jobs still count until delivered
+
+    def test_retried_job_waits_until_its_next_attempt(self):
+        self.store.enqueue('ticket_email', {})
+        job = self.store.claim(time.time())
+        job['attempts'] = 1
+        self.store.retry(job, time.time() + 30, 'SMTPException: busy')
+
+        self.assertIsNone(self.store.claim(time.time()))
+        again = self.store.claim(time.time() + 31)
+        self.assertEqual((again['id'], again['attempts'], again['last_error']), (job['id'], 1, 'SMTPException: busy'))
+
+    def test_claim_of_a_dead_worker_is_recovered_after_the_lease(self):
+        job_id = self.store.enqueue('ticket_email', {})
+        self.store.claim(time.time())
+
+        self.assertIsNone(self.store.claim(time.time() + 30))
+        self.assertEqual(self.store.claim(time.time() + 61)['id'], job_id)
+
+    def test_completed_and_failed_jobs_leave_the_queue(self):
+        self.store.enqueue('ticket_email', {})
+        self.store.enqueue('ticket_email', {})
+        self.store.complete(self.store.claim(time.time()))
+        self.store.fail(self.store.claim(time.time()), 'ValueError: bad address')
+
+        self.assertEqual(self.store.depth(), 0)
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, 'failed'))), 1)
+
+
+class OutboxWorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = FileOutboxStore(self.tmp.name)
+
+    def pool(self, handler, **kwargs):
+        pool = OutboxWorkerPool(self.store, {'ticket_email': handler}, workers=2,
+                                backoff_base=0.01, backoff_max=0.05, poll_interval=0.01, **kwargs)
+        self.addCleanup(pool.stop)
+        pool.start()
+        return pool
+
+    def test_backoff_doubles_up_to_the_cap_with_jitter(self):
+        pool = OutboxWorkerPool(self.store, {}, backoff_base=5.0, backoff_max=600.0)
+
+        for attempts, delay in [(1, 5), (2, 10), (3, 20), (7, 320), (8, 600), (20, 600)]:
+            for _ in range(20):
+                self.assertTrue(delay * 0.75 <= pool.backoff(attempts) <= delay, attempts)
+
+    def test_failed_delivery_is_retried_until_it_succeeds(self):
+        calls = []
+
+        def flaky(payload):
+            calls.append(payload)
+            if len(calls) < 3:
+                raise ConnectionError("SMTP server unavailable")
+
+        pool = self.pool(flaky)
+        self.store.enqueue('ticket_email', {'booking_id': 'b1'})
+        pool.notify()
+
+        wait_for(lambda: pool.stats()['delivered'] == 1)
+        self.assertEqual(calls, [{'booking_id': 'b1'}] * 3)
+        stats = pool.stats()
+        self.assertEqual((stats['retried'], stats['failed'], stats['queue_depth']), (2, 0, 0))
+
+    def test_job_fails_permanently_after_max_attempts(self):
+        def broken(payload):
+            raise ValueError("bad address")
+
+        pool = self.pool(broken, max_attempts=3)
+        self.store.enqueue('ticket_email', {})
+        pool.notify()
+
+        wait_for(lambda: pool.stats()['failed'] == 1)
+        self.assertEqual(pool.stats()['retried'], 2)
+        [name] = os.listdir(os.path.join(self.tmp.name, 'failed'))
+        with open(os.path.join(self.tmp.name, 'failed', name)) as f:
+            self.assertIn('ValueError: bad address', f.read())
+
+    def test_job_returning_a_future_settles_when_it_resolves(self):
+        futures = []
+
+        def queued(payload):
+            futures.append(Future())
+            return futures[-1]
+
+        pool = self.pool(queued)
+        self.store.enqueue('ticket_email', {})
+        pool.notify()
+        wait_for(lambda: futures)
+
+        self.assertEqual(pool.stats()['in_flight'], 1)
+        futures[0].set_result(None)
+        self.assertEqual(pool.stats()['delivered'], 1)
+        self.assertEqual(pool.stats()['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import random
+import unittest
+
+from seat_allocator import BEST_ROW, ROW_WEIGHT, FreeRuns, SeatAllocator, row_runs
+from seat_map import COLS, ROWS, SeatMap, seat_mask
+
+
+def taken(*rows):
+    """SeatMap from 'E': '..xx.x...' style strings, one character per seat ('x' = taken)."""
+    seats = [f"{row}{c + 1}" for row, pattern in rows for c, mark in enumerate(pattern) if mark == 'x']
+    return SeatMap(seat_mask(seats))
+
+
+def cost(seats):
+    """What best_block minimises for a block: rows from BEST_ROW, weighted, plus distance from the middle seat."""
+    row = ROWS.index(seats[0][0])
+    first = int(seats[0][1:]) - 1
+    return ROW_WEIGHT * abs(row - ROWS.index(BEST_ROW)) + abs(first + (len(seats) - 1) / 2 - (COLS - 1) / 2)
+
+
+def brute_force_cost(seat_map, n):
+    """Lowest cost of any block of n free adjacent seats, checking every position; None if there is none."""
+    costs = []
+    for row in ROWS:
+        for first in range(COLS - n + 1):
+            seats = [f"{row}{c + 1}" for c in range(first, first + n)]
+            if not seat_map.conflicts(seats):
+                costs.append(cost(seats))
+    return min(costs, default=None)
+
+
+class RowRunsTest(unittest.TestCase):
+    def test_runs_of_a_fragmented_row(self):
+        bits = seat_mask(['A1', 'A4', 'A5', 'A9', 'A17'])
+
+        self.assertEqual(row_runs(bits), [(1, 2), (5, 3), (9, 7)])
+
+    def test_full_and_empty_rows(self):
+        self.assertEqual(row_runs((1 << COLS) - 1), [])
+        self.assertEqual(row_runs(0), [(0, COLS)])
+
+
+class BestBlockTest(unittest.TestCase):
+    def test_skips_the_best_row_when_its_gaps_are_too_small(self):
+        seat_map = taken(('E', '...x...x...x...x.'))
+
+        self.assertEqual(FreeRuns(seat_map).best_block(3), ['E9', 'E10', 'E11'])
+        self.assertEqual(FreeRuns(seat_map).best_block(4), ['D7', 'D8', 'D9', 'D10'])
+
+    def test_picks_the_gap_nearest_the_middle_of_a_fragmented_row(self):
+        seat_map = taken(*((row, 'xxxxxxxxxxxxxxxxx') for row in ROWS if row != 'E'),
+                         ('E', '..x.xxxxxxx....xx'))
+
+        self.assertEqual(FreeRuns(seat_map).best_block(2), ['E12', 'E13'])
+        self.assertEqual(FreeRuns(seat_map).best_block(5), [])
+
+    def test_matches_brute_force_on_random_fragmented_shows(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            seat_map = SeatMap(sum(1 << bit for bit in rng.sample(range(len(ROWS) * COLS), rng.randrange(150, 215))))
+            for n in range(1, 7):
+                block = FreeRuns(seat_map).best_block(n)
+                expected = brute_force_cost(seat_map, n)
+                if expected is None:
+                    self.assertEqual(block, [])
+                    continue
+                self.assertEqual(len(block), n)
+                self.assertEqual(seat_map.conflicts(block), [])
+                self.assertEqual(cost(block), expected)
+
+
+class SeatAllocatorTest(unittest.TestCase):
+    def test_booking_rescans_only_the_changed_row(self):
+        allocator = SeatAllocator()
+        seat_map = taken(('E', '......xxx........'))
+        first = allocator.best_available('show', seat_map, 4)
+
+        allocator.book('show', first)
+        second = allocator.best_available('show', seat_map | SeatMap(seat_mask(first)), 4)
+
+        self.assertEqual(allocator.builds, 1)
+        self.assertEqual(allocator.rows_rescanned, 1)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual((seat_map | SeatMap(seat_mask(first))).conflicts(second), [])
+
+    def test_sees_seats_taken_elsewhere_since_the_last_call(self):
+        allocator = SeatAllocator()
+        block = allocator.best_available('show', SeatMap(), 2)
+
+        again = allocator.best_available('show', SeatMap(seat_mask(block)), 2)
+
+        self.assertNotEqual(again, block)
+        self.assertEqual(allocator.rows_rescanned, 1)
+
+    def test_forgets_the_least_recently_used_show(self):
+        allocator = SeatAllocator(max_shows=2)
+        for show in ('a', 'b', 'a', 'c', 'a'):
+            allocator.best_available(show, SeatMap(), 2)
+
+        self.assertEqual(allocator.builds, 3) # 'b' was dropped for 'c'; 'a' stayed in memory
+        self.assertEqual(allocator.stats()['shows'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
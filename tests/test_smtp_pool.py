@@ -0,0 +1,106 @@
+import smtplib
+import unittest
+from email.message import EmailMessage
+
+from smtp_pool import SmtpPool, _Session
+
+
+class FakeSMTP:
+    """Accepts every message except those to `refused`; drops the connection after `drop_after` sends."""
+
+    def __init__(self, server, refused=(), drop_after=None):
+        self.server = server
+        self.refused = set(refused)
+        self.drop_after = drop_after
+        self.sends = 0
+        self.closed = False
+
+    def send_message(self, msg):
+        if self.drop_after is not None and self.sends >= self.drop_after:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sends += 1
+        if msg['To'] in self.refused:
+            raise smtplib.SMTPRecipientsRefused({msg['To']: (550, b'5.1.1 No such user')})
+        self.server.delivered.append(msg['To'])
+
+    def rset(self):
+        return (250, b'OK')
+
+    def noop(self):
+        return (250, b'OK')
+
+    def quit(self):
+        self.closed = True
+
+
+class FakePool(SmtpPool):
+    def __init__(self, refused=(), drop_after=None):
+        super().__init__('smtp.example.com', 465)
+        self.refused = refused
+        self.drop_after = drop_after
+        self.delivered = []
+        self.sessions = []
+
+    def _connect(self):
+        # Only the first session drops; the reconnect gets a healthy one
+        smtp = FakeSMTP(self, self.refused, self.drop_after if not self.sessions else None)
+        self.sessions.append(smtp)
+        self.connects += 1
+        return _Session(smtp)
+
+
+def message(to):
+    msg = EmailMessage()
+    msg['From'] = 'tickets@example.com'
+    msg['To'] = to
+    msg['Subject'] = 'Your ticket'
+    msg.set_content('See attached.')
+    return msg
+
+
+class SendManyTest(unittest.TestCase):
+    def test_refused_recipient_does_not_stop_the_batch(self):
+        pool = FakePool(refused={'b@example.com'})
+        messages = [message(to) for to in ('a@example.com', 'b@example.com', 'c@example.com')]
+
+        failures = pool.send_many(messages)
+
+        self.assertEqual(pool.delivered, ['a@example.com', 'c@example.com'])
+        self.assertEqual(len(failures), 1)
+        self.assertIs(failures[0][0], messages[1])
+        self.assertIsInstance(failures[0][1], smtplib.SMTPRecipientsRefused)
+        # The session stayed usable: no reconnect and no resend of the refused message
+        self.assertEqual(pool.connects, 1)
+        self.assertEqual(pool.reconnects, 0)
+        self.assertEqual(pool.stats()['idle_sessions'], 1)
+
+    def test_dropped_session_is_replaced_once(self):
+        pool = FakePool(drop_after=1)
+
+        failures = pool.send_many([message('a@example.com'), message('b@example.com')])
+
+        self.assertEqual(failures, [])
+        self.assertEqual(pool.delivered, ['a@example.com', 'b@example.com'])
+        self.assertEqual(pool.reconnects, 1)
+        self.assertTrue(pool.sessions[0].closed)
+
+    def test_refusal_on_the_retry_after_a_reconnect_does_not_stop_the_batch(self):
+        pool = FakePool(refused={'b@example.com'}, drop_after=1)
+        messages = [message(to) for to in ('a@example.com', 'b@example.com', 'c@example.com')]
+
+        failures = pool.send_many(messages)
+
+        self.assertEqual(pool.delivered, ['a@example.com', 'c@example.com'])
+        self.assertEqual([(msg, type(e)) for msg, e in failures], [(messages[1], smtplib.SMTPRecipientsRefused)])
+        self.assertEqual(pool.reconnects, 1)
+        self.assertEqual(pool.stats()['idle_sessions'], 1)
+
+    def test_send_raises_when_refused(self):
+        pool = FakePool(refused={'a@example.com'})
+
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            pool.send(message('a@example.com'))
+
+
+if __name__ == '__main__':
+    unittest.main()
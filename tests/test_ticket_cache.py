@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+import unittest
+
+from ticket_cache import TicketPdfCache
+
+PDF = b'%PDF-1.4 ' + b'x' * 1000
+
+
+class TicketPdfCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = os.path.join(self.tmp.name, 'ticket_cache')
+
+    def disk_files(self):
+        return [name for _, _, names in os.walk(self.directory) for name in names]
+
+    def test_opening_a_new_version_purges_the_old_one(self):
+        old = TicketPdfCache(self.directory, 4)
+        old.put('b1', PDF)
+        legacy = os.path.join(self.directory, 'ab') # Layout from before versioned directories
+        os.makedirs(legacy)
+        with open(os.path.join(legacy, 'ab12.pdf'), 'wb') as f:
+            f.write(PDF)
+
+        new = TicketPdfCache(self.directory, 5)
+
+        self.assertEqual(os.listdir(self.directory), ['v5'])
+        self.assertEqual(self.disk_files(), [])
+        self.assertIsNone(new.get('b1'))
+
+    def test_disk_tier_sweeps_least_recently_used_files_past_the_cap(self):
+        cache = TicketPdfCache(self.directory, 5, max_memory_bytes=0, max_disk_bytes=len(PDF) * 7 // 2)
+        for i, booking_id in enumerate(['b1', 'b2', 'b3']):
+            cache.put(booking_id, PDF)
+            os.utime(cache._path(cache._key(booking_id)), (time.time() - 100 + i,) * 2)
+        self.assertEqual(cache.get('b1'), PDF) # Touches b1, leaving b2 the least recently used
+
+        cache.put('b4', PDF)
+
+        self.assertIsNone(cache.get('b2'))
+        for booking_id in ['b1', 'b3', 'b4']:
+            self.assertEqual(cache.get(booking_id), PDF)
+        stats = cache.stats()
+        self.assertEqual(stats['disk_evictions'], 1)
+        self.assertEqual(stats['disk_bytes'], len(PDF) * 3)
+
+    def test_reopening_measures_existing_files(self):
+        TicketPdfCache(self.directory, 5).put('b1', PDF)
+
+        self.assertEqual(TicketPdfCache(self.directory, 5).stats()['disk_bytes'], len(PDF))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import base64
+import os
+import re
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from ticket_render import POSTER_BOX, POSTER_PIXELS_PER_POINT, load_poster
+
+
+def poster_file(directory, size, fmt='JPEG'):
+    path = os.path.join(directory, 'poster.' + fmt.lower())
+    Image.new('RGB', size, (200, 30, 30)).save(path, format=fmt)
+    return path
+
+
+def embedded_images(pdf):
+    """(dictionary, stream bytes) of each image XObject in a PDF, with ASCII85 undone."""
+    images = []
+    for header, data in re.findall(rb'<<([^>]*?/Subtype /Image.*?)>>\s*stream\r?\n(.*?)endstream', pdf, re.S):
+        if b'/ASCII85Decode' in header:
+            data = base64.a85decode(data.strip().removesuffix(b'~>'))
+        images.append((header, data))
+    return images
+
+
+def render(poster):
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4)
+    poster.draw(p, 50, 570, *POSTER_BOX)
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+class PosterImageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_large_poster_is_downsampled_to_the_draw_box(self):
+        poster = load_poster(poster_file(self.tmp.name, (1200, 1700)))
+
+        with Image.open(BytesIO(poster.jpeg_bytes)) as im:
+            self.assertEqual(im.format, 'JPEG')
+            self.assertEqual(im.size, (POSTER_BOX[0] * POSTER_PIXELS_PER_POINT, POSTER_BOX[1] * POSTER_PIXELS_PER_POINT))
+
+    def test_small_jpeg_is_embedded_as_is(self):
+        path = poster_file(self.tmp.name, (100, 140))
+        with open(path, 'rb') as f:
+            original = f.read()
+        poster = load_poster(path)
+
+        pdf = render(poster)
+
+        self.assertEqual(poster.jpeg_bytes, original)
+        [(header, data)] = embedded_images(pdf)
+        self.assertIn(b'/DCTDecode', header)
+        self.assertEqual(data, original)
+
+    def test_concurrent_draws_each_embed_the_whole_poster(self):
+        poster = load_poster(poster_file(self.tmp.name, (1200, 1700), fmt='PNG'))
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6) # Switch threads often enough to interleave draws
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            pdfs = list(pool.map(lambda _: render(poster), range(400)))
+
+        for pdf in pdfs:
+            self.assertEqual([data for _, data in embedded_images(pdf)], [poster.jpeg_bytes])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# Ticket PDFs for SNS notifications, stored as blobs and referenced from the message.
+# Hex-encoding the PDF into the SNS message doubled its size and pushed large tickets
+# toward SNS's 256 KB limit. Instead the PDF is written once to a blob store and the
+# message carries a reference plus a checksum; small tickets may optionally be inlined
+# (zlib + base64) so the consumer doesn't need a second fetch.
+import base64
+import hashlib
+import os
+import threading
+import time
+import zlib
+
+
+class S3BlobStore:
+    """Ticket PDFs in an S3 bucket; references are s3://bucket/key."""
+
+    def __init__(self, client, bucket, prefix='tickets/'):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def put(self, name, data, content_type='application/pdf'):
+        key = f"{self.prefix}{name}"
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+        return f"s3://{self.bucket}/{key}"
+
+
+class LocalBlobStore:
+    """Stand-in for S3 in development and tests; references are file:// paths."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def put(self, name, data, content_type='application/pdf'):
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path): # Names include the checksum, so an existing file is identical
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return f"file://{path}"
+
+
+def encode_inline(pdf_bytes):
+    return base64.b64encode(zlib.compress(pdf_bytes, 9)).decode('ascii')
+
+
+def decode_inline(text):
+    return zlib.decompress(base64.b64decode(text))
+
+
+class TicketAttachments:
+    """Builds the PDF fields of a ticket notification and keeps payload/publish measurements."""
+
+    def __init__(self, store, inline_max_bytes=0):
+        self.store = store
+        self.inline_max_bytes = inline_max_bytes # 0 disables inlining
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.inlined = 0
+        self.publishes = 0
+        self.payload_bytes_total = 0
+        self.payload_bytes_max = 0
+        self.publish_seconds_total = 0.0
+
+    def fields(self, booking_id, pdf_bytes):
+        """Returns the message fields describing the PDF: a reference (or inline copy) and its checksum."""
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        fields = {'pdf_sha256': digest, 'pdf_size': len(pdf_bytes)}
+        if self.inline_max_bytes:
+            inline = encode_inline(pdf_bytes)
+            if len(inline) <= self.inline_max_bytes:
+                fields.update(pdf_inline=inline, pdf_encoding='zlib+base64')
+                with self._lock:
+                    self.inlined += 1
+                return fields
+        fields['pdf_ref'] = self.store.put(f"{booking_id}-{digest[:16]}.pdf", pdf_bytes)
+        with self._lock:
+            self.stored += 1
+        return fields
+
+    def record_publish(self, message, started):
+        """Call after a successful publish with the message string and its perf_counter() start."""
+        elapsed = time.perf_counter() - started
+        size = len(message.encode('utf-8'))
+        with self._lock:
+            self.publishes += 1
+            self.payload_bytes_total += size
+            self.payload_bytes_max = max(self.payload_bytes_max, size)
+            self.publish_seconds_total += elapsed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'stored': self.stored,
+                'inlined': self.inlined,
+                'publishes': self.publishes,
+                'payload_bytes_avg': round(self.payload_bytes_total / self.publishes) if self.publishes else 0,
+                'payload_bytes_max': self.payload_bytes_max,
+                'publish_ms_avg': round(1000 * self.publish_seconds_total / self.publishes, 2) if self.publishes else 0.0
+            }
@@ -0,0 +1,184 @@
+# Two-tier cache for rendered ticket PDFs.
+# A booking's ticket never changes, so each PDF is rendered once and then served from
+# a bounded in-memory LRU, backed by files under instance/ so it survives restarts and
+# is shared between worker processes. The disk tier is capped too: least recently used
+# files are swept once it grows past max_disk_bytes.
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+DISK_SWEEP_INTERVAL_SECONDS = 600 # Other processes write here too, so re-measure now and then
+DISK_SWEEP_TARGET = 0.9 # Sweep down to this fraction of the cap so the next few puts don't sweep again
+STALE_TMP_SECONDS = 3600 # Temp files this old were left by a writer that died
+
+
+class TicketPdfCache:
+    """PDF bytes keyed by (template version, booking_id).
+
+    Each template version has its own subdirectory. Bumping the version makes every old
+    entry unreachable, so a layout change never serves stale tickets, and the old
+    version's files are deleted when the cache is opened.
+    """
+
+    def __init__(self, directory, template_version, max_memory_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.template_version = template_version
+        self.version_dir = os.path.join(directory, f"v{template_version}")
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict() # key -> bytes, least recently used first
+        self._memory_bytes = 0
+        self._disk_bytes = 0 # As of the last sweep, plus this process's puts since
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        os.makedirs(self.version_dir, exist_ok=True)
+        self._purge_other_versions()
+        self._sweep()
+
+    def _key(self, booking_id):
+        return hashlib.sha256(f"v{self.template_version}:{booking_id}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.version_dir, key[:2], f"{key}.pdf")
+
+    def _purge_other_versions(self):
+        """Deletes everything but the current version's directory, including the old unversioned layout."""
+        current = os.path.basename(self.version_dir)
+        for name in os.listdir(self.directory):
+            if name == current:
+                continue
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            print(f"Ticket cache: removed {name} (not template version {self.template_version})")
+
+    def _sweep(self):
+        """Measures the disk tier and deletes least recently used files until it is under the cap."""
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self.version_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue # Swept by another process
+                if name.endswith('.tmp') and st.st_mtime > now - STALE_TMP_SECONDS:
+                    continue # Still being written
+                files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        if total > self.max_disk_bytes:
+            files.sort() # Oldest mtime first; disk hits touch their file
+            for _, size, path in files:
+                if total <= self.max_disk_bytes * DISK_SWEEP_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._last_sweep = time.monotonic()
+            self.disk_evictions += evicted
+
+    def _remember(self, key, data):
+        """Adds to the memory tier and evicts least recently used entries. Caller holds the lock."""
+        if len(data) > self.max_memory_bytes:
+            return
+        if key in self._entries:
+            self._memory_bytes -= len(self._entries.pop(key))
+        self._entries[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, booking_id):
+        """Returns the cached PDF bytes, or None."""
+        key = self._key(booking_id)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return data
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path) # Recently used: keeps it out of the next sweep
+        except OSError:
+            pass
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, booking_id, data):
+        key = self._key(booking_id)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path) # Atomic: readers never see a half-written PDF
+        with self._lock:
+            self._remember(key, data)
+            self._disk_bytes += len(data)
+            due = (self._disk_bytes > self.max_disk_bytes
+                   or time.monotonic() - self._last_sweep > DISK_SWEEP_INTERVAL_SECONDS)
+        if due and self._sweep_lock.acquire(blocking=False): # One sweeping thread is enough
+            try:
+                self._sweep()
+            finally:
+                self._sweep_lock.release()
+
+    def get_or_render(self, booking_id, render):
+        """Returns a fresh BytesIO with the ticket PDF, calling render() (which returns a buffer) on a miss."""
+        data = self.get(booking_id)
+        if data is None:
+            data = render().getvalue()
+            self.put(booking_id, data)
+        return BytesIO(data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'disk_evictions': self.disk_evictions,
+                'disk_bytes': self._disk_bytes,
+                'max_disk_bytes': self.max_disk_bytes
+            }
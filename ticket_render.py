@@ -0,0 +1,156 @@
+# Shared helpers for rendering ticket PDFs in app.py and aws_app.py.
+import os
+import threading
+from io import BytesIO
+
+import qrcode
+from PIL import Image
+from reportlab.lib.colors import black, white
+from reportlab.lib.utils import ImageReader
+
+POSTER_BOX = (120, 170)        # Size the poster is drawn at on the ticket, in points
+POSTER_PIXELS_PER_POINT = 2    # Enough resolution for printing without embedding the full-size JPEG
+
+
+class PosterImage:
+    """A downsampled poster that can be drawn into any number of PDFs.
+
+    Keeps one ImageReader for the JPEG: drawImage embeds its bytes as-is (DCTDecode
+    passthrough) and fingerprints it from pixels the reader decodes on first use and keeps.
+    The reader has a single file position, so concurrent draws of one poster take turns.
+    """
+
+    def __init__(self, jpeg_bytes):
+        self.jpeg_bytes = jpeg_bytes
+        self._reader = ImageReader(BytesIO(jpeg_bytes))
+        self._lock = threading.Lock()
+
+    def draw(self, p, x, y, width, height):
+        with self._lock:
+            p.drawImage(self._reader, x, y, width=width, height=height)
+
+
+def load_poster(path, box=POSTER_BOX, pixels_per_point=POSTER_PIXELS_PER_POINT):
+    """Decodes a poster file once and returns it downsampled to the draw box (never upscaled)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    with Image.open(BytesIO(data)) as im:
+        size = (box[0] * pixels_per_point, box[1] * pixels_per_point)
+        if im.format == 'JPEG' and im.mode == 'RGB' and im.width <= size[0] and im.height <= size[1]:
+            return PosterImage(data) # Already small enough: embed the original bytes
+        im = im.convert('RGB')
+        if im.width > size[0] or im.height > size[1]:
+            im = im.resize(size, Image.LANCZOS)
+        out = BytesIO()
+        im.save(out, format='JPEG', quality=85, optimize=True)
+    return PosterImage(out.getvalue())
+
+
+class PosterCache:
+    """Poster images for the movie catalog, keyed by poster filename."""
+
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self._posters = {} # filename -> (file signature, PosterImage or None)
+        self._lock = threading.Lock()
+
+    def _signature(self, filename):
+        try:
+            st = os.stat(os.path.join(self.static_dir, filename))
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _load(self, filename, signature):
+        if signature is None:
+            print(f"Poster not found: {os.path.join(self.static_dir, filename)}")
+            return None
+        try:
+            return load_poster(os.path.join(self.static_dir, filename))
+        except Exception as e:
+            print(f"Error loading poster {filename}: {e}")
+            return None
+
+    def refresh(self, movies):
+        """(Re)loads posters for a catalog; unchanged files are reused, removed movies dropped."""
+        posters = {}
+        for movie in movies:
+            filename = movie.get('poster_filename')
+            if not filename or filename in posters:
+                continue
+            signature = self._signature(filename)
+            current = self._posters.get(filename)
+            if current and current[0] == signature:
+                posters[filename] = current
+            else:
+                posters[filename] = (signature, self._load(filename, signature))
+        self._posters = posters # Swap in one step; concurrent renders see old or new, never a mix
+
+    def get(self, filename):
+        """Returns the PosterImage for a filename, or None if it has no usable poster."""
+        if not filename:
+            return None
+        entry = self._posters.get(filename)
+        if entry is None:
+            # Not in the catalog we were refreshed with; load it once and remember it
+            with self._lock:
+                entry = self._posters.get(filename)
+                if entry is None:
+                    signature = self._signature(filename)
+                    entry = (signature, self._load(filename, signature))
+                    self._posters = {**self._posters, filename: entry}
+        return entry[1]
+
+
+def qr_matrix(data, border=4):
+    """QR modules as rows of booleans (True = dark), including the quiet-zone border."""
+    qr = qrcode.QRCode(border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _dark_runs(row):
+    """Yields (start, length) for each horizontal run of dark modules in a matrix row."""
+    start = None
+    for x, dark in enumerate(row + [False]):
+        if dark and start is None:
+            start = x
+        elif not dark and start is not None:
+            yield start, x - start
+            start = None
+
+
+def draw_qr(p, data, x, y, size):
+    """Draws a QR code as vector rectangles (one per run of dark modules) on a white square."""
+    matrix = qr_matrix(data)
+    module = size / len(matrix)
+    p.saveState()
+    p.setFillColor(white)
+    p.rect(x, y, size, size, fill=1, stroke=0)
+    p.setFillColor(black)
+    path = p.beginPath()
+    top = y + size
+    for row_index, row in enumerate(matrix):
+        row_y = top - (row_index + 1) * module
+        for start, length in _dark_runs(row):
+            path.rect(x + start * module, row_y, length * module, module)
+    p.drawPath(path, fill=1, stroke=0)
+    p.restoreState()
+
+
+def qr_svg(data, module_px=10):
+    """Renders a QR code as a compact SVG document (bytes)."""
+    matrix = qr_matrix(data)
+    n = len(matrix)
+    d = ''.join(
+        f"M{start} {row_index}h{length}v1h-{length}z"
+        for row_index, row in enumerate(matrix)
+        for start, length in _dark_runs(row)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{n * module_px}" height="{n * module_px}" '
+        f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+        f'<rect width="{n}" height="{n}" fill="#fff"/><path d="{d}" fill="#000"/></svg>'
+    ).encode('utf-8')
+
@@ -0,0 +1,78 @@
+# Cache for the logged-in user's record.
+# Every dashboard/profile request used to read the user table. A user is now looked up
+# at most once per request (memoized in flask.g) and otherwise served from a small
+# per-process LRU whose entries expire after `ttl` seconds. Writes to a user invalidate
+# their entry in this process; other processes see the change once their entry expires.
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, has_app_context
+
+
+class UserCache:
+    """TTL + LRU cache of user records keyed by email. Missing users (None) are never cached."""
+
+    def __init__(self, ttl=60, max_entries=2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # email -> (expires_at, user)
+        self._lock = threading.Lock()
+        self.request_hits = 0 # Served from flask.g (same request)
+        self.hits = 0         # Served from the LRU
+        self.misses = 0       # Loaded from the user table
+
+    def get(self, email, load):
+        """Returns the user for an email, calling load(email) only if it isn't cached."""
+        memo = None
+        if has_app_context():
+            memo = g.setdefault('_user_cache', {})
+            if email in memo:
+                with self._lock:
+                    self.request_hits += 1
+                return memo[email]
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(email)
+                self.hits += 1
+                user = entry[1]
+            else:
+                self.misses += 1
+                user = None
+        if user is None:
+            user = load(email)
+            if user is not None:
+                self.put(email, user)
+        if memo is not None:
+            memo[email] = user
+        return user
+
+    def put(self, email, user):
+        """Stores a freshly read user (e.g. the record just checked at login)."""
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email):
+        """Forgets a user after it was written, here and in the current request's memo."""
+        with self._lock:
+            self._entries.pop(email, None)
+        if has_app_context():
+            g.get('_user_cache', {}).pop(email, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.request_hits + self.hits + self.misses
+            return {
+                'request_hits': self.request_hits,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round((self.request_hits + self.hits) / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'ttl_seconds': self.ttl
+            }